@@ -0,0 +1,162 @@
+"""
+Scaling benchmark of the data loading, the plots and the full run.
+
+Writes synthetic simulations of increasing size with
+pyvisdmc.test_data.synthetic, then times load_data, sim_info, every plot_*
+function and a full `pyvisdmc` run (in a new process, with --force) on
+each of them. The best time of every step is printed, and all the times
+are written to a JSON file with the sizes and the machine, so that runs
+can be compared to track regressions and scaling curves.
+
+Run from the repository root, e.g.:
+
+    python benchmarks/bench_scaling.py --walkers 1000 10000 100000
+    python benchmarks/bench_scaling.py --walkers 1000000 --atoms 7 \
+        --data-dir /scratch/synthetic --output scaling.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib.metadata import version
+
+import numpy as np
+import yaml
+
+import pyvibdmc as pv
+from pyvisdmc.plots.eref import plot_eref
+from pyvisdmc.plots.mult_dist import plot_dists
+from pyvisdmc.plots.one_dist import plot_dist
+from pyvisdmc.plots.two_d_dist import plot_2d
+from pyvisdmc.test_data.synthetic import write_simulation
+from pyvisdmc.utils import find_simulation, load_data, sim_info, window_snapshots
+
+MOLECULE = 'syn'
+MAIN = os.path.abspath('src/pyvisdmc/main.py')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--walkers', type=int, nargs='+',
+                        default=[1000, 10000, 100000],
+                        help='walker counts of the synthetic simulations.')
+    parser.add_argument('--atoms', type=int, default=3,
+                        help='number of atoms.')
+    parser.add_argument('--snapshots', type=int, default=10,
+                        help='number of wavefunction snapshots.')
+    parser.add_argument('--timesteps', type=int, default=20000,
+                        help='number of timesteps of the Eref series.')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='times every step is run; the best is reported.')
+    parser.add_argument('--data-dir',
+                        help='folder of the synthetic data, kept and reused '
+                             'between runs (a temporary folder if not given).')
+    parser.add_argument('--output', default='bench_scaling.json',
+                        help='JSON file the results are written to.')
+    return parser.parse_args(argv)
+
+
+def timed(func, repeats):
+    seconds = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - t0)
+    return seconds
+
+
+def bench_size(data_dir, walkers, args):
+    timesteps = args.timesteps
+    data_path = os.path.join(data_dir, f'{walkers}_walkers_{args.atoms}_atoms')
+    entry = None
+    if os.path.isdir(data_path):
+        try:
+            entry = find_simulation(data_path, MOLECULE, 0, walkers, timesteps)
+        except ValueError:
+            pass
+    if entry is None or len(entry['snapshots']) != args.snapshots:
+        t0 = time.perf_counter()
+        write_simulation(data_path, MOLECULE, walkers=walkers, atoms=args.atoms,
+                         timesteps=timesteps, snapshots=args.snapshots)
+        print(f"  wrote {walkers} walkers x {args.snapshots} snapshots in "
+              f"{time.perf_counter() - t0:.1f} s")
+        entry = find_simulation(data_path, MOLECULE, 0, walkers, timesteps)
+
+    # the second half of the simulation, as in the example configs
+    start, stop = timesteps // 2, timesteps
+    snapshots = window_snapshots(entry, start, stop)
+    pairs = [[i, i + 1] for i in range(args.atoms - 1)]
+    two_d = [pairs[0], pairs[-1]] if len(pairs) > 1 else [pairs[0], pairs[0]]
+    config = os.path.join(data_path, 'config.yaml')
+    with open(config, 'w') as f:
+        yaml.dump({'data_path': data_path, 'molecule': MOLECULE, 'sim_num': 0,
+                   'walkers': walkers, 'timesteps': timesteps, 'start': start,
+                   'stop': stop, 'plots': ['eref', 'one_dist', 'mult_dist', 'two_d_dist'],
+                   'dist': pairs[0], 'mult_dists': pairs, '2d_dists': two_d}, f)
+
+    sim_data = load_data(data_path, MOLECULE, 0, walkers, timesteps)
+    analyzer, weights = sim_info(sim_data, start, stop, snapshots=snapshots)
+    analyzer = pv.AnalyzeWfn(analyzer.xx)
+    steps = {
+        'load_data': lambda: load_data(data_path, MOLECULE, 0, walkers, timesteps),
+        'sim_info': lambda: sim_info(sim_data, start, stop, snapshots=snapshots),
+        'plot_eref': lambda: plot_eref(MOLECULE, 0, sim_data, start, stop),
+        'plot_dist': lambda: plot_dist(MOLECULE, analyzer, weights, pairs[0]),
+        'plot_dists': lambda: plot_dists(MOLECULE, 0, analyzer, weights, pairs,
+                                         hist=False, exp=False),
+        'plot_2d': lambda: plot_2d(MOLECULE, 0, analyzer, weights, two_d, exp=False),
+        'main': lambda: subprocess.run([sys.executable, MAIN, config, '--force'],
+                                       check=True, capture_output=True),
+    }
+    results = []
+    for step, func in steps.items():
+        seconds = timed(func, args.repeats)
+        results.append({'step': step, 'walkers': walkers, 'atoms': args.atoms,
+                        'snapshots': len(snapshots), 'timesteps': timesteps,
+                        'best_seconds': min(seconds), 'seconds': seconds})
+        print(f"  {step:12s} {min(seconds) * 1e3:10.1f} ms")
+    return results
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output)
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.abspath(args.data_dir) if args.data_dir else tmp
+        # the plots are saved in the working directory
+        work = os.path.join(tmp, 'plots')
+        os.makedirs(work)
+        cwd = os.getcwd()
+        os.chdir(work)
+        try:
+            results = []
+            for walkers in args.walkers:
+                print(f"{walkers} walkers, {args.atoms} atoms:")
+                results.extend(bench_size(data_dir, walkers, args))
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        'benchmark': 'scaling',
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'pyvisdmc_version': version('PyVisDMC'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'repeats': args.repeats,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of the startup time of the command line tool.
+
+Measures the time from launching `pyvisdmc` until its first line of output,
+for `--help` and for a config file that fails validation, and checks that
+neither imports the heavy plotting and data dependencies. Exits with an
+error if the time to first output exceeds the budget.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py
+"""
+import subprocess
+import sys
+import tempfile
+import time
+
+# Time to first output allowed for the command line tool, in seconds
+BUDGET = 0.5
+REPEATS = 10
+HEAVY = ('matplotlib', 'seaborn', 'pyvibdmc', 'h5py', 'pandas')
+
+
+def first_output(args):
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'src/pyvisdmc/main.py'] + args,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True)
+    proc.stdout.readline()
+    elapsed = time.perf_counter() - t0
+    proc.communicate()
+    return elapsed
+
+
+def heavy_imports(args):
+    # modules imported by a run, from python -X importtime
+    proc = subprocess.run([sys.executable, '-X', 'importtime',
+                           'src/pyvisdmc/main.py'] + args,
+                          capture_output=True, text=True)
+    names = {line.split('|')[-1].strip().split('.')[0]
+             for line in proc.stderr.splitlines()
+             if line.startswith('import time:')}
+    return sorted(names.intersection(HEAVY))
+
+
+def main():
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml') as config:
+        config.write('data_path: does/not/exist\n')
+        config.flush()
+        cases = {'--help': ['--help'], 'invalid config': [config.name]}
+
+        failed = False
+        for name, args in cases.items():
+            best = min(first_output(args) for _ in range(REPEATS))
+            heavy = heavy_imports(args)
+            ok = best <= BUDGET and not heavy
+            failed |= not ok
+            print(f"{name:16s} first output {best * 1e3:7.1f} ms "
+                  f"(budget {BUDGET * 1e3:.0f} ms), heavy imports: "
+                  f"{', '.join(heavy) or 'none'}  {'ok' if ok else 'FAIL'}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
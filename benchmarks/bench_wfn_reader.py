@@ -0,0 +1,45 @@
+"""
+Benchmark of the fast wavefunction reader against SimInfo.get_wfns.
+
+Run from the repository root:
+
+    python benchmarks/bench_wfn_reader.py
+"""
+import timeit
+
+import numpy as np
+
+import pyvibdmc as pv
+from pyvisdmc.utils import read_wfns
+from pyvisdmc.utils.data_loader import wfn_files
+
+SIM_INFO = ('src/pyvisdmc/test_data/h5o3_example_data/'
+            '1.0w_5000_walkers_20000t_1dt/H5O3_0_sim_info.hdf5')
+REPEATS = 20
+
+
+def siminfo_path(sim_data, snapshots):
+    coords, weights = sim_data.get_wfns(snapshots)
+    return pv.Constants.convert(coords, 'angstroms', to_AU=False), weights
+
+
+def reader_path(sim_data, snapshots):
+    return read_wfns(wfn_files(sim_data, snapshots), ret_ang=True)
+
+
+def main():
+    sim_data = pv.SimInfo(SIM_INFO)
+    snapshots = np.arange(10000, 20000, 1000)
+
+    old = min(timeit.repeat(lambda: siminfo_path(sim_data, snapshots),
+                            number=1, repeat=REPEATS))
+    new = min(timeit.repeat(lambda: reader_path(sim_data, snapshots),
+                            number=1, repeat=REPEATS))
+
+    print(f"SimInfo.get_wfns + convert: {old * 1e3:8.2f} ms")
+    print(f"read_wfns(ret_ang=True):    {new * 1e3:8.2f} ms")
+    print(f"speedup:                    {old / new:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,40 @@
-from .plots import *
-from .utils import *
-from .main import *
+import importlib
+
 from .test_data import *
 
 __version__ = "0.1.0"
+
+# The functions of plots and utils are available from the package, but
+# they are only imported the first time they are used, so that the command
+# line tool starts quickly
+_PACKAGES = ('plots', 'utils')
+
+
+def _main_names(module):
+    # the functions defined by the command line module (main, parse_args,
+    # read_config, run, watch, ...), as `from .main import *` exported them
+    return [name for name, value in vars(module).items()
+            if not name.startswith('_') and callable(value)
+            and getattr(value, '__module__', None) == module.__name__]
+
+
+def __getattr__(name):
+    for package in _PACKAGES:
+        module = importlib.import_module(f'.{package}', __name__)
+        if name in module.__all__:
+            return getattr(module, name)
+    module = importlib.import_module('.main', __name__)
+    if name in _main_names(module):
+        # importing the submodule binds pyvisdmc.main to it, so the
+        # function is bound in its place
+        globals()[name] = getattr(module, name)
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    names = set(globals())
+    for package in _PACKAGES:
+        names.update(importlib.import_module(f'.{package}', __name__).__all__)
+    names.update(_main_names(importlib.import_module('.main', __name__)))
+    return sorted(names)
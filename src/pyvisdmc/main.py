@@ -1,17 +1,218 @@
 import argparse
+import glob
+import io
+import multiprocessing
+import sys
+import time
 import yaml
 import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
 from importlib.metadata import metadata, version
-from pyvisdmc.plots.eref import plot_eref
-from pyvisdmc.plots.one_dist import plot_dist
-from pyvisdmc.plots.mult_dist import plot_dists
-from pyvisdmc.plots.two_d_dist import plot_2d
-from pyvisdmc.utils.data_loader import load_data, sim_info
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('config', help='path to the YAML configuration file.')
-    return parser.parse_args()
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='print additional information about the run.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of figures rendered in parallel.')
+    parser.add_argument('--force', action='store_true',
+                        help='redraw every plot, even the ones whose inputs have not changed.')
+    parser.add_argument('--profile', nargs='?', const='pyvisdmc_profile.json',
+                        metavar='TRACE',
+                        help='time every stage of the run and write a Chrome trace '
+                             '(default pyvisdmc_profile.json).')
+    parser.add_argument('--watch', action='store_true',
+                        help='follow a running simulation and update the plots as snapshots are written.')
+    parser.add_argument('--interval', type=float, default=10.0,
+                        help='seconds between two checks for new snapshots in --watch mode.')
+    return parser.parse_args(argv)
+
+def parse_batch_args(argv=None):
+    parser = argparse.ArgumentParser(prog='pyvisdmc batch')
+    parser.add_argument('configs', nargs='+',
+                        help='paths or glob patterns of YAML configuration files.')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='print the output of every run.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of configuration files run in parallel.')
+    parser.add_argument('--force', action='store_true',
+                        help='redraw every plot, even the ones whose inputs have not changed.')
+    return parser.parse_args(argv)
+
+def expand_configs(patterns):
+    """
+    Expand paths and glob patterns of config files, keeping their order
+    and dropping duplicates.
+    """
+    configs = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            raise ValueError(f"No configuration files match '{pattern}'.")
+        else:
+            pass
+        configs.extend(matches)
+    return list(dict.fromkeys(configs))
+
+def batch_folder(config_path):
+    """
+    Folder the plots of a config run in a batch are saved to: a folder
+    named after the config file, next to it (e.g., campaign/a/config.yaml
+    saves to campaign/a/config/), so that configs run at the same time
+    never write the same files.
+    """
+    return os.path.splitext(config_path)[0]
+
+def _run_captured(config_path, force=False):
+    # one batch entry; its output is kept for the summary instead of being
+    # interleaved with the other workers
+    out = io.StringIO()
+    t0 = time.perf_counter()
+    try:
+        with redirect_stdout(out):
+            saved = run(config_path, force=force, folder=batch_folder(config_path))
+        error = None
+    except Exception as err:
+        saved = []
+        error = f"{type(err).__name__}: {err}"
+    return {'config': config_path, 'saved': saved, 'error': error,
+            'seconds': time.perf_counter() - t0, 'output': out.getvalue()}
+
+def run_batch(configs, jobs=1, verbose=False, force=False):
+    """
+    Run several config files in one invocation, over a pool of `jobs` warm
+    worker processes, and print one summary. The plots of every config are
+    saved to their own folder (see batch_folder).
+
+    Parameters:
+    - configs: List of paths to YAML configuration files.
+    - jobs: Number of configuration files run at the same time.
+    - verbose: Print the output of every run before the summary.
+    - force: Redraw every plot, even the ones that are up to date.
+
+    Returns:
+    - A list with one result dict per config (keys 'config', 'saved',
+      'error', 'seconds' and 'output'), in the order of `configs`.
+    """
+    if jobs == 1 or len(configs) < 2:
+        results = [_run_captured(c, force=force) for c in configs]
+    else:
+        # the heavy dependencies are imported once, before the workers are
+        # forked, and each worker then runs many configs
+        import matplotlib.figure
+        import pyvibdmc
+        import seaborn
+        context = (multiprocessing.get_context('fork')
+                   if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=min(jobs, len(configs)),
+                                 mp_context=context) as pool:
+            results = list(pool.map(partial(_run_captured, force=force), configs))
+
+    failed = [r for r in results if r['error'] is not None]
+    if verbose:
+        for r in results:
+            print(f"===== {r['config']} =====")
+            print(r['output'])
+    print(f"Batch summary: {len(results)} configs, "
+          f"{len(results) - len(failed)} succeeded, {len(failed)} failed")
+    for r in results:
+        if r['error'] is None:
+            print(f"  ok      {r['config']}  {len(r['saved'])} plots  {r['seconds']:.1f} s")
+        else:
+            print(f"  FAILED  {r['config']}  {r['error']}")
+    return results
+
+def parse_catalog_args(argv=None):
+    parser = argparse.ArgumentParser(prog='pyvisdmc catalog')
+    parser.add_argument('data_path', help='folder containing the simulation data.')
+    return parser.parse_args(argv)
+
+def print_catalog(data_path):
+    """
+    Index the simulations under a data folder (or bring the index up to
+    date) and print one line per simulation.
+    """
+    from pyvisdmc.utils.catalog import Catalog
+
+    if not os.path.isdir(data_path):
+        raise ValueError(f"Provided data_path '{data_path}' is not a valid directory.")
+    else:
+        pass
+    catalog = Catalog(data_path).refresh()
+    print(f"{len(catalog)} simulations in {catalog.root} ({catalog.rescanned} scanned)")
+    for key, sim in sorted(catalog.sims.items()):
+        print(f"  {sim['molecule']:8s} sim {sim['sim_num']:<4d} {sim['walkers']:>8d} walkers "
+              f"{sim['timesteps']:>8d} timesteps {sim['atoms']:>4d} atoms "
+              f"{len(sim['snapshots']):>5d} snapshots  {key}")
+
+def parse_convert_args(argv=None):
+    parser = argparse.ArgumentParser(prog='pyvisdmc convert')
+    parser.add_argument('data_path', help='folder containing the simulation data.')
+    parser.add_argument('--molecule', help='only convert the simulations of this molecule.')
+    parser.add_argument('--sim-num', type=int, help='only convert this simulation number.')
+    parser.add_argument('--float32', action='store_true',
+                        help='store the coordinates in single precision.')
+    parser.add_argument('--compress', action='store_true',
+                        help='gzip the store (it is then read without memory-mapping).')
+    return parser.parse_args(argv)
+
+def convert(data_path, molecule=None, sim_num=None, float32=False, compress=False):
+    """
+    Pack the wavefunction snapshots of the simulations under a data folder
+    into one packed store per simulation (see pyvisdmc.utils.packed), which
+    later runs read instead of the wfns/ files, and print one line per
+    simulation.
+
+    Parameters:
+    - data_path: Folder containing the simulation data.
+    - molecule: Only convert the simulations of this molecule, if given.
+    - sim_num: Only convert this simulation number, if given.
+    - float32: Store the coordinates in single precision.
+    - compress: Gzip the coordinates and weights.
+
+    Raises:
+    - ValueError: If data_path is not a directory, or no matching
+      simulation has wavefunction snapshots.
+
+    Returns:
+    - A list of the paths of the stores written.
+    """
+    from pyvisdmc.utils.catalog import Catalog
+    from pyvisdmc.utils.packed import pack_snapshots, packed_path
+
+    if not os.path.isdir(data_path):
+        raise ValueError(f"Provided data_path '{data_path}' is not a valid directory.")
+    else:
+        pass
+    catalog = Catalog(data_path).refresh()
+    print(f"Packing the simulations in {catalog.root}")
+    written = []
+    for key, sim in sorted(catalog.sims.items()):
+        if molecule is not None and sim['molecule'] != molecule.lower():
+            continue
+        if sim_num is not None and sim['sim_num'] != sim_num:
+            continue
+        # the store is rebuilt from the wavefunction files only
+        wfns = {int(ts): os.path.join(catalog.root, path)
+                for ts, path in sim['snapshots'].items() if path != sim['packed']}
+        if not wfns:
+            continue
+        timesteps = sorted(wfns)
+        path = packed_path(os.path.join(catalog.root, key))
+        size = pack_snapshots(path, [wfns[ts] for ts in timesteps], timesteps,
+                              float32=float32, compress=compress)
+        print(f"  {sim['molecule']:8s} sim {sim['sim_num']:<4d} {len(timesteps):>5d} snapshots "
+              f"{size / 1024 ** 2:>8.1f} MB  {os.path.relpath(path, catalog.root)}")
+        written.append(path)
+    if not written:
+        raise ValueError(f"No simulation with wavefunction snapshots to convert in '{data_path}'.")
+    else:
+        pass
+    catalog.refresh()
+    return written
 
 def main():
     pkg_name = "PyVisDMC"
@@ -35,8 +236,150 @@ def main():
     print(pkg_description)
     print(f"Version {pkg_version}")
 
+    if sys.argv[1:2] == ['batch']:
+        args = parse_batch_args(sys.argv[2:])
+        if args.jobs < 1:
+            raise ValueError("The number of jobs must be a positive integer.")
+        else:
+            pass
+        results = run_batch(expand_configs(args.configs), jobs=args.jobs,
+                            verbose=args.verbose, force=args.force)
+        if any(r['error'] is not None for r in results):
+            sys.exit(1)
+        else:
+            pass
+        return
+
+    if sys.argv[1:2] == ['catalog']:
+        print_catalog(parse_catalog_args(sys.argv[2:]).data_path)
+        return
+
+    if sys.argv[1:2] == ['convert']:
+        args = parse_convert_args(sys.argv[2:])
+        convert(args.data_path, molecule=args.molecule, sim_num=args.sim_num,
+                float32=args.float32, compress=args.compress)
+        return
+
     args = parse_args()
-    with open(args.config, 'r') as file:
+    if args.jobs < 1:
+        raise ValueError("The number of jobs must be a positive integer.")
+    else:
+        pass
+    if args.watch:
+        if args.interval <= 0:
+            raise ValueError("The watch interval must be a positive number of seconds.")
+        else:
+            pass
+        try:
+            watch(args.config, interval=args.interval, verbose=args.verbose)
+        except KeyboardInterrupt:
+            print("")
+            print("Stopped watching.")
+        return
+    if args.profile is not None:
+        from pyvisdmc.utils.timing import Trace
+        with Trace() as trace:
+            run(args.config, verbose=args.verbose, jobs=args.jobs, force=args.force)
+        trace.write(args.profile)
+        print(trace.report())
+        print(f"Profile written to {args.profile}")
+        return
+    run(args.config, verbose=args.verbose, jobs=args.jobs, force=args.force)
+
+def snapshot_window(entries, start, stop):
+    """
+    Select the snapshots between start and stop from the catalog entries
+    of the simulations, which must all have them.
+    """
+    from pyvisdmc.utils.catalog import window_snapshots
+
+    try:
+        windows = [window_snapshots(e, start, stop) for e in entries]
+    except ValueError as err:
+        raise ValueError(f"Check config.yml. {err}") from None
+    return windows[0]
+
+def plot_fingerprints(settings, entries, snapshots):
+    """
+    Name the files saved by every requested plot and fingerprint their
+    inputs from the catalog entries, without reading any data.
+
+    Parameters:
+    - settings: Settings of the run (see read_config).
+    - entries: Catalog entries of the simulations.
+    - snapshots: Timesteps of the snapshot window, or None if no
+      distance plot is requested.
+
+    Returns:
+    - A dict mapping each plot to (list of output file names, fingerprint).
+    """
+    from pyvisdmc.utils.outputs import file_stamps, fingerprint
+
+    molecule = settings['molecule']
+    sim_num = settings['sim_num']
+    plots = settings['plots']
+    dist = settings['dist']
+    # with an automatic start, settings['start'] is the detected start
+    common = {key: settings[key] for key in ('molecule', 'sim_nums', 'walkers',
+                                             'timesteps', 'start', 'stop',
+                                             'auto_start')}
+    sim_infos = [e['sim_info'] for e in entries]
+    wfns = [e['snapshots'][ts] for e in entries for ts in snapshots or []]
+    dist_inputs = dict(common, data=file_stamps(wfns), snapshots=snapshots,
+                       precision=settings['precision'], preview=settings['preview'])
+    if settings['chunk_size'] is not None or settings['replicates']:
+        # the histograms do not depend on the size of the chunks, which a
+        # memory_limit may choose
+        dist_inputs.update({key: settings[key] for key in ('hist_range', 'hist_bins')},
+                           streamed=True)
+
+    fingerprints = {}
+    if 'eref' in plots:
+        fingerprints['eref'] = (
+            [f"{molecule}_sim_{sim_num}_zpe.png", f"{molecule}_sim_{sim_num}_zpe.json"],
+            fingerprint(dict(common, plot='eref', data=file_stamps(sim_infos),
+                             zpe_error=settings['zpe_error'],
+                             eref_points=settings['eref_points'])))
+    if 'one_dist' in plots:
+        fingerprints['one_dist'] = (
+            [f"{molecule}_{dist[0]}{dist[1]}_dist.png"],
+            fingerprint(dict(dist_inputs, plot='one_dist', dist=dist,
+                             kde_engine=settings['kde_engine'])))
+    if 'mult_dist' in plots:
+        fingerprints['mult_dist'] = (
+            [f"{molecule}_sim_{sim_num}_mult_dists.png"],
+            fingerprint(dict(dist_inputs, plot='mult_dist', mult_dists=settings['mult_dists'],
+                             kde_engine=settings['kde_engine'])))
+    if 'two_d_dist' in plots:
+        fingerprints['two_d_dist'] = (
+            [f"{molecule}_sim_{sim_num}_2d.png"],
+            fingerprint(dict(dist_inputs, plot='two_d_dist',
+                             two_d_dists=settings['two_d_dists'])))
+    return fingerprints
+
+def read_config(config_path):
+    """
+    Read a config file and check its values, before any data is read.
+
+    Parameters:
+    - config_path: Path to the YAML configuration file.
+
+    Raises:
+    - ValueError: If the config file is invalid.
+
+    Returns:
+    - A dictionary of the settings of the run, named like the config keys
+      ('2d_dists' becomes 'two_d_dists'), with the defaults of the optional
+      keys filled in. 'sim_nums' lists the simulation numbers, 'replicates'
+      tells whether there are several, and 'auto_start' whether the start
+      is detected from the data.
+    """
+    from pyvisdmc.plots.eref import ZPE_ERRORS, MAX_POINTS
+    from pyvisdmc.utils.kde import KDE_ENGINES
+    from pyvisdmc.utils.replicates import parse_sim_nums, replicate_label
+    from pyvisdmc.utils.resample import PREVIEW_SIZE
+
+    with open(config_path, 'r') as file:
         config = yaml.safe_load(file)
 
     # Validate required keys
@@ -59,10 +402,13 @@ def main():
         raise ValueError(f"Check config.yml. Provided data_path '{data_path}' is not a valid directory.")
     else:
         pass
-    if not isinstance(sim_num, int) or sim_num < 0:
-        raise ValueError("Check config.yml. Simulation number must be a non-negative integer.")
-    else:
-        pass
+    # sim_num may list several replicates, which are pooled
+    try:
+        sim_nums = parse_sim_nums(sim_num)
+    except ValueError as err:
+        raise ValueError(f"Check config.yml. {err}") from None
+    replicates = len(sim_nums) > 1
+    sim_num = replicate_label(sim_nums) if replicates else sim_nums[0]
     if not isinstance(walkers, int) or walkers <= 0:
         raise ValueError("Check config.yml. The number of walkers must be a positive integer.")
     else:
@@ -71,6 +417,13 @@ def main():
         raise ValueError("Check config.yml. The number of timesteps must be a positive integer.")
     else:
         pass
+    # start: auto detects the end of the equilibration from the Eref series
+    # once the data is loaded; the checks below validate stop alone
+    auto_start = start == 'auto'
+    if auto_start:
+        start = 0
+    else:
+        pass
     if not isinstance(start, int) or not isinstance(stop, int) or start < 0 or stop < 0:
         raise ValueError("Check config.yml. Start and stop must be non-negative integers.")
     else: 
@@ -96,48 +449,644 @@ def main():
         if p not in default_plots:
             print(f"Warning: plot '{p}' is not built in. Supported plot types: {default_plots}")
 
+    # optional on-disk cache of the loaded and converted walkers
+    cache_dir = config.get('cache_dir')
+    cache_size_mb = config.get('cache_size_mb', 2048)
+    if cache_dir is not None and not isinstance(cache_dir, str):
+        raise ValueError("Check config.yml. cache_dir must be a path.")
+    else:
+        pass
+    if not isinstance(cache_size_mb, (int, float)) or cache_size_mb <= 0:
+        raise ValueError("Check config.yml. cache_size_mb must be a positive number.")
+    else:
+        pass
 
-    print("")
-    print(f"Molecule: {molecule}")
-    print(f"Analyzing {walkers} walkers over {timesteps} timesteps...")
-    print("")
+    # optional KDE engine of the distribution plots
+    kde_engine = config.get('kde_engine', 'seaborn')
+    if kde_engine not in KDE_ENGINES:
+        raise ValueError(f"Check config.yml. kde_engine must be one of {KDE_ENGINES}.")
+    else:
+        pass
 
-    sim_data = load_data(data_path, molecule, sim_num, walkers, timesteps)
-    analyzer, weights = sim_info(sim_data, start, stop)
+    # optional method of the ZPE error bar
+    zpe_error = config.get('zpe_error', 'block')
+    if zpe_error not in ZPE_ERRORS:
+        raise ValueError(f"Check config.yml. zpe_error must be one of {ZPE_ERRORS}.")
+    else:
+        pass
 
-    if 'eref' in plots:
-        plot_eref(molecule, sim_num, sim_data, start, stop)
-        print(f"Eref plot saved as {molecule}_sim_{sim_num}_zpe.png")
-        print("")
+    # optional number of points of the Eref line drawn (display only)
+    eref_points = config.get('eref_points', MAX_POINTS)
+    if not isinstance(eref_points, int) or eref_points < 4:
+        raise ValueError("Check config.yml. eref_points must be an integer of at least 4.")
+    else:
+        pass
+
+    # optional number of snapshot files read in parallel
+    workers = config.get('workers', 1)
+    if not isinstance(workers, int) or workers <= 0:
+        raise ValueError("Check config.yml. workers must be a positive integer.")
+    else:
+        pass
+
+    # optional floating point precision of the coordinates and bond lengths
+    precision = config.get('precision', 'float64')
+    if precision not in ('float64', 'float32'):
+        raise ValueError("Check config.yml. precision must be one of ('float64', 'float32').")
+    else:
+        pass
+
+    # optional streaming of the walkers into fixed-bin weighted histograms
+    chunk_size = config.get('chunk_size')
+    hist_range = config.get('hist_range', [0.0, 5.0])
+    hist_bins = config.get('hist_bins', 250)
+    if chunk_size is not None and (not isinstance(chunk_size, int) or chunk_size <= 0):
+        raise ValueError("Check config.yml. chunk_size must be a positive integer.")
+    else:
+        pass
+    if not isinstance(hist_range, list) or len(hist_range) != 2 or hist_range[0] >= hist_range[1]:
+        raise ValueError("Check config.yml. hist_range must be a list [lo, hi] with lo < hi.")
+    else:
+        pass
+    if not isinstance(hist_bins, int) or hist_bins <= 0:
+        raise ValueError("Check config.yml. hist_bins must be a positive integer.")
+    else:
+        pass
+
+    # optional memory budget of the walker data: when the walkers do not
+    # fit in it, they are streamed through histograms in chunks that do
+    memory_limit = config.get('memory_limit')
+    if memory_limit is not None:
+        from pyvisdmc.utils.memory import parse_memory
+        try:
+            memory_limit = parse_memory(memory_limit)
+        except ValueError:
+            raise ValueError("Check config.yml. memory_limit must be a positive number of megabytes or a size such as '4GB'.") from None
+    else:
+        pass
+
+    # optional quick look: the plots are drawn from a resampled subset of
+    # `preview` walkers (or PREVIEW_SIZE for `preview: true`)
+    preview = config.get('preview', False)
+    if preview is True:
+        preview = PREVIEW_SIZE
+    elif preview is False or preview is None:
+        preview = None
+    elif not isinstance(preview, int) or preview < 2:
+        raise ValueError("Check config.yml. preview must be true, false or a number of walkers of at least 2.")
+    else:
+        pass
+    if preview is not None and (chunk_size is not None or replicates):
+        raise ValueError("Check config.yml. preview cannot be combined with chunk_size or several sim_num replicates.")
+    else:
+        pass
+
+    # plot-specific arguments
+    dist = mult_dists = two_d_dists = None
     if 'one_dist' in plots:
         dist = config.get('dist')
         if dist is None or len(dist) != 2:
             raise ValueError("For 'one_dist' plot, provide argument 'dist' and make sure it contains two atom indices.")
         else:
             pass
-        plot_dist(molecule, analyzer, weights, dist)
-        print(f"one_dist plot saved as {molecule}_{dist[0]}{dist[1]}_dist.png")
-        print("")
     if 'mult_dist' in plots:
         mult_dists = config.get('mult_dists')
         if mult_dists is None or not all(len(d) == 2 for d in mult_dists):
             raise ValueError("For 'mult_dist' plot, 'mult_dists' must be provided and each must have two atom indices.")
         else:
             pass
-        plot_dists(molecule, sim_num, analyzer, weights, mult_dists, hist=False, exp=False)
-        print(f"mult_dist plot saved as {molecule}_sim_{sim_num}_mult_dists.png")
-        print("")
     if 'two_d_dist' in plots:
         two_d_dists = config.get('2d_dists')
-        if two_d_dists is None or not all(len(d) == 2 for d in two_d_dists):
+        if two_d_dists is None or len(two_d_dists) != 2 or not all(len(d) == 2 for d in two_d_dists):
             raise ValueError("For 'two_d_dist' plot, '2d_dists' must be provided and each must have two atom indices.")
         else:
             pass
-        plot_2d(molecule, sim_num, analyzer, weights, two_d_dists, exp=False)
-        print(f"two_d_dist plot saved as {molecule}_sim_{sim_num}_2d.png")
+
+    return {
+        'data_path': data_path, 'molecule': molecule, 'sim_num': sim_num,
+        'sim_nums': sim_nums, 'replicates': replicates, 'walkers': walkers,
+        'timesteps': timesteps, 'start': start, 'stop': stop,
+        'auto_start': auto_start, 'plots': plots, 'cache_dir': cache_dir,
+        'cache_size_mb': cache_size_mb, 'kde_engine': kde_engine,
+        'zpe_error': zpe_error, 'eref_points': eref_points, 'workers': workers,
+        'precision': precision, 'chunk_size': chunk_size, 'hist_range': hist_range,
+        'hist_bins': hist_bins, 'memory_limit': memory_limit,
+        'preview': preview, 'dist': dist,
+        'mult_dists': mult_dists, 'two_d_dists': two_d_dists
+    }
+
+def run(config_path, verbose=False, jobs=1, force=False, folder='.'):
+    """
+    Make the plots requested by one config file. Plots whose inputs have
+    not changed since they were last saved are skipped.
+
+    Parameters:
+    - config_path: Path to the YAML configuration file.
+    - verbose: Print additional information about the run.
+    - jobs: Number of figures rendered in parallel.
+    - force: Redraw every plot, even the ones that are up to date.
+    - folder: Folder the plots and their index are saved to (the working
+      directory by default); it is created if needed.
+
+    Raises:
+    - ValueError: If the config file is invalid.
+
+    Returns:
+    - A list of the messages naming the saved plots.
+    """
+    # the analysis and plotting modules are imported here, and h5py,
+    # pyvibdmc, matplotlib and seaborn only once the config is valid, so
+    # that --help and config errors are reported quickly
+    from pyvisdmc.plots.eref import plot_eref, plot_eref_replicates
+    from pyvisdmc.plots.one_dist import plot_dist
+    from pyvisdmc.plots.mult_dist import plot_dists
+    from pyvisdmc.plots.two_d_dist import plot_2d
+    from pyvisdmc.plots.render import render
+    from pyvisdmc.utils.equilibration import mser
+    from pyvisdmc.utils.timing import stage
+
+    with stage('main.read_config'):
+        settings = read_config(config_path)
+    data_path = settings['data_path']
+    molecule = settings['molecule']
+    sim_num = settings['sim_num']
+    sim_nums = settings['sim_nums']
+    replicates = settings['replicates']
+    walkers = settings['walkers']
+    timesteps = settings['timesteps']
+    start = settings['start']
+    stop = settings['stop']
+    auto_start = settings['auto_start']
+    plots = settings['plots']
+    cache_dir = settings['cache_dir']
+    cache_size_mb = settings['cache_size_mb']
+    kde_engine = settings['kde_engine']
+    zpe_error = settings['zpe_error']
+    eref_points = settings['eref_points']
+    workers = settings['workers']
+    precision = settings['precision']
+    chunk_size = settings['chunk_size']
+    hist_range = settings['hist_range']
+    hist_bins = settings['hist_bins']
+    memory_limit = settings['memory_limit']
+    preview = settings['preview']
+    dist = settings['dist']
+    mult_dists = settings['mult_dists']
+    two_d_dists = settings['two_d_dists']
+
+    # metadata checks: the simulations, their number of atoms and their
+    # snapshots are looked up in the catalog of data_path, which only reads
+    # HDF5 metadata, so that a wrong config fails before any data is loaded.
+    # The catalog is refreshed once, and the simulations are then looked up
+    # in it for the rest of the run
+    from pyvisdmc.utils.catalog import Catalog
+    try:
+        with stage('main.catalog'):
+            catalog = Catalog(data_path).refresh()
+            entries = [catalog.find(molecule, s, walkers, timesteps)
+                       for s in sim_nums]
+    except ValueError as err:
+        raise ValueError(f"Check config.yml. {err}") from None
+    num_atoms = entries[0]['atoms']
+    requested = []
+    if 'one_dist' in plots:
+        requested.append(dist)
+    if 'mult_dist' in plots:
+        requested.extend(mult_dists)
+    if 'two_d_dist' in plots:
+        requested.extend(two_d_dists)
+    for pair in requested:
+        if not all(isinstance(i, int) and 0 <= i < num_atoms for i in pair):
+            raise ValueError(f"Check config.yml. Atom indices {pair} must be between 0 and {num_atoms - 1}, since {molecule} has {num_atoms} atoms.")
+        else:
+            pass
+    from pyvisdmc.utils.data_loader import (load_data, sim_info, iter_sim_info,
+                                           SNAPSHOT_INTERVAL)
+
+    # an automatic start is detected from Eref before the fingerprints, so
+    # that the outputs of a start of 0 and of the detected start differ
+    sim_datas = None
+    start_note = None
+    if auto_start:
+        with stage('main.auto_start'):
+            sim_datas = [load_data(data_path, molecule, s, walkers, timesteps,
+                                   catalog=catalog)
+                         for s in sim_nums]
+            interval = entries[0]['snapshot_interval'] or SNAPSHOT_INTERVAL
+            # the latest detected start is used for every replicate
+            detected = max(mser(s.get_vref(ret_cm=True)[:stop, 1])
+                           for s in sim_datas)
+        # the first wavefunction snapshot after the detected start
+        start = settings['start'] = -(-detected // interval) * interval
+        if start >= stop:
+            raise ValueError(f"Detected equilibration start {start} is not before stop timestep {stop}. Increase stop or set start by hand.")
+        else:
+            pass
+        start_note = f"Equilibration detected at timestep {detected}, using start {start}."
+    dist_plots = [p for p in ('one_dist', 'mult_dist', 'two_d_dist') if p in plots]
+    snapshots = None
+    if dist_plots:
+        snapshots = snapshot_window(entries, start, stop)
+    else:
+        pass
+
+    # the memory the walkers need is estimated from the snapshot metadata
+    # (see pyvisdmc.utils.memory); when it exceeds memory_limit, the
+    # walkers are streamed through histograms in chunks that fit (the
+    # chunk_size setting is lowered if needed)
+    memory_note = None
+    if memory_limit is not None and dist_plots:
+        from pyvisdmc.utils.memory import plan_chunks, snapshot_walkers, walker_bytes
+        n_walkers = max(snapshot_walkers(e, snapshots) for e in entries)
+        per_walker = walker_bytes(num_atoms, len(set(tuple(p) for p in requested)),
+                                  precision)
+        footprint, planned = plan_chunks(n_walkers, per_walker, memory_limit,
+                                         chunk_size=chunk_size,
+                                         workers=workers if replicates else 1)
+        memory_note = (f"Estimated memory of {n_walkers} walkers: {footprint / 1024 ** 2:.1f} MB "
+                       f"(memory_limit {memory_limit / 1024 ** 2:.1f} MB)")
+        if planned is not None and preview is not None:
+            raise ValueError(f"Check config.yml. {memory_note}, but preview needs every walker in memory. Raise memory_limit or remove preview.")
+        else:
+            pass
+        if planned is not None and planned != chunk_size:
+            memory_note += f", streaming in chunks of {planned} walkers."
+            chunk_size = settings['chunk_size'] = planned
+        else:
+            memory_note += "."
+
+    # a plot whose files were saved from inputs with the same fingerprint
+    # is up to date, and neither its data nor its figure is computed again
+    from pyvisdmc.utils.outputs import OutputIndex
+    output_index = OutputIndex(folder)
+    def saved_as(name):
+        return os.path.normpath(os.path.join(folder, name))
+    with stage('main.fingerprints'):
+        fingerprints = plot_fingerprints(settings, entries, snapshots)
+    up_to_date = [] if force else [p for p in plots if p in fingerprints
+                                   and output_index.is_current(*fingerprints[p])]
+    plots = [p for p in plots if p not in up_to_date]
+
+    # the requested plots decide which data products are computed: Eref
+    # only needs the simulation summaries, while the distance plots need
+    # the walkers of the wfns/ snapshots (or their streamed histograms)
+    streamed = chunk_size is not None or replicates
+    dist_plots = [p for p in ('one_dist', 'mult_dist', 'two_d_dist') if p in plots]
+    targets = []
+    if 'eref' in plots:
+        targets.append('vref')
+    if dist_plots and streamed:
+        targets.append('histograms')
+    elif dist_plots:
+        targets.extend(['coordinates', 'weights', 'distances'])
+
+    print("")
+    print(f"Molecule: {molecule}")
+    if replicates:
+        print(f"Pooling {len(sim_nums)} replicates: {sim_nums}")
+    print(f"Analyzing {walkers} walkers over {timesteps} timesteps...")
+    print("")
+    if start_note is not None:
+        print(start_note)
+        print("")
+    if memory_note is not None and (verbose or streamed):
+        print(memory_note)
+        print("")
+    for plot in up_to_date:
+        print(f"{plot} plot is up to date: {saved_as(fingerprints[plot][0][0])}")
+        print("")
+
+    from pyvisdmc.utils.histogram import accumulate_bond_histograms, bin_edges
+    from pyvisdmc.utils.pipeline import Pipeline
+    from pyvisdmc.utils.replicates import pool_bond_histograms
+    from pyvisdmc.utils.resample import preview_walkers, sampling_errors
+    from pyvisdmc.utils.store import QuantityStore
+
+    def bond_histograms(sim_datas):
+        # only one chunk of walkers is in memory at a time; every requested
+        # bond is binned into weighted histograms as the chunks stream by.
+        # Replicates are binned independently and merged afterwards
+        pairs = []
+        if 'one_dist' in plots:
+            pairs.append(tuple(dist))
+        if 'mult_dist' in plots:
+            pairs.extend(tuple(d) for d in mult_dists)
+        pairs = list(dict.fromkeys(pairs))
+        joint = two_d_dists if 'two_d_dist' in plots else None
+        edges = bin_edges(hist_range[0], hist_range[1], hist_bins)
+        if replicates:
+            hist_list, hist2d = pool_bond_histograms(
+                sim_datas, start, stop, pairs, edges, joint=joint,
+                chunk_size=chunk_size, workers=workers, snapshots=snapshots,
+                dtype=precision)
+        else:
+            hist_list, hist2d = accumulate_bond_histograms(
+                iter_sim_info(sim_datas[0], start, stop, chunk_size,
+                              snapshots=snapshots, dtype=precision),
+                pairs, edges, joint=joint)
+        if any(h.outside_weight > 0 for h in hist_list + [hist2d] if h is not None):
+            print(f"Warning: some bond lengths fall outside hist_range {hist_range}.")
+        return dict(zip(pairs, hist_list)), hist2d
+
+    # 'vref' is the list of simulation summaries, which hold Eref; the
+    # products are computed on first use, with the final start and stop
+    pipeline = Pipeline()
+    pipeline.add('vref', lambda: sim_datas or [load_data(data_path, molecule, s, walkers,
+                                                         timesteps, catalog=catalog)
+                                               for s in sim_nums])
+    def load_walkers(sim_datas):
+        analyzer, weights = sim_info(sim_datas[0], start, stop, cache_dir=cache_dir,
+                                     cache_size=int(cache_size_mb * 1024 ** 2),
+                                     workers=workers, snapshots=snapshots,
+                                     dtype=precision)
+        if preview is None:
+            return analyzer, weights
+        # only the resampled subset is kept, so the plots take the same
+        # time whatever the size of the ensemble
+        print(f"Preview of {min(preview, len(weights))} of {len(weights)} walkers, drawn by systematic resampling of the weights.")
+        print("")
+        import pyvibdmc as pv
+        coords, weights = preview_walkers(analyzer.xx, weights, preview)
+        return pv.AnalyzeWfn(coords), weights
+
+    pipeline.add('walkers', load_walkers, requires=['vref'])
+    pipeline.add('coordinates', lambda walker_data: walker_data[0], requires=['walkers'])
+    pipeline.add('weights', lambda walker_data: walker_data[1], requires=['walkers'])
+    # bond lengths shared by the plots are computed once per run
+    pipeline.add('distances', lambda analyzer, weights: QuantityStore(analyzer.xx, weights),
+                 requires=['coordinates', 'weights'])
+    pipeline.add('histograms', bond_histograms, requires=['vref'])
+    if verbose:
+        print(f"Data products: {', '.join(pipeline.plan(targets))}")
         print("")
+
+    analyzer = weights = store = None
+    if dist_plots and streamed:
+        hists, hist2d = pipeline.get('histograms')
+    elif dist_plots:
+        analyzer = pipeline.get('coordinates')
+        weights = pipeline.get('weights')
+        store = pipeline.get('distances')
+
+    # each requested plot becomes an independent rendering task; the bond
+    # lengths are taken from the store (or the streamed histograms) here so
+    # that every plot reuses them
+    if plots:
+        os.makedirs(folder, exist_ok=True)
+    tasks = []
+    messages = []
+    if 'eref' in plots:
+        sim_datas = pipeline.get('vref')
+        if replicates:
+            tasks.append(partial(plot_eref_replicates, molecule, sim_nums,
+                                 sim_datas, start, stop, summary=True,
+                                 max_points=eref_points, folder=folder))
+        else:
+            tasks.append(partial(plot_eref, molecule, sim_num, sim_datas[0], start, stop,
+                                 error=zpe_error, summary=True,
+                                 max_points=eref_points, folder=folder))
+        messages.append(f"Eref plot saved as {saved_as(f'{molecule}_sim_{sim_num}_zpe.png')}")
+    if 'one_dist' in plots:
+        if store is not None:
+            data = {'bonds': store.bond_lengths([dist])}
+        else:
+            data = {'hists': [hists[tuple(dist)]]}
+        tasks.append(partial(plot_dist, molecule, analyzer, weights, dist,
+                             kde_engine=kde_engine, folder=folder, **data))
+        messages.append(f"one_dist plot saved as {saved_as(f'{molecule}_{dist[0]}{dist[1]}_dist.png')}")
+    if 'mult_dist' in plots:
+        if store is not None:
+            data = {'bonds': store.bond_lengths(mult_dists)}
+        else:
+            data = {'hists': [hists[tuple(d)] for d in mult_dists]}
+        tasks.append(partial(plot_dists, molecule, sim_num, analyzer, weights, mult_dists,
+                             hist=False, exp=False, kde_engine=kde_engine, folder=folder,
+                             **data))
+        messages.append(f"mult_dist plot saved as {saved_as(f'{molecule}_sim_{sim_num}_mult_dists.png')}")
+    if 'two_d_dist' in plots:
+        if store is not None:
+            data = {'bonds': store.bond_lengths(two_d_dists)}
+        else:
+            data = {'hist2d': hist2d}
+        tasks.append(partial(plot_2d, molecule, sim_num, analyzer, weights, two_d_dists,
+                             exp=False, folder=folder, **data))
+        messages.append(f"two_d_dist plot saved as {saved_as(f'{molecule}_sim_{sim_num}_2d.png')}")
+
+    if jobs == 1:
+        for task, message in zip(tasks, messages):
+            with stage('main.render'):
+                task()
+            print(message)
+            print("")
     else:
+        # figures share no global state, so they are drawn and saved
+        # concurrently; their own stages are not timed in the workers
+        with stage('main.render'):
+            render(tasks, jobs=jobs)
+        for message in messages:
+            print(message)
+            print("")
+    # the fingerprints are only recorded once every figure is saved
+    for plot in plots:
+        if plot in fingerprints:
+            output_index.record(*fingerprints[plot])
+    if not tasks and not up_to_date:
         print("No plots specified. Exiting successfully...")
 
+    if preview is not None and store is not None:
+        # expectation values of the subset, with their sampling error
+        # relative to the whole ensemble
+        pairs = []
+        if 'one_dist' in plots:
+            pairs.append(dist)
+        if 'mult_dist' in plots:
+            pairs.extend(mult_dists)
+        if 'two_d_dist' in plots:
+            pairs.extend(two_d_dists)
+        pairs = [list(p) for p in dict.fromkeys(tuple(p) for p in pairs)]
+        distances, exp_vals = store.bond_lengths(pairs)
+        print("Preview expectation values:")
+        for pair, exp_val, error in zip(pairs, exp_vals, sampling_errors(distances, weights)):
+            print(f"  <{pair[0]}{pair[1]}> = {exp_val:.4f} +/- {error:.4f} Angstroms")
+        print("")
+
+    if verbose and store is not None:
+        print(store.report())
+
+    return messages
+
+def watch(config_path, interval=10.0, verbose=False, max_passes=None):
+    """
+    Follow a simulation that is still running: the data folder is polled
+    every `interval` seconds, only the wavefunction snapshots written since
+    the last pass are read and folded into persistent weighted histograms,
+    and the plots whose data changed are saved again. The saved plots are
+    recorded as drawn by watch mode, so a later run draws them again.
+
+    Parameters:
+    - config_path: Path to the YAML configuration file.
+    - interval: Seconds between two passes.
+    - verbose: Print additional information about every pass.
+    - max_passes: Stop after this many passes (None to follow the
+      simulation until every snapshot up to stop is processed).
+
+    Raises:
+    - ValueError: If the config file is invalid, or asks for replicates,
+      an automatic start or a preview.
+
+    Returns:
+    - The number of passes made.
+    """
+    settings = read_config(config_path)
+    data_path = settings['data_path']
+    molecule = settings['molecule']
+    sim_num = settings['sim_num']
+    walkers = settings['walkers']
+    start = settings['start']
+    stop = settings['stop']
+    plots = settings['plots']
+    dist = settings['dist']
+    mult_dists = settings['mult_dists']
+    two_d_dists = settings['two_d_dists']
+    if settings['replicates'] or settings['auto_start'] or settings['preview'] is not None:
+        raise ValueError("Check config.yml. Watch mode cannot be combined with several sim_num replicates, start: auto or preview.")
+    else:
+        pass
+
+    from pyvisdmc.plots.eref import plot_eref
+    from pyvisdmc.plots.one_dist import plot_dist
+    from pyvisdmc.plots.mult_dist import plot_dists
+    from pyvisdmc.plots.two_d_dist import plot_2d
+    from pyvisdmc.utils.catalog import Catalog, window_snapshots
+    from pyvisdmc.utils.histogram import bin_edges
+    from pyvisdmc.utils.outputs import OutputIndex, file_stamps, fingerprint
+    from pyvisdmc.utils.watch import SnapshotHistograms
+    import pyvibdmc as pv
+
+    pairs = []
+    if 'one_dist' in plots:
+        pairs.append(tuple(dist))
+    if 'mult_dist' in plots:
+        pairs.extend(tuple(d) for d in mult_dists)
+    pairs = list(dict.fromkeys(pairs))
+    joint = two_d_dists if 'two_d_dist' in plots else None
+    dist_plots = bool(pairs) or joint is not None
+    edges = bin_edges(settings['hist_range'][0], settings['hist_range'][1],
+                      settings['hist_bins'])
+    # the histograms persist between passes, so every pass only reads the
+    # new snapshots
+    accumulated = SnapshotHistograms(pairs, edges, joint=joint,
+                                     chunk_size=settings['chunk_size'],
+                                     dtype=settings['precision'])
+    # every redrawn figure is recorded with the data it was drawn from,
+    # which is marked as watched, so that a later run draws it again from
+    # the whole window instead of finding it up to date
+    output_index = OutputIndex()
+    common = {key: settings[key] for key in ('molecule', 'sim_nums', 'walkers', 'start')}
+    common['watch'] = True
+
+    def record(outputs, **inputs):
+        output_index.record(outputs, fingerprint(dict(common, **inputs)))
+        return outputs[0]
+
+    print("")
+    print(f"Molecule: {molecule}")
+    print(f"Watching simulation {sim_num} of {walkers} walkers up to timestep {stop}...")
+    print("")
+
+    # one catalog is kept between passes, and every pass only rescans the
+    # folders and simulations that changed
+    catalog = Catalog(data_path)
+    sim_info_mtime = None
+    passes = 0
+    while True:
+        passes += 1
+        # the length of a running simulation changes, so it is not part of
+        # the lookup
+        try:
+            entry = catalog.refresh().find(molecule, sim_num, walkers, None)
+        except ValueError as err:
+            raise ValueError(f"Check config.yml. {err}") from None
+        if passes == 1:
+            for pair in pairs + (list(joint) if joint is not None else []):
+                if not all(isinstance(i, int) and 0 <= i < entry['atoms'] for i in pair):
+                    raise ValueError(f"Check config.yml. Atom indices {list(pair)} must be between 0 and {entry['atoms'] - 1}, since {molecule} has {entry['atoms']} atoms.")
+                else:
+                    pass
+            if settings['memory_limit'] is not None and dist_plots:
+                # one snapshot is read at a time, of about `walkers` walkers
+                from pyvisdmc.utils.memory import plan_chunks, walker_bytes
+                bonds = len(set(pairs) | set(tuple(p) for p in (joint or [])))
+                _, accumulated.chunk_size = plan_chunks(
+                    walkers, walker_bytes(entry['atoms'], bonds, settings['precision']),
+                    settings['memory_limit'], chunk_size=settings['chunk_size'])
+        sim_data = pv.SimInfo(entry['sim_info'])
+        snapshots = window_snapshots(entry, start, stop, partial=True)
+        new = accumulated.update(sim_data, snapshots) if dist_plots else []
+
+        saved = []
+        # Eref is only drawn again when the simulation summary changed
+        mtime = os.stat(entry['sim_info']).st_mtime_ns
+        eref_stop = min(stop, entry['timesteps'])
+        if 'eref' in plots and mtime != sim_info_mtime and eref_stop > start:
+            plot_eref(molecule, sim_num, sim_data, start, eref_stop,
+                      error=settings['zpe_error'], summary=True,
+                      max_points=settings['eref_points'])
+            saved.append(record([f"{molecule}_sim_{sim_num}_zpe.png",
+                                 f"{molecule}_sim_{sim_num}_zpe.json"],
+                                plot='eref', stop=eref_stop,
+                                data=file_stamps([entry['sim_info']]),
+                                zpe_error=settings['zpe_error'],
+                                eref_points=settings['eref_points']))
+        sim_info_mtime = mtime
+        # the distance plots are drawn again from the merged histograms
+        # when new snapshots were folded in
+        if new:
+            dist_inputs = {key: settings[key] for key in ('stop', 'hist_range', 'hist_bins',
+                                                          'precision')}
+            dist_inputs['snapshots'] = sorted(accumulated.processed)
+            if 'one_dist' in plots:
+                plot_dist(molecule, None, None, dist, kde_engine=settings['kde_engine'],
+                          hists=[accumulated.histogram(dist)])
+                saved.append(record([f"{molecule}_{dist[0]}{dist[1]}_dist.png"],
+                                    plot='one_dist', dist=dist,
+                                    kde_engine=settings['kde_engine'], **dist_inputs))
+            if 'mult_dist' in plots:
+                plot_dists(molecule, sim_num, None, None, mult_dists, hist=False, exp=False,
+                           kde_engine=settings['kde_engine'],
+                           hists=[accumulated.histogram(d) for d in mult_dists])
+                saved.append(record([f"{molecule}_sim_{sim_num}_mult_dists.png"],
+                                    plot='mult_dist', mult_dists=mult_dists,
+                                    kde_engine=settings['kde_engine'], **dist_inputs))
+            if 'two_d_dist' in plots:
+                plot_2d(molecule, sim_num, None, None, two_d_dists, exp=False,
+                        hist2d=accumulated.joint_hist)
+                saved.append(record([f"{molecule}_sim_{sim_num}_2d.png"],
+                                    plot='two_d_dist', two_d_dists=two_d_dists,
+                                    **dist_inputs))
+
+        print(f"Update {passes}: {len(new)} new snapshots, {len(accumulated.processed)} processed, timestep {entry['timesteps']} of {stop}.")
+        if verbose and new:
+            print(f"  New snapshots: {new}")
+        for name in saved:
+            print(f"  Saved {name}")
+
+        # done once the simulation has reached stop and every snapshot of
+        # the window is in the histograms
+        complete = entry['timesteps'] >= stop
+        if complete and dist_plots:
+            try:
+                window = window_snapshots(entry, start, stop)
+            except ValueError:
+                window = None
+            complete = window is not None and set(window) <= accumulated.processed
+        if complete:
+            print("")
+            print("Simulation complete. Exiting successfully...")
+            return passes
+        if max_passes is not None and passes >= max_passes:
+            return passes
+        time.sleep(interval)
+
 if __name__ == '__main__':
     main()
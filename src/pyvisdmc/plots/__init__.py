@@ -1,5 +1,30 @@
-"""Initialize plots module"""
-from .eref import plot_eref
-from .one_dist import plot_dist
-from .mult_dist import plot_dists
-from .two_d_dist import plot_2d
+"""Initialize plots module
+
+The plotting functions are imported from their modules the first time they
+are used (and matplotlib and seaborn when the first figure is drawn), so
+that importing the package stays fast.
+"""
+import importlib
+
+_EXPORTS = {
+    'plot_eref': 'eref', 'plot_eref_replicates': 'eref',
+    'plot_dist': 'one_dist',
+    'plot_dists': 'mult_dist',
+    'plot_2d': 'two_d_dist',
+    'render': 'render',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -3,29 +3,40 @@ eref.py
 
 This module provides a function to generate and save a plot of the reference
 energy (Eref) of a molecular Diffusion Monte Carlo (DMC) simulation. It
-calculates the zero-point energy (ZPE) over a specified time interval and
-visualizes the energy as a line plot.
+calculates the zero-point energy (ZPE) over a specified time interval,
+with an error bar from block averaging or a block bootstrap, and
+visualizes the energy as a line plot. The line of a long simulation is
+decimated for display, while the ZPE uses every timestep.
 
 Functions:
 - plot_eref: Creates and saves a plot of the ensemble energy and
   calculates ZPE.
+- plot_eref_replicates: Creates and saves a plot of the ensemble energy of
+  several replicates and calculates their pooled ZPE.
 
 Dependencies:
 - numpy, matplotlib, seaborn
 """
+import json
+import os
+
 import numpy as np
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
 
-# Use a non-interactive backend
-matplotlib.use('Agg')
+from pyvisdmc.utils.blocking import MIN_POINTS, block_error, bootstrap_error
+from pyvisdmc.utils.decimate import minmax_decimate
+from pyvisdmc.utils.replicates import (pooled_zpe, replicate_label,
+                                       replicate_zpes)
+from pyvisdmc.utils.timing import stage
+from pyvisdmc.plots.style import new_figure
 
-# Set seaborn style
-sns.set_style("white")
+# ZPE error estimates supported by plot_eref
+ZPE_ERRORS = ('block', 'bootstrap')
+# Most points of an Eref line drawn in a plot (about two per pixel column)
+MAX_POINTS = 2000
 
 
-def plot_eref(molecule, sim_num, sim_data, start, stop):
+def plot_eref(molecule, sim_num, sim_data, start, stop, error='block',
+              n_boot=1000, summary=False, max_points=MAX_POINTS, folder='.'):
     """
     Generate and save a plot of the reference energy (Eref) for
     a molecular DMC simulation and calculate the zero-point
@@ -38,15 +49,31 @@ def plot_eref(molecule, sim_num, sim_data, start, stop):
                 contains simulation data.
     - start: The starting timestep for calculating the ZPE.
     - stop: The stopping timestep for calculating the ZPE.
+    - error: How the error of the ZPE is estimated: 'block' for block
+      averaging (Flyvbjerg-Petersen), or 'bootstrap' for a block bootstrap.
+      A window of fewer than 4 timesteps is drawn without an error.
+    - n_boot: Number of bootstrap samples when error='bootstrap'.
+    - summary: If True, also save the ZPE and its error in a .json file
+      (main does so for the eref plot).
+    - max_points: Most points of the Eref line drawn. Longer simulations
+      are decimated for display only (see pyvisdmc.utils.minmax_decimate);
+      the ZPE is always computed from every timestep.
+    - folder: Folder the files are saved to (the working directory by
+      default).
 
     Raises:
     - ValueError: If the start or stop values are invalid
-    (e.g., start > stop, or indices are out of range).
+    (e.g., start > stop, or indices are out of range), or the error
+    method is unknown.
 
     Saves:
     - A .png file with the reference energy plot, named according
       to the molecule and simulation number (e.g., 'h5o3_sim_0_zpe.png').
+    - A .json file with the ZPE summary (e.g., 'h5o3_sim_0_zpe.json'),
+      if summary is True.
     """
+    if error not in ZPE_ERRORS:
+        raise ValueError(f'error must be one of {ZPE_ERRORS}')
     # Generate an array of timesteps and the average energy of the
     # ensemble at that step
     vref = sim_data.get_vref(ret_cm=True)
@@ -55,22 +82,124 @@ def plot_eref(molecule, sim_num, sim_data, start, stop):
         raise ValueError(
             f"The stop time {stop} exceeds the length of the available data"
         )
-    # Calculate the ZPE in the relevant range of time steps
-    # (while the energy is stable)
-    zpe = np.mean(vref[start:stop][:, 1])
+    with stage('eref.zpe', samples=stop - start):
+        # Calculate the ZPE in the relevant range of time steps
+        # (while the energy is stable)
+        zpe = np.mean(vref[start:stop][:, 1])
+        # Error of the ZPE, accounting for the correlation between timesteps;
+        # a window too short to estimate it is drawn without one
+        if stop - start < MIN_POINTS:
+            block_size, zpe_err = None, None
+        elif error == 'block':
+            block_size, zpe_err = block_error(vref[start:stop, 1])
+        else:
+            block_size, zpe_err = bootstrap_error(vref[start:stop, 1],
+                                                  n_boot=n_boot)
+
+    # Build the figure on its own, without pyplot's global state, so that
+    # several figures can be rendered at the same time
+    fig = new_figure()
+    ax = fig.subplots()
 
     # Plot the reference energy over time
-    plt.plot(vref[:, 0], vref[:, 1], label="Eref")
+    ax.plot(*minmax_decimate(vref[:, 0], vref[:, 1], max_points),
+            label="Eref")
 
     # Plot a horizontal line to indicate the calculated ZPE
-    plt.hlines(y=zpe, xmin=start, xmax=stop, color='tab:orange',
-               label=rf'ZPE: {zpe:.2f} cm$^-$$^1$')
-    plt.legend()
+    if zpe_err is None:
+        label = rf'ZPE: {zpe:.2f} cm$^-$$^1$'
+    else:
+        label = rf'ZPE: {zpe:.2f} $\pm$ {zpe_err:.2f} cm$^-$$^1$'
+    ax.hlines(y=zpe, xmin=start, xmax=stop, color='tab:orange', label=label)
+    ax.legend()
 
     # Add axis labels
-    plt.ylabel('Eref (cm$^{-1}$)')
-    plt.xlabel('Timestep (1 a.u.)')
+    ax.set_ylabel('Eref (cm$^{-1}$)')
+    ax.set_xlabel('Timestep (1 a.u.)')
     # Save the plot as a .png file
-    plt.savefig(f'{molecule}_sim_{sim_num}_zpe.png', bbox_inches='tight')
-    # Clear the current figure to avoid plot overlap
-    plt.clf()
+    with stage('eref.savefig'):
+        fig.savefig(os.path.join(folder, f'{molecule}_sim_{sim_num}_zpe.png'),
+                    bbox_inches='tight')
+
+    # Save the ZPE and its error in a machine-readable summary
+    if summary:
+        with open(os.path.join(folder, f'{molecule}_sim_{sim_num}_zpe.json'), 'w') as f:
+            json.dump({'molecule': molecule, 'sim_num': sim_num,
+                       'start': start, 'stop': stop,
+                       'zpe_cm-1': float(zpe), 'zpe_error_cm-1': zpe_err,
+                       'error_method': error, 'block_size': block_size},
+                      f, indent=2)
+
+
+def plot_eref_replicates(molecule, sim_nums, sim_datas, start, stop,
+                         summary=False, max_points=MAX_POINTS, folder='.'):
+    """
+    Generate and save a plot of the reference energy (Eref) of several
+    independent replicates of a molecular DMC simulation, and calculate
+    their pooled zero-point energy (ZPE) with the replicate-to-replicate
+    error.
+
+    Parameters:
+    - molecule: The molecule being analyzed (e.g., 'h5o3', 'h2o').
+    - sim_nums: The simulation numbers of the replicates.
+    - sim_datas: The pyvibdmc SimInfo instances of the replicates, in the
+      order of sim_nums.
+    - start: The starting timestep for calculating the ZPE.
+    - stop: The stopping timestep for calculating the ZPE.
+    - summary: If True, also save the pooled ZPE, its error and the ZPE of
+      every replicate in a .json file.
+    - max_points: Most points of the Eref line of each replicate drawn
+      (see plot_eref).
+    - folder: Folder the files are saved to (the working directory by
+      default).
+
+    Raises:
+    - ValueError: If there are fewer than 2 replicates, or the stop value
+    exceeds the length of the data of a replicate.
+
+    Saves:
+    - A .png file with the reference energy plot, named according to the
+      molecule and the replicates (e.g., 'h5o3_sim_0-9_zpe.png').
+    - A .json file with the ZPE summary (e.g., 'h5o3_sim_0-9_zpe.json'),
+      if summary is True.
+    """
+    for sim_num, sim_data in zip(sim_nums, sim_datas):
+        if stop > len(sim_data.get_vref(ret_cm=True)):
+            raise ValueError(
+                f"The stop time {stop} exceeds the length of the available "
+                f"data of simulation {sim_num}"
+            )
+    with stage('eref.zpe', samples=len(sim_datas) * (stop - start)):
+        zpes = replicate_zpes(sim_datas, start, stop)
+        zpe, zpe_err = pooled_zpe(zpes)
+
+    fig = new_figure()
+    ax = fig.subplots()
+
+    # Plot the reference energy of every replicate over time
+    for sim_num, sim_data in zip(sim_nums, sim_datas):
+        vref = sim_data.get_vref(ret_cm=True)
+        ax.plot(*minmax_decimate(vref[:, 0], vref[:, 1], max_points),
+                color='tab:blue', alpha=0.3, linewidth=0.5)
+    ax.plot([], [], color='tab:blue', label=f"Eref ({len(sim_nums)} replicates)")
+
+    # Plot a horizontal line to indicate the pooled ZPE
+    ax.hlines(y=zpe, xmin=start, xmax=stop, color='tab:orange',
+              label=rf'ZPE: {zpe:.2f} $\pm$ {zpe_err:.2f} cm$^-$$^1$')
+    ax.legend()
+
+    ax.set_ylabel('Eref (cm$^{-1}$)')
+    ax.set_xlabel('Timestep (1 a.u.)')
+    label = replicate_label(sim_nums)
+    with stage('eref.savefig'):
+        fig.savefig(os.path.join(folder, f'{molecule}_sim_{label}_zpe.png'),
+                    bbox_inches='tight')
+
+    if summary:
+        with open(os.path.join(folder, f'{molecule}_sim_{label}_zpe.json'), 'w') as f:
+            json.dump({'molecule': molecule, 'sim_num': list(sim_nums),
+                       'start': start, 'stop': stop,
+                       'zpe_cm-1': zpe, 'zpe_error_cm-1': zpe_err,
+                       'error_method': 'replicates',
+                       'replicate_zpes_cm-1': zpes.tolist()},
+                      f, indent=2)
@@ -11,20 +11,21 @@ Functions:
 - plot_dists: Creates and saves plots for multiple bond length distributions.
 
 Dependencies:
-- matplotlib, seaborn
+- numpy, matplotlib, seaborn
 """
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
 
-# Use a non-interactive backend
-matplotlib.use('Agg')
-# Set seaborn style
-sns.set_style("white")
+import numpy as np
+
+from pyvisdmc.utils.distances import bond_lengths
+from pyvisdmc.utils.kde import KDE_ENGINES, binned_kde
+from pyvisdmc.utils.timing import stage
+from pyvisdmc.plots.style import new_figure
 
 
 def plot_dists(molecule, sim_num, analyzer, weights, dists,
-               hist=True, line=True, exp=True):
+               hist=True, line=True, exp=True, bonds=None, store=None,
+               kde_engine='seaborn', hists=None, folder='.'):
     """
     Generate and save plots of multiple bond length distributions
     from a molecular DMC simulation. The function can plot histograms,
@@ -42,72 +43,126 @@ def plot_dists(molecule, sim_num, analyzer, weights, dists,
     - line: If True, overlay a KDE (Kernel Density Estimate) line
             on the histogram.
     - exp: If True, include vertical lines for the expectation values.
+    - bonds: Optional (distances, exp_vals) for `dists` as returned by
+            pyvisdmc.utils.bond_lengths, to reuse already computed
+            bond lengths.
+    - store: Optional pyvisdmc.utils.QuantityStore shared with the other
+            plots of the run, read from and filled instead of recomputing.
+    - kde_engine: 'seaborn' for seaborn's (unweighted) KDE, or 'binned' for
+            pyvisdmc's fast weighted KDE (see pyvisdmc.utils.binned_kde).
+    - hists: Optional list of HistogramAccumulators aligned with `dists`,
+            filled chunk by chunk (see
+            pyvisdmc.utils.accumulate_bond_histograms). The weighted
+            histograms and their KDEs are then plotted without the walkers.
+    - folder: Folder the plot is saved to (the working directory by
+            default).
 
     Raises:
-    - ValueError: If the molecule name is invalid or any atom index in `dists`
-      exceeds the number of atoms in the molecule.
+    - ValueError: If any atom index in `dists` exceeds the number of atoms
+      of the walkers, or the KDE engine is unknown.
 
     Saves:
     - A .png file with the bond length distribution plots, named according to
       the molecule and simulation number (e.g., 'h5o3_sim_0_mult_dists.png').
     """
-    # Validate the molecule and assign the number of atoms
-    if molecule == 'h5o3':
-        num_atoms = 8
-    elif molecule == 'h2o':
-        num_atoms = 3
-    else:
-        raise ValueError('Not a valid molecule name')
-    # Validate the atom indices for each bond in dists
-    for dist in dists:
-        for ind in dist:
-            if ind > num_atoms - 1:
-                raise ValueError(
-                    'Atom index exceeds number of atoms in this molecule')
+    # Validate the atom indices for each bond in dists against the number
+    # of atoms of the walkers when they are read (bond lengths and
+    # histograms passed in were computed from valid indices)
+    if bonds is None and store is None and hists is None:
+        num_atoms = analyzer.xx.shape[1]
+        for dist in dists:
+            for ind in dist:
+                if ind > num_atoms - 1:
+                    raise ValueError(
+                        'Atom index exceeds number of atoms in this molecule')
+    if kde_engine not in KDE_ENGINES:
+        raise ValueError(f'kde_engine must be one of {KDE_ENGINES}')
     print(f"Creating plot mult_dist for dists {dists} for {molecule}...")
 
-    dist_vals = []
-    exp_vals = []
+    # Calculates all the distances and their expectation values (averages)
+    # in one pass over the coordinates, unless already computed
+    if hists is not None:
+        exp_vals = [h.mean[0] for h in hists]
+    else:
+        if bonds is None and store is not None:
+            bonds = store.bond_lengths(dists)
+        elif bonds is None:
+            bonds = bond_lengths(analyzer.xx, weights, dists)
+        dist_vals, exp_vals = bonds
+
+    # seaborn is imported on first use to keep the startup fast
+    import seaborn as sns
 
-    for dist in dists:
-        # Calculates the distance between the first two atoms
-        # in the coordinates array
-        distance = analyzer.bond_length(dist[0], dist[1])
-        dist_vals.append(distance)
-        # Calculates the expectation value (average) of the quantity
-        exp_val = analyzer.exp_val(distance, weights)
-        exp_vals.append(exp_val)
-    # If hist is true, generate histograms or density plots
-    if hist:
-        if line:
-            for i in range(len(dist_vals)):
-                # Normalizes the distribution so the total probability is 1
-                sns.histplot(dist_vals[i], kde=True, bins=50, common_norm=True,
-                             label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
-                             rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
-        else:
+    # Build the figure on its own, without pyplot's global state, so that
+    # several figures can be rendered at the same time
+    fig = new_figure()
+    ax = fig.subplots()
+
+    with stage('mult_dist.density'):
+        # If hist is true, generate histograms or density plots
+        if hists is not None:
+            # Weighted histograms accumulated chunk by chunk, normalized so the
+            # total probability of each is 1
+            for i in range(len(hists)):
+                label = (rf'$\langle$r{dists[i][0]}{dists[i][1]}'
+                         rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
+                if hist:
+                    bars = ax.stairs(*hists[i].stairs(), fill=True, alpha=0.75,
+                                     label=label)
+                    if line:
+                        ax.plot(*hists[i].kde(cut=0),
+                                color=bars.get_facecolor())
+                else:
+                    ax.plot(*hists[i].kde(), linewidth=2.5, label=label)
+        elif hist:
+            if line and kde_engine == 'binned':
+                for i in range(len(dist_vals)):
+                    # Weighted KDE over the data range, scaled to the weighted
+                    # histogram like seaborn's kde=True line
+                    edges = np.histogram_bin_edges(dist_vals[i], bins=50)
+                    grid, density = binned_kde(dist_vals[i], weights, cut=0)
+                    scale = np.sum(weights) * (edges[1] - edges[0])
+                    kde_line = ax.plot(grid, density * scale)[0]
+                    sns.histplot(x=dist_vals[i], weights=weights, kde=False,
+                                 bins=50, binrange=(edges[0], edges[-1]),
+                                 common_norm=True, ax=ax,
+                                 color=kde_line.get_color(),
+                                 label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
+                                 rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
+            elif line:
+                for i in range(len(dist_vals)):
+                    # Normalizes the distribution so the total probability is 1
+                    sns.histplot(dist_vals[i], kde=True, bins=50,
+                                 common_norm=True, ax=ax,
+                                 label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
+                                 rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
+            else:
+                for i in range(len(dist_vals)):
+                    sns.histplot(dist_vals[i], kde=False, bins=50,
+                                 common_norm=True, ax=ax,
+                                 label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
+                                 rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
+        elif kde_engine == 'binned':
             for i in range(len(dist_vals)):
-                sns.histplot(dist_vals[i], kde=False, bins=50,
-                             common_norm=True,
-                             label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
-                             rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
-    else:
-        for i in range(len(dist_vals)):
-            sns.kdeplot(dist_vals[i], linewidth=2.5,
+                grid, density = binned_kde(dist_vals[i], weights)
+                ax.plot(grid, density, linewidth=2.5,
                         label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
                         rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
+        else:
+            for i in range(len(dist_vals)):
+                sns.kdeplot(dist_vals[i], linewidth=2.5, ax=ax,
+                            label=rf'$\langle$r{dists[i][0]}{dists[i][1]}'
+                            rf'$\rangle$ = {exp_vals[i]:.4f} $\AA$')
     # If exp is true, plot vertical lines for expectation values
     if exp:
         for i in range(len(exp_vals)):
-            plt.vlines(exp_vals[i], 0, 6)
+            ax.vlines(exp_vals[i], 0, 6)
     else:
         pass
     # Add legend, axis labels, and save the plot
-    plt.legend()
-    plt.xlabel(r'Bond Length ($\AA$)')
-    plt.ylabel('Probability Amplitude')
-    plt.savefig(f'{molecule}_sim_{sim_num}_mult_dists.png',
-                bbox_inches='tight')
-
-    # Clear the current figure to avoid plot overlap
-    plt.clf()
+    ax.legend()
+    ax.set_xlabel(r'Bond Length ($\AA$)')
+    ax.set_ylabel('Probability Amplitude')
+    with stage('mult_dist.savefig'):
+        fig.savefig(os.path.join(folder, f'{molecule}_sim_{sim_num}_mult_dists.png'),
+                    bbox_inches='tight')
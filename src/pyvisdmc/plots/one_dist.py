@@ -10,26 +10,27 @@ Functions:
 - plot_dist: Creates and saves a plot for a single bond length distribution.
 
 Dependencies:
-- matplotlib, seaborn
+- numpy, matplotlib, seaborn
 """
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
 
-# Use a non-interactive backend
-matplotlib.use('Agg')
-# Set seaborn style
-sns.set_style("white")
+import numpy as np
+
+from pyvisdmc.utils.distances import bond_lengths
+from pyvisdmc.utils.kde import KDE_ENGINES, binned_kde
+from pyvisdmc.utils.timing import stage
+from pyvisdmc.plots.style import new_figure
 
 
 def plot_dist(molecule, analyzer, weights, dist,
-              hist=True, line=True, exp=True):
+              hist=True, line=True, exp=True, bonds=None, store=None,
+              kde_engine='seaborn', hists=None, folder='.'):
     """
     Generate and save a plot of a bond length distribution from
     a molecular DMC simulation.
 
     Parameters:
-    - molecule: The molecule being analyzed ('h5o3' or 'h2o').
+    - molecule: The molecule being analyzed (e.g., 'h5o3', 'h2o').
     - analyzer: An instance of pyvibdmc's AnalyzeWfn class,
         used to analyze wavefunctions.
     - weights: Weights associated with the molecular geometries.
@@ -38,55 +39,107 @@ def plot_dist(molecule, analyzer, weights, dist,
     - line: If True, overlay a KDE (Kernel Density Estimate)
         line on the histogram.
     - exp: If True, include a vertical line for the expectation value.
+    - bonds: Optional (distances, exp_vals) for [dist] as returned by
+        pyvisdmc.utils.bond_lengths, to reuse already computed bond lengths.
+    - store: Optional pyvisdmc.utils.QuantityStore shared with the other
+        plots of the run, read from and filled instead of recomputing.
+    - kde_engine: 'seaborn' for seaborn's (unweighted) KDE, or 'binned'
+        for pyvisdmc's fast weighted KDE (see pyvisdmc.utils.binned_kde).
+    - hists: Optional [HistogramAccumulator] for dist, filled chunk by
+        chunk (see pyvisdmc.utils.accumulate_bond_histograms). The weighted
+        histogram and its KDE are then plotted without the walkers.
+    - folder: Folder the plot is saved to (the working directory by
+        default).
 
     Raises:
-    - ValueError: If the molecule name is invalid or the atom indices
-        exceed the number of atoms.
+    - ValueError: If the atom indices exceed the number of atoms of the
+        walkers, or the KDE engine is unknown.
 
     Saves:
     - A .png file with the bond length distribution plot, named based
     on the molecule and bond indices.
     """
-    # Validate the molecule and assign the number of atoms
-    if molecule == 'h5o3':
-        num_atoms = 8
-    elif molecule == 'h2o':
-        num_atoms = 3
-    else:
-        raise ValueError('Not a valid molecule name')
-    # Validate the atom indices
-    for ind in dist:
-        if ind > num_atoms - 1:
-            raise ValueError(
-                'Atom index exceeds number of atoms in this molecule')
+    # Validate the atom indices against the number of atoms of the walkers
+    # when they are read (bond lengths and histograms passed in were
+    # computed from valid indices)
+    if bonds is None and store is None and hists is None:
+        num_atoms = analyzer.xx.shape[1]
+        for ind in dist:
+            if ind > num_atoms - 1:
+                raise ValueError(
+                    'Atom index exceeds number of atoms in this molecule')
+    if kde_engine not in KDE_ENGINES:
+        raise ValueError(f'kde_engine must be one of {KDE_ENGINES}')
     print(f"Creating plot one_dist for dist {dist} for {molecule}...")
-    # Calculate the distance between the first two atoms
-    # in the coordinates array
-    distance = analyzer.bond_length(dist[0], dist[1])
-    # Calculates the expectation value (average) of the quantity
-    exp_val = analyzer.exp_val(distance, weights)
+    # Calculate the distance between the two atoms and its
+    # expectation value (average), unless already computed
+    if hists is not None:
+        exp_val = hists[0].mean[0]
+    else:
+        if bonds is None and store is not None:
+            bonds = store.bond_lengths([dist])
+        elif bonds is None:
+            bonds = bond_lengths(analyzer.xx, weights, [dist])
+        distance = bonds[0][0]
+        exp_val = bonds[1][0]
 
-    # Generate histogram or density plot
-    if hist:
-        if line:
-            # Normalizes the distribution so the total probability is 1
-            sns.histplot(distance, kde=True, bins=50,
-                         label=rf'$\langle${dist[0]}{dist[1]}$\rangle$ '
-                         rf'= {exp_val:.4f} $\AA$')
+    # seaborn is imported on first use to keep the startup fast
+    import seaborn as sns
+
+    # Build the figure on its own, without pyplot's global state, so that
+    # several figures can be rendered at the same time
+    fig = new_figure()
+    ax = fig.subplots()
+
+    with stage('one_dist.density'):
+        # Generate histogram or density plot
+        if hists is not None:
+            # Weighted histogram accumulated chunk by chunk, normalized so the
+            # total probability is 1
+            if hist:
+                bars = ax.stairs(*hists[0].stairs(), fill=True,
+                                 alpha=0.75,
+                                 label=rf'$\langle${dist[0]}{dist[1]}'
+                                 rf'$\rangle$ = {exp_val:.4f} $\AA$')
+                if line:
+                    ax.plot(*hists[0].kde(cut=0), color=bars.get_facecolor())
+            else:
+                ax.plot(*hists[0].kde(), label=f'{dist[0]}{dist[1]}')
+        elif hist:
+            if line and kde_engine == 'binned':
+                # Weighted KDE over the data range, scaled to the weighted
+                # histogram like seaborn's kde=True line
+                edges = np.histogram_bin_edges(distance, bins=50)
+                grid, density = binned_kde(distance, weights, cut=0)
+                scale = np.sum(weights) * (edges[1] - edges[0])
+                kde_line = ax.plot(grid, density * scale)[0]
+                sns.histplot(x=distance, weights=weights, kde=False,
+                             bins=50, binrange=(edges[0], edges[-1]), ax=ax,
+                             color=kde_line.get_color(),
+                             label=rf'$\langle${dist[0]}{dist[1]}$\rangle$ '
+                             rf'= {exp_val:.4f} $\AA$')
+            elif line:
+                # Normalizes the distribution so the total probability is 1
+                sns.histplot(distance, kde=True, bins=50, ax=ax,
+                             label=rf'$\langle${dist[0]}{dist[1]}$\rangle$ '
+                             rf'= {exp_val:.4f} $\AA$')
+            else:
+                sns.histplot(distance, kde=False, bins=50, ax=ax,
+                             label=rf'$\langle${dist[0]}{dist[1]}$\rangle$ '
+                             rf'= {exp_val:.4f} $\AA$')
+        elif kde_engine == 'binned':
+            grid, density = binned_kde(distance, weights)
+            ax.plot(grid, density, label=f'{dist[0]}{dist[1]}')
         else:
-            sns.histplot(distance, kde=False, bins=50,
-                         label=rf'$\langle${dist[0]}{dist[1]}$\rangle$ '
-                         rf'= {exp_val:.4f} $\AA$')
-    else:
-        sns.kdeplot(distance, label=f'{dist[0]}{dist[1]}')
+            sns.kdeplot(distance, ax=ax, label=f'{dist[0]}{dist[1]}')
 
     # Plot the average value in a vertical line
     if exp:
-        plt.vlines(exp_val, 0, 6)
+        ax.vlines(exp_val, 0, 6)
     # Add labels and save the plot
-    plt.xlabel(r'Bond Length ($\AA$)')
-    plt.ylabel('Probability Amplitude')
-    plt.legend()
-    plt.savefig(f'{molecule}_{dist[0]}{dist[1]}_dist.png', bbox_inches='tight')
-    # Clear the current figure to avoid overlapping plots
-    plt.clf()
+    ax.set_xlabel(r'Bond Length ($\AA$)')
+    ax.set_ylabel('Probability Amplitude')
+    ax.legend()
+    with stage('one_dist.savefig'):
+        fig.savefig(os.path.join(folder, f'{molecule}_{dist[0]}{dist[1]}_dist.png'),
+                    bbox_inches='tight')
@@ -0,0 +1,64 @@
+"""
+render.py
+
+This module provides a function to render several independent figures
+at the same time. The plotting functions build their figures through
+matplotlib's object-oriented Figure API and share no global pyplot state,
+so each of them can be drawn and saved as a PNG in its own worker process.
+
+Functions:
+- render: Runs a list of plotting tasks, one after another or in a
+  process pool.
+
+Dependencies:
+- concurrent.futures, multiprocessing
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Tasks seen by the worker processes of a parallel render
+_tasks = []
+
+
+def _run_task(index):
+    return _tasks[index]()
+
+
+def render(tasks, jobs=1):
+    """
+    Run independent plotting tasks, using up to `jobs` processes.
+
+    Parameters:
+    - tasks: List of callables taking no arguments (e.g.,
+      functools.partial(plot_eref, molecule, sim_num, sim_data, start, stop)).
+    - jobs: Number of figures rendered at the same time.
+
+    Raises:
+    - ValueError: If jobs is not a positive integer.
+    - Any exception raised by a task.
+
+    Returns:
+    - A list with the return value of each task, in the order of `tasks`.
+    """
+    if not isinstance(jobs, int) or jobs < 1:
+        raise ValueError('jobs must be a positive integer')
+
+    if jobs == 1 or len(tasks) < 2:
+        return [task() for task in tasks]
+
+    jobs = min(jobs, len(tasks))
+    if 'fork' in multiprocessing.get_all_start_methods():
+        # Forked workers inherit the tasks, so the data they plot is never
+        # pickled
+        _tasks[:] = tasks
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=jobs,
+                    mp_context=multiprocessing.get_context('fork')) as pool:
+                return list(pool.map(_run_task, range(len(tasks))))
+        finally:
+            _tasks.clear()
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(task) for task in tasks]
+        return [future.result() for future in futures]
@@ -0,0 +1,36 @@
+"""
+style.py
+
+This module creates the figures of the plotting functions. Importing
+matplotlib and seaborn takes most of the startup time of the command line
+tool, so they are only imported, and the seaborn style is only applied,
+when the first figure is created.
+
+Functions:
+- new_figure: Returns an empty matplotlib Figure in the package style.
+
+Dependencies:
+- matplotlib, seaborn
+"""
+_styled = False
+
+
+def new_figure():
+    """
+    Create an empty figure, without pyplot's global state, so that several
+    figures can be rendered at the same time.
+
+    Returns:
+    - A matplotlib Figure.
+    """
+    global _styled
+    from matplotlib.figure import Figure
+    if not _styled:
+        import matplotlib
+        import seaborn as sns
+        # Use a non-interactive backend
+        matplotlib.use('Agg')
+        # Set seaborn style
+        sns.set_style("white")
+        _styled = True
+    return Figure()
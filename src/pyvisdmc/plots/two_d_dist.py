@@ -10,19 +10,19 @@ Functions:
 - plot_2d: Creates and saves a 2D histogram for two bond length distributions.
 
 Dependencies:
-- matplotlib, seaborn
+- numpy, matplotlib, seaborn
 """
-import matplotlib
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
 
-# Use a non-interactive backend
-matplotlib.use('Agg')
-# Set seaborn style
-sns.set_style("white")
+import numpy as np
 
+from pyvisdmc.utils.distances import bond_lengths
+from pyvisdmc.utils.timing import stage
+from pyvisdmc.plots.style import new_figure
 
-def plot_2d(molecule, sim_num, analyzer, weights, dists, exp=True):
+
+def plot_2d(molecule, sim_num, analyzer, weights, dists, exp=True,
+            bonds=None, store=None, hist2d=None, folder='.'):
     """
     Generate and save a 2D histogram of two bond length distributions from a
     molecular DMC simulation. The function calculates the expectation value
@@ -38,63 +38,87 @@ def plot_2d(molecule, sim_num, analyzer, weights, dists, exp=True):
     [[0, 1], [2, 3]]).
     - exp: If True, plot the expectation value (average) of each bond length
     on the 2D histogram.
+    - bonds: Optional (distances, exp_vals) for `dists` as returned by
+    pyvisdmc.utils.bond_lengths, to reuse already computed bond lengths.
+    - store: Optional pyvisdmc.utils.QuantityStore shared with the other
+    plots of the run, read from and filled instead of recomputing.
+    - hist2d: Optional 2D HistogramAccumulator for `dists`, filled chunk by
+    chunk (see pyvisdmc.utils.accumulate_bond_histograms). The weighted 2D
+    histogram is then plotted without the walkers.
+    - folder: Folder the plot is saved to (the working directory by
+    default).
 
     Raises:
-    - ValueError: If the molecule name is invalid, the atom indices exceed
-      the number of atoms in the molecule, or if the `dists` list does not
-      contain exactly two pairs of indices.
+    - ValueError: If the atom indices exceed the number of atoms of the
+      walkers, or if the `dists` list does not contain exactly two pairs of
+      indices.
 
     Saves:
     - A .png file with the 2D bond length distribution plot, named according
       to the molecule and simulation number (e.g., 'h5o3_sim_0_2d.png').
     """
-    # Validate the molecule and assign the number of atoms
-    if molecule == 'h5o3':
-        num_atoms = 8
-    elif molecule == 'h2o':
-        num_atoms = 3
-    else:
-        raise ValueError('Not a valid molecule name')
-    # Validate the atom indices for each bond in dists
-    for dist in dists:
-        for ind in dist:
-            if ind > num_atoms - 1:
-                raise ValueError(
-                    'Atom index exceeds number of atoms in this molecule')
+    # Validate the atom indices for each bond in dists against the number
+    # of atoms of the walkers when they are read (bond lengths and
+    # histograms passed in were computed from valid indices)
+    if bonds is None and store is None and hist2d is None:
+        num_atoms = analyzer.xx.shape[1]
+        for dist in dists:
+            for ind in dist:
+                if ind > num_atoms - 1:
+                    raise ValueError(
+                        'Atom index exceeds number of atoms in this molecule')
     # Ensure that 'dists' contains exactly two pairs of atom indices
     if len(dists) != 2:
         raise ValueError('"dists" must be a list of two pairs of atom indices')
     print(f"Creating plot two_d_dist for dists {dists} for {molecule}...")
 
-    dist_vals = []
-    exp_vals = []
-
     # Calculate distances between atoms and their expected values
-    for dist in dists:
-        # Calculates the distance between the first two atoms
-        # in the coordinates array
-        distance = analyzer.bond_length(dist[0], dist[1])
-        dist_vals.append(distance)
+    # in one pass over the coordinates, unless already computed
+    if hist2d is not None:
+        exp_vals = hist2d.mean
+        # raises a clear error if hist_range misses every sample
+        xlim, ylim = hist2d.filled_limits()
+    else:
+        if bonds is None and store is not None:
+            bonds = store.bond_lengths(dists)
+        elif bonds is None:
+            bonds = bond_lengths(analyzer.xx, weights, dists)
+        dist_vals, exp_vals = bonds
+
+    # seaborn is imported on first use to keep the startup fast
+    import seaborn as sns
 
-        # Calculates the expectation value (average) of the quantity
-        exp_val = analyzer.exp_val(distance, weights)
-        exp_vals.append(exp_val)
+    # Build the figure on its own, without pyplot's global state, so that
+    # several figures can be rendered at the same time
+    fig = new_figure()
+    ax = fig.subplots()
 
-    # Create 2D histogram of bond distances
-    sns.histplot(x=dist_vals[0], y=dist_vals[1], cbar=True)
+    with stage('two_d_dist.density'):
+        # Create 2D histogram of bond distances
+        if hist2d is not None:
+            # Weighted histogram accumulated chunk by chunk; empty bins are
+            # left blank like in seaborn's histplot
+            counts = np.ma.masked_equal(hist2d.counts, 0)
+            mesh = ax.pcolormesh(hist2d.edges[0], hist2d.edges[1], counts.T,
+                                 cmap=sns.light_palette('C0', as_cmap=True))
+            fig.colorbar(mesh, ax=ax)
+            ax.set_xlim(*xlim)
+            ax.set_ylim(*ylim)
+        else:
+            sns.histplot(x=dist_vals[0], y=dist_vals[1], cbar=True, ax=ax)
 
     # Plot the expectation values as a point on the 2D plot
     if exp:
-        plt.scatter(exp_vals[0], exp_vals[1],
-                    color='red',
-                    label='Exp. Vals.')
-        plt.legend()
+        ax.scatter(exp_vals[0], exp_vals[1],
+                   color='red',
+                   label='Exp. Vals.')
+        ax.legend()
     else:
         pass
 
     # Add axis labels and save the plot
-    plt.xlabel(rf'{dists[0][0]}{dists[0][1]} Distance ($\AA$)')
-    plt.ylabel(rf'{dists[1][0]}{dists[1][1]} Distance ($\AA$)')
-    plt.savefig(f'{molecule}_sim_{sim_num}_2d.png', bbox_inches='tight')
-    # Clear the current figure to avoid plot overlap
-    plt.clf()
+    ax.set_xlabel(rf'{dists[0][0]}{dists[0][1]} Distance ($\AA$)')
+    ax.set_ylabel(rf'{dists[1][0]}{dists[1][1]} Distance ($\AA$)')
+    with stage('two_d_dist.savefig'):
+        fig.savefig(os.path.join(folder, f'{molecule}_sim_{sim_num}_2d.png'),
+                    bbox_inches='tight')
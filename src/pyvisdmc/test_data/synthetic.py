@@ -0,0 +1,130 @@
+"""
+synthetic.py
+
+This module writes synthetic simulations in the layout of PyVibDMC, for
+tests and benchmarks of any size. A simulation is a
+<NAME>_<sim>_sim_info.hdf5 file (with 'vref_vs_tau', 'pop_vs_tau',
+'atomic_nums' and 'atomic_masses') and a wfns/ folder with one
+<NAME>_<sim>_wfn_<N>ts.hdf5 file per snapshot (with 'coords' in Bohr and
+'desc_wts'), inside a 1.0w_<walkers>_walkers_<timesteps>t_1dt folder.
+
+The walkers are Gaussian displacements of a reference geometry, with
+log-normal weights, and Eref relaxes exponentially to a plateau with
+correlated noise, so every plot of PyVisDMC has something to show. The
+walkers are generated and written one chunk at a time, so simulations of
+10^7 walkers do not need to fit in memory.
+
+Functions:
+- write_simulation: Writes one synthetic simulation.
+
+Dependencies:
+- numpy, h5py
+"""
+import os
+
+import numpy as np
+
+# Walkers generated and written at a time
+CHUNK_WALKERS = 1000000
+# Atomic numbers and masses (in atomic units) of the atoms: one oxygen
+# followed by hydrogens
+_OXYGEN = (8, 29156.94616616)
+_HYDROGEN = (1, 1837.15267275)
+# Plateau of Eref, its relaxation time and noise, in Hartree and timesteps
+_ZPE = 0.0205
+_RELAXATION = 500
+_NOISE = 0.0004
+
+
+def _reference_geometry(atoms, rng):
+    # a chain of atoms 1.6 to 2.4 Bohr apart, so that every bond length is
+    # well defined and the bonds can be told apart
+    geometry = np.zeros((atoms, 3))
+    for i in range(1, atoms):
+        step = rng.normal(size=3)
+        geometry[i] = (geometry[i - 1]
+                       + rng.uniform(1.6, 2.4) * step / np.linalg.norm(step))
+    return geometry - geometry.mean(axis=0)
+
+
+def _eref(timesteps, rng):
+    # white noise smoothed by a decaying exponential (a truncated AR(1)
+    # filter), so that the series is correlated like a real Eref
+    kernel = 0.9 ** np.arange(64)
+    noise = np.convolve(rng.normal(scale=_NOISE, size=timesteps), kernel)
+    tau = np.arange(timesteps)
+    return _ZPE + 0.01 * np.exp(-tau / _RELAXATION) + 0.2 * noise[:timesteps]
+
+
+def write_simulation(data_path, molecule='syn', sim_num=0, walkers=5000,
+                     atoms=3, timesteps=20000, snapshots=10, seed=0):
+    """
+    Write a synthetic simulation in the layout of PyVibDMC.
+
+    Parameters:
+    - data_path: Folder the simulation is written under.
+    - molecule: Name of the molecule (its upper case is used in the file
+      names, e.g. SYN_0_sim_info.hdf5).
+    - sim_num: The simulation number.
+    - walkers: Number of walkers of every snapshot.
+    - atoms: Number of atoms (at least 2).
+    - timesteps: Number of timesteps of the Eref series.
+    - snapshots: Number of wavefunction snapshots, evenly spaced from
+      timestep 0.
+    - seed: Seed of the random numbers, so that the data are the same
+      from run to run.
+
+    Raises:
+    - ValueError: If a size is not a positive integer, there are fewer
+      than 2 atoms, or more snapshots than timesteps.
+
+    Returns:
+    - Dictionary with the 'sim_info' path, the 'snapshots' timesteps and
+      the 'walkers', 'atoms' and 'timesteps' of the simulation.
+    """
+    import h5py
+
+    for name, value in [('walkers', walkers), ('atoms', atoms),
+                        ('timesteps', timesteps), ('snapshots', snapshots)]:
+        if not isinstance(value, (int, np.integer)) or value < 1:
+            raise ValueError(f'{name} must be a positive integer')
+    if atoms < 2:
+        raise ValueError('At least 2 atoms are needed for bond lengths')
+    if snapshots > timesteps:
+        raise ValueError('There cannot be more snapshots than timesteps')
+
+    rng = np.random.default_rng(seed)
+    folder = os.path.join(data_path,
+                          f'1.0w_{walkers}_walkers_{timesteps}t_1dt')
+    os.makedirs(os.path.join(folder, 'wfns'), exist_ok=True)
+    prefix = f'{molecule.upper()}_{sim_num}_'
+    sim_info = os.path.join(folder, prefix + 'sim_info.hdf5')
+
+    tau = np.arange(timesteps, dtype=np.float64)
+    pop = walkers + np.round(rng.normal(scale=0.01 * walkers, size=timesteps))
+    nums, masses = zip(*([_OXYGEN] + [_HYDROGEN] * (atoms - 1)))
+    with h5py.File(sim_info, 'w') as f:
+        f.create_dataset('vref_vs_tau',
+                         data=np.column_stack((tau, _eref(timesteps, rng))))
+        f.create_dataset('pop_vs_tau', data=np.column_stack((tau, pop)))
+        f.create_dataset('atomic_nums', data=np.array(nums, dtype=np.int64))
+        f.create_dataset('atomic_masses', data=np.array(masses))
+
+    geometry = _reference_geometry(atoms, rng)
+    interval = timesteps // snapshots
+    written = [i * interval for i in range(snapshots)]
+    for ts in written:
+        path = os.path.join(folder, 'wfns', f'{prefix}wfn_{ts}ts.hdf5')
+        with h5py.File(path, 'w') as f:
+            coords = f.create_dataset('coords', shape=(walkers, atoms, 3),
+                                      dtype=np.float64)
+            weights = f.create_dataset('desc_wts', shape=(walkers,),
+                                       dtype=np.float64)
+            for lo in range(0, walkers, CHUNK_WALKERS):
+                hi = min(lo + CHUNK_WALKERS, walkers)
+                coords[lo:hi] = geometry + rng.normal(scale=0.2,
+                                                      size=(hi - lo, atoms, 3))
+                weights[lo:hi] = rng.lognormal(sigma=0.5, size=hi - lo)
+
+    return {'sim_info': sim_info, 'snapshots': written, 'walkers': walkers,
+            'atoms': atoms, 'timesteps': timesteps}
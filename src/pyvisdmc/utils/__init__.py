@@ -1 +1,59 @@
-from .data_loader import load_data, sim_info
+"""Initialize utils module
+
+The functions are imported from their modules the first time they are
+used, so that importing the package (e.g., to start the command line
+tool) does not pay for h5py and pyvibdmc.
+"""
+import importlib
+
+_EXPORTS = {
+    'load_data': 'data_loader', 'sim_info': 'data_loader',
+    'iter_sim_info': 'data_loader',
+    'cache_key': 'cache', 'load_cached': 'cache', 'store_cached': 'cache',
+    'evict': 'cache',
+    'read_wfns': 'wfn_reader', 'wfn_shapes': 'wfn_reader',
+    'iter_wfns': 'wfn_reader',
+    'bond_lengths': 'distances', 'all_bond_lengths': 'distances',
+    'QuantityStore': 'store',
+    'binned_kde': 'kde', 'kde_bandwidth': 'kde',
+    'HistogramAccumulator': 'histogram', 'bin_edges': 'histogram',
+    'accumulate_bond_histograms': 'histogram',
+    'block_errors': 'blocking', 'block_error': 'blocking',
+    'bootstrap_error': 'blocking',
+    'mser': 'equilibration',
+    'Catalog': 'catalog', 'find_simulation': 'catalog',
+    'window_snapshots': 'catalog',
+    'parse_sim_nums': 'replicates', 'replicate_label': 'replicates',
+    'replicate_zpes': 'replicates', 'pooled_zpe': 'replicates',
+    'pool_bond_histograms': 'replicates',
+    'Pipeline': 'pipeline',
+    'minmax_decimate': 'decimate',
+    'packed_path': 'packed', 'pack_snapshots': 'packed',
+    'packed_snapshots': 'packed', 'load_packed': 'packed',
+    'iter_packed': 'packed', 'stale_snapshots': 'packed',
+    'packed_rows': 'packed',
+    'systematic_resample': 'resample', 'preview_walkers': 'resample',
+    'sampling_errors': 'resample',
+    'SnapshotHistograms': 'watch',
+    'OutputIndex': 'outputs', 'file_stamps': 'outputs',
+    'fingerprint': 'outputs',
+    'Trace': 'timing', 'stage': 'timing',
+    'parse_memory': 'memory', 'peak_rss': 'memory',
+    'snapshot_walkers': 'memory', 'walker_bytes': 'memory',
+    'plan_chunks': 'memory',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__),
+                    name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
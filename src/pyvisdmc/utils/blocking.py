@@ -0,0 +1,144 @@
+"""
+blocking.py
+
+This module provides statistical error bars for the mean of a correlated
+time series, such as the reference energy (Eref) of a DMC simulation.
+
+The blocking method of Flyvbjerg and Petersen groups the series into
+blocks of 1, 2, 4, ... consecutive points and computes the standard error
+of the mean of the block averages for every block size. The block
+averages of all sizes are read off a single prefix sum of the series, so
+the whole analysis costs O(n) memory and O(n) time. Once the blocks are
+longer than the correlation time, the estimate stops growing and the
+plateau value is the error of the mean.
+
+An optional block bootstrap resamples the block averages in batches of
+vectorized draws.
+
+Functions:
+- block_errors: Standard error of the mean for every block size.
+- block_error: Plateau of the blocking analysis.
+- bootstrap_error: Block bootstrap estimate of the error of the mean.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+# Fewest blocks for which a blocking estimate is trusted
+MIN_BLOCKS = 16
+# Fewest points of a series the blocking analysis is run on
+MIN_POINTS = 4
+
+
+def _block_means(csum, block_size):
+    n_blocks = (len(csum) - 1) // block_size
+    ends = csum[block_size:n_blocks * block_size + 1:block_size]
+    starts = csum[0:(n_blocks - 1) * block_size + 1:block_size]
+    return (ends - starts) / block_size
+
+
+def block_errors(series):
+    """
+    Run the blocking analysis of a time series.
+
+    Parameters:
+    - series: 1D array of consecutive measurements (e.g., Eref values).
+
+    Raises:
+    - ValueError: If the series has fewer than MIN_POINTS points.
+
+    Returns:
+    - block_sizes: Array of block sizes 1, 2, 4, ... (at least 2 blocks
+      each).
+    - errors: Standard error of the mean for each block size.
+    - error_errors: Uncertainty of each error estimate,
+      errors / sqrt(2 * (blocks - 1)).
+    """
+    x = np.asarray(series, dtype=np.float64)
+    n = len(x)
+    if n < MIN_POINTS:
+        raise ValueError(f'At least {MIN_POINTS} points are needed for block averaging')
+
+    # every block average is a difference of two prefix sums
+    csum = np.concatenate(([0.0], np.cumsum(x - np.mean(x))))
+    block_sizes = 2 ** np.arange(int(np.log2(n // 2)) + 1)
+
+    errors = np.empty(len(block_sizes))
+    n_blocks = n // block_sizes
+    for k, size in enumerate(block_sizes):
+        means = _block_means(csum, size)
+        errors[k] = np.sqrt(np.var(means, ddof=1) / n_blocks[k])
+    error_errors = errors / np.sqrt(2 * (n_blocks - 1))
+
+    return block_sizes, errors, error_errors
+
+
+def block_error(series, min_blocks=MIN_BLOCKS):
+    """
+    Estimate the error of the mean of a correlated time series from the
+    plateau of the blocking analysis.
+
+    The plateau is the first block size whose error agrees with the error
+    of the next block size within its own uncertainty. If no plateau is
+    reached before fewer than min_blocks blocks are left, the largest
+    trusted estimate is returned (a lower bound on the error).
+
+    Parameters:
+    - series: 1D array of consecutive measurements (e.g., Eref values).
+    - min_blocks: Fewest blocks for which an estimate is trusted.
+
+    Returns:
+    - block_size: Block size of the selected estimate.
+    - error: Standard error of the mean.
+    """
+    block_sizes, errors, error_errors = block_errors(series)
+    trusted = np.nonzero(len(series) // block_sizes >= min_blocks)[0]
+    last = trusted[-1] if len(trusted) else 0
+
+    converged = np.nonzero(errors[1:last + 1] - errors[:last]
+                           <= error_errors[:last])[0]
+    k = converged[0] if len(converged) else last
+
+    return int(block_sizes[k]), float(errors[k])
+
+
+def bootstrap_error(series, block_size=None, n_boot=1000, seed=None,
+                    batch_size=10_000_000):
+    """
+    Estimate the error of the mean of a correlated time series with a
+    block bootstrap: the block averages are resampled with replacement
+    and the spread of the resampled means is the error.
+
+    Parameters:
+    - series: 1D array of consecutive measurements (e.g., Eref values).
+    - block_size: Length of the resampled blocks. The plateau block size of
+      block_error is used if None.
+    - n_boot: Number of bootstrap samples.
+    - seed: Seed of the random number generator.
+    - batch_size: Maximum number of resampled block indices drawn at
+      once, which bounds the memory used.
+
+    Returns:
+    - block_size: Block size used.
+    - error: Bootstrap standard error of the mean.
+    """
+    x = np.asarray(series, dtype=np.float64)
+    if block_size is None:
+        block_size, _ = block_error(x)
+    csum = np.concatenate(([0.0], np.cumsum(x)))
+    means = _block_means(csum, block_size)
+    n_blocks = len(means)
+    if n_boot < 2 or n_blocks < 2:
+        raise ValueError('At least 2 bootstrap samples of 2 blocks are '
+                         'needed')
+
+    rng = np.random.default_rng(seed)
+    boot = np.empty(n_boot)
+    per_batch = max(1, batch_size // n_blocks)
+    for lo in range(0, n_boot, per_batch):
+        hi = min(lo + per_batch, n_boot)
+        idx = rng.integers(0, n_blocks, size=(hi - lo, n_blocks))
+        boot[lo:hi] = means[idx].mean(axis=1)
+
+    return int(block_size), float(np.std(boot, ddof=1))
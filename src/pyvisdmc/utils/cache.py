@@ -0,0 +1,195 @@
+"""
+cache.py
+
+This module provides a persistent, content-addressed on-disk cache for
+walker ensembles that have already been loaded and converted to Angstroms.
+Each entry is keyed by the sim_info file, the modification times and sizes
+of the wavefunction files it was built from, the list of snapshots, the
+units and the precision, and stores the coordinates and weights as plain .npy files so that
+warm runs can memory-map them instead of decoding HDF5 and converting units.
+
+The cache has a size cap; when it is exceeded, the least recently used
+entries are evicted first.
+
+Functions:
+- cache_key: Builds the content-addressed key for a set of snapshots.
+- load_cached: Returns memory-mapped coordinates and weights for a key.
+- store_cached: Saves coordinates and weights under a key and evicts old
+  entries.
+- evict: Removes least recently used entries until the cache fits its cap.
+
+Dependencies:
+- numpy
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# Default location and size cap of the cache
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'pyvisdmc')
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3
+
+_COORDS_FILE = 'coords.npy'
+_WEIGHTS_FILE = 'weights.npy'
+
+
+def cache_key(sim_info_path, wfn_files, snapshots, units, dtype='float64'):
+    """
+    Build the content-addressed key of a loaded walker ensemble.
+
+    Parameters:
+    - sim_info_path: Path to the simulation's sim_info .hdf5 file.
+    - wfn_files: Paths to the wavefunction files the ensemble is read from.
+    - snapshots: The timesteps of the snapshots in the ensemble.
+    - units: The units the coordinates are converted to (e.g., 'angstroms').
+    - dtype: The floating point type of the coordinates (e.g., 'float32').
+
+    Raises:
+    - ValueError: If one of the wavefunction files does not exist.
+
+    Returns:
+    - A hexadecimal string identifying the ensemble.
+    """
+    files = []
+    for wfn_file in wfn_files:
+        if not os.path.isfile(wfn_file):
+            raise ValueError(f'Wavefunction file {wfn_file} does not exist')
+        stat = os.stat(wfn_file)
+        files.append([os.path.abspath(wfn_file), stat.st_mtime_ns, stat.st_size])
+
+    fingerprint = {
+        'sim_info': os.path.abspath(sim_info_path),
+        'wfns': files,
+        'snapshots': [int(s) for s in snapshots],
+        'units': units,
+        'dtype': str(np.dtype(dtype)),
+    }
+    encoded = json.dumps(fingerprint, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def load_cached(cache_dir, key):
+    """
+    Look up a walker ensemble in the cache.
+
+    Parameters:
+    - cache_dir: Directory holding the cache entries.
+    - key: The key returned by cache_key.
+
+    Returns:
+    - (coords, weights) as read-only memory-mapped arrays, or None if the
+      entry is not in the cache.
+    """
+    entry = os.path.join(cache_dir, key)
+    coords_file = os.path.join(entry, _COORDS_FILE)
+    weights_file = os.path.join(entry, _WEIGHTS_FILE)
+    if not (os.path.isfile(coords_file) and os.path.isfile(weights_file)):
+        return None
+
+    try:
+        coords = np.load(coords_file, mmap_mode='r')
+        weights = np.load(weights_file, mmap_mode='r')
+        # Mark the entry as recently used for LRU eviction
+        os.utime(entry)
+    except OSError:
+        # evicted by another process in the meantime
+        return None
+
+    return coords, weights
+
+
+def store_cached(cache_dir, key, coords, weights,
+                 max_bytes=DEFAULT_CACHE_SIZE):
+    """
+    Save a walker ensemble in the cache and evict old entries if the cache
+    grows past its size cap.
+
+    Parameters:
+    - cache_dir: Directory holding the cache entries.
+    - key: The key returned by cache_key.
+    - coords: Coordinates array of shape (walkers, atoms, 3).
+    - weights: Weights array of shape (walkers,).
+    - max_bytes: Size cap of the whole cache in bytes.
+
+    Returns:
+    - (coords, weights) as read-only memory-mapped arrays backed by the
+      cache entry.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = os.path.join(cache_dir, key)
+
+    # Write into a temporary directory first so that an interrupted run
+    # never leaves a half-written entry behind, then rename it into place.
+    # Keys are content-addressed, so when another process (e.g., a batch
+    # worker) stored the same key first, its entry is as good as ours and
+    # the rename, which fails onto a non-empty directory, is dropped
+    tmp_entry = tempfile.mkdtemp(dir=cache_dir, prefix='.tmp-')
+    try:
+        np.save(os.path.join(tmp_entry, _COORDS_FILE), np.asarray(coords))
+        np.save(os.path.join(tmp_entry, _WEIGHTS_FILE), np.asarray(weights))
+        os.replace(tmp_entry, entry)
+    except OSError:
+        if not os.path.isdir(entry):
+            raise
+    finally:
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    evict(cache_dir, max_bytes, keep=key)
+
+    cached = load_cached(cache_dir, key)
+    if cached is None:
+        # evicted by another process right away
+        return np.asarray(coords), np.asarray(weights)
+    return cached
+
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, f))
+               for f in os.listdir(entry))
+
+
+def evict(cache_dir, max_bytes, keep=None):
+    """
+    Remove the least recently used cache entries until the cache fits
+    within max_bytes.
+
+    Parameters:
+    - cache_dir: Directory holding the cache entries.
+    - max_bytes: Size cap of the whole cache in bytes.
+    - keep: Optional key that is never evicted (e.g., the entry just
+      written).
+
+    Returns:
+    - A list of the evicted keys.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        entry = os.path.join(cache_dir, name)
+        if name.startswith('.') or not os.path.isdir(entry):
+            continue
+        try:
+            entries.append((os.path.getmtime(entry), name, _entry_size(entry)))
+        except OSError:
+            # removed by another process while listing
+            continue
+
+    total = sum(size for _, _, size in entries)
+    evicted = []
+    # Oldest access time first
+    for _, name, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+        evicted.append(name)
+
+    return evicted
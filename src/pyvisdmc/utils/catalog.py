@@ -0,0 +1,335 @@
+"""
+catalog.py
+
+This module provides an index of the PyVibDMC simulations stored under a
+data folder. The folder tree is scanned once and, for every
+<NAME>_<sim>_sim_info.hdf5 file, the molecule, simulation number, number
+of walkers, number of timesteps, number of atoms and the available
+wavefunction snapshots (wfns/<NAME>_<sim>_wfn_<N>ts.hdf5) are recorded in
+a small JSON index file at the root of the data folder. The snapshots of
+a packed store (<NAME>_<sim>_packed.hdf5, see pyvisdmc.utils.packed) are
+recorded too. Only HDF5 metadata is read, never the walkers themselves.
+
+Later scans are incremental: a folder whose modification time has not
+changed is not listed again, and a simulation whose sim_info file and
+wfns folder have not changed is not opened again. Finding a simulation is
+then a dictionary lookup instead of probing the file system.
+
+Classes:
+- Catalog: Index of the simulations under a data folder.
+
+Functions:
+- find_simulation: Looks up one simulation in the catalog of a data
+  folder.
+- window_snapshots: Selects the snapshots of a simulation between two
+  timesteps.
+
+Dependencies:
+- h5py, numpy
+"""
+import json
+import os
+import re
+
+import numpy as np
+
+from pyvisdmc.utils.packed import PACKED_SUFFIX, packed_snapshots
+
+# Name of the index file written at the root of a data folder
+CATALOG_NAME = '.pyvisdmc_catalog.json'
+_VERSION = 2
+
+_SIM_INFO = re.compile(r'^(?P<name>.+)_(?P<sim>\d+)_sim_info\.hdf5$')
+_WALKERS = re.compile(r'_(\d+)_walkers_')
+
+
+def _snapshot_pattern(prefix):
+    return re.compile(rf'^{re.escape(prefix)}wfn_(\d+)ts\.hdf5$')
+
+
+def _snapshot_interval(timesteps):
+    # the most common spacing of the snapshots; off-grid snapshots (e.g.
+    # an extra wfn_8500ts file) do not change it
+    if len(timesteps) < 2:
+        return None
+    gaps, counts = np.unique(np.diff(sorted(timesteps)), return_counts=True)
+    return int(gaps[np.argmax(counts)])
+
+
+class Catalog:
+    """
+    Index of the PyVibDMC simulations stored under a data folder.
+
+    Parameters:
+    - root: The data folder (e.g., the data_path of config.yml).
+    - index_file: Path of the JSON index file. Defaults to CATALOG_NAME
+      inside root.
+
+    Attributes:
+    - sims: Dictionary of the simulations, keyed by the path of their
+      sim_info file relative to root. Each entry holds 'molecule', 'name',
+      'sim_num', 'walkers', 'timesteps', 'atoms', 'snapshot_interval',
+      'snapshots' (timestep -> path relative to root of the wavefunction
+      file, or of the packed store holding the snapshot) and 'packed'
+      (path of the packed store relative to root, or None).
+    - rescanned: Number of simulations whose metadata was read by the last
+      refresh.
+    """
+
+    def __init__(self, root, index_file=None):
+        self.root = os.path.abspath(root)
+        self.index_file = (index_file if index_file is not None
+                           else os.path.join(self.root, CATALOG_NAME))
+        self.sims = {}
+        self.rescanned = 0
+        self._dirs = {}
+        self._lookup = {}
+        self._changed = False
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+            if index.get('version') == _VERSION:
+                self._dirs = index['dirs']
+                self.sims = index['sims']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def refresh(self):
+        """
+        Bring the catalog up to date with the data folder, re-reading only
+        the folders and simulations that changed, and save it if anything
+        changed.
+
+        Returns:
+        - The catalog.
+        """
+        old_dirs, old_sims = self._dirs, self.sims
+        self._dirs, self.sims = {}, {}
+        self.rescanned = 0
+        self._changed = False
+        self._scan('.', old_dirs)
+
+        for rel, listing in self._dirs.items():
+            for fname in listing['files']:
+                if _SIM_INFO.match(fname):
+                    self._add_sim(os.path.normpath(os.path.join(rel, fname)),
+                                  old_sims)
+
+        # a copy of a simulation summary without its snapshots (e.g., one
+        # next to the data folders) never hides the complete simulation
+        self._lookup = {}
+        for key in sorted(self.sims,
+                          key=lambda k: len(self.sims[k]['snapshots'])):
+            sim = self.sims[key]
+            self._lookup[(sim['molecule'], sim['walkers'], sim['timesteps'],
+                          sim['sim_num'])] = key
+        # writing the index changes the modification time of the root
+        # folder, so only a changed listing or simulation is saved
+        if self._changed or self.rescanned or set(self.sims) != set(old_sims):
+            self.save()
+        return self
+
+    def _scan(self, rel, old_dirs):
+        path = os.path.join(self.root, rel)
+        mtime = os.stat(path).st_mtime_ns
+        listing = old_dirs.get(rel)
+        if listing is None or listing['mtime'] != mtime:
+            subdirs, files = [], []
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        subdirs.append(entry.name)
+                    elif entry.name.endswith('.hdf5'):
+                        files.append(entry.name)
+            new = {'mtime': mtime, 'subdirs': sorted(subdirs),
+                   'files': sorted(files)}
+            self._changed |= (listing is None
+                              or listing['subdirs'] != new['subdirs']
+                              or listing['files'] != new['files'])
+            listing = new
+        self._dirs[rel] = listing
+        for sub in listing['subdirs']:
+            self._scan(os.path.normpath(os.path.join(rel, sub)), old_dirs)
+
+    def _add_sim(self, rel, old_sims):
+        folder, fname = os.path.split(rel)
+        wfns = os.path.normpath(os.path.join(folder, 'wfns'))
+        mtime = os.stat(os.path.join(self.root, rel)).st_mtime_ns
+        wfns_mtime = self._dirs.get(wfns, {}).get('mtime')
+        prefix = fname.split('sim_info')[0]
+        packed = None
+        packed_mtime = None
+        if prefix + PACKED_SUFFIX in self._dirs[os.path.normpath(folder)]['files']:
+            packed = os.path.join(folder, prefix + PACKED_SUFFIX)
+            packed_mtime = os.stat(os.path.join(self.root, packed)).st_mtime_ns
+
+        old = old_sims.get(rel)
+        if (old is not None and old['mtime'] == mtime
+                and old['wfns_mtime'] == wfns_mtime
+                and old['packed_mtime'] == packed_mtime):
+            self.sims[rel] = old
+            return
+
+        import h5py
+
+        match = _SIM_INFO.match(fname)
+        with h5py.File(os.path.join(self.root, rel), 'r') as f:
+            timesteps = f['vref_vs_tau'].shape[0]
+            atoms = f['atomic_nums'].shape[0]
+            walkers = _WALKERS.search(rel)
+            if walkers is not None:
+                walkers = int(walkers.group(1))
+            else:
+                # no nominal size in the folder name: the average population
+                walkers = int(round(np.mean(f['pop_vs_tau'][:, 1])))
+
+        pattern = _snapshot_pattern(prefix)
+        snapshots = {}
+        if packed is not None:
+            for ts in packed_snapshots(os.path.join(self.root, packed)):
+                snapshots[str(ts)] = packed
+        for wfn in self._dirs.get(wfns, {}).get('files', []):
+            ts = pattern.match(wfn)
+            if ts is not None:
+                snapshots[ts.group(1)] = os.path.join(wfns, wfn)
+
+        self.sims[rel] = {
+            'molecule': match.group('name').lower(),
+            'name': match.group('name'),
+            'sim_num': int(match.group('sim')),
+            'walkers': walkers, 'timesteps': timesteps, 'atoms': atoms,
+            'snapshot_interval': _snapshot_interval(
+                [int(ts) for ts in snapshots]),
+            'snapshots': dict(sorted(snapshots.items(),
+                                     key=lambda item: int(item[0]))),
+            'packed': packed,
+            'mtime': mtime, 'wfns_mtime': wfns_mtime,
+            'packed_mtime': packed_mtime,
+        }
+        self.rescanned += 1
+
+    def save(self):
+        """
+        Write the index file. A data folder that cannot be written to is
+        left as is, and the catalog is only kept in memory.
+        """
+        tmp = f'{self.index_file}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'version': _VERSION, 'dirs': self._dirs,
+                           'sims': self.sims}, f)
+            os.replace(tmp, self.index_file)
+        except OSError:
+            pass
+
+    def find(self, molecule, sim_num, walkers, timesteps):
+        """
+        Look up one simulation.
+
+        Parameters:
+        - molecule: The molecule simulated (e.g., 'h5o3', 'h2o').
+        - sim_num: The simulation number.
+        - walkers: The number of walkers of the simulation.
+        - timesteps: The number of timesteps of the simulation, or None
+          for any length (e.g., for a simulation that is still running).
+
+        Raises:
+        - ValueError: If no simulation of the catalog matches, naming the
+          first of molecule, walkers, timesteps and sim_num that does not.
+
+        Returns:
+        - A copy of the catalog entry of the simulation, with the absolute
+          paths of its 'sim_info' file and 'packed' store, and 'snapshots'
+          keyed by integer timestep.
+        """
+        if timesteps is None:
+            # the entry with the most snapshots, like the lookup table
+            keys = [k for k, s in self.sims.items()
+                    if (s['molecule'], s['walkers'], s['sim_num'])
+                    == (molecule, walkers, sim_num)]
+            key = max(keys, key=lambda k: len(self.sims[k]['snapshots']),
+                      default=None)
+        else:
+            key = self._lookup.get((molecule, walkers, timesteps, sim_num))
+        if key is None:
+            sims = self.sims.values()
+            if not any(s['molecule'] == molecule for s in sims):
+                raise ValueError('Not a valid molecule name')
+            if not any(s['molecule'] == molecule and s['walkers'] == walkers
+                       for s in sims):
+                raise ValueError(f'Simulation of size {walkers} walkers does '
+                                 'not exist for this system')
+            if timesteps is not None and not any(
+                    s['molecule'] == molecule and s['walkers'] == walkers
+                    and s['timesteps'] == timesteps for s in sims):
+                raise ValueError(f'Simulation of length {timesteps} '
+                                 'timesteps does not exist for this system')
+            raise ValueError(
+                f'Simulation {sim_num} does not exist for this system')
+
+        entry = dict(self.sims[key])
+        entry['sim_info'] = os.path.join(self.root, key)
+        entry['snapshots'] = {int(ts): os.path.join(self.root, path)
+                              for ts, path in entry['snapshots'].items()}
+        if entry['packed'] is not None:
+            entry['packed'] = os.path.join(self.root, entry['packed'])
+        return entry
+
+    def __len__(self):
+        return len(self.sims)
+
+
+def find_simulation(data_path, molecule, sim_num, walkers, timesteps,
+                    catalog=None):
+    """
+    Look up one simulation in the catalog of a data folder, refreshing the
+    catalog first (see Catalog.find for the parameters and errors). A
+    catalog of data_path that is already refreshed (e.g., once per run)
+    can be passed as `catalog`, and is then only looked up.
+    """
+    if catalog is None:
+        catalog = Catalog(data_path).refresh()
+    return catalog.find(molecule, sim_num, walkers, timesteps)
+
+
+def window_snapshots(entry, start, stop, partial=False):
+    """
+    Select the snapshots of a simulation between two timesteps: every
+    snapshot of the simulation's regular snapshot grid from start
+    (inclusive) to stop (exclusive). Off-grid snapshots are skipped.
+
+    Parameters:
+    - entry: Catalog entry of the simulation (see Catalog.find).
+    - start, stop: Range of timesteps.
+    - partial: If True, the snapshots of the grid that are not written
+      yet (e.g., by a running simulation) are left out instead of being
+      an error, and the selection may be empty.
+
+    Raises:
+    - ValueError: If partial is False and a snapshot of the grid is
+      missing, or there is no snapshot in the range.
+
+    Returns:
+    - List of the timesteps of the selected snapshots.
+    """
+    available = sorted(entry['snapshots'])
+    if partial and not available:
+        return []
+    interval = entry['snapshot_interval']
+    if interval is None:
+        selected = [ts for ts in available if start <= ts < stop]
+    else:
+        first = available[0] + -(-(start - available[0]) // interval) * interval
+        selected = list(range(first, stop, interval))
+        missing = [ts for ts in selected if ts not in entry['snapshots']]
+        if missing and partial:
+            selected = [ts for ts in selected if ts in entry['snapshots']]
+        elif missing:
+            raise ValueError(
+                f"No wavefunction snapshot at timestep(s) {missing} for "
+                f"simulation {entry['sim_num']}.")
+    if not selected and not partial:
+        raise ValueError(
+            f"No wavefunction snapshot between timesteps {start} and {stop} "
+            f"for simulation {entry['sim_num']}.")
+    return selected
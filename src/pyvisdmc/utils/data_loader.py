@@ -1,52 +1,131 @@
 """Module for loading in data for all the plotting functions"""
 
-import numpy as np
+import os
 
-import pyvibdmc as pv
+import numpy as np
 
+from pyvisdmc.utils.catalog import find_simulation
+from pyvisdmc.utils.cache import (DEFAULT_CACHE_SIZE, cache_key,
+                                  load_cached, store_cached)
+from pyvisdmc.utils.packed import (iter_packed, load_packed, packed_path,
+                                   packed_snapshots, stale_snapshots)
+from pyvisdmc.utils.timing import stage
+from pyvisdmc.utils.wfn_reader import iter_wfns, read_wfns
 
-def load_data(data_path, molecule, sim_num, walkers, timesteps):
+# Number of timesteps between two saved wavefunction snapshots
+SNAPSHOT_INTERVAL = 1000
 
-    if molecule == 'h5o3':
-        name = 'H5O3'
 
-    elif molecule == 'h2o':
-        name = 'H2O'
+def load_data(data_path, molecule, sim_num, walkers, timesteps, catalog=None):
+    """
+    Load the summary of one simulation, found through the catalog of the
+    data folder (see pyvisdmc.utils.catalog).
 
-    else:
-        raise ValueError('Not a valid molecule name')
-    if sim_num != 0:
-        raise ValueError(
-            f'Simulation {sim_num} does not exist for this system')
-    else:
-        pass
+    Parameters:
+    - data_path: Path to the folder containing the simulation data.
+    - molecule: The molecule simulated (e.g., 'h5o3', 'h2o').
+    - sim_num: The simulation number.
+    - walkers: The number of walkers of the simulation.
+    - timesteps: The number of timesteps of the simulation.
+    - catalog: Catalog of data_path, already refreshed, to look the
+      simulation up in (e.g., the one of a run). A new catalog is
+      refreshed if None.
 
-    if walkers != 5000:
-        raise ValueError(
-            f'Simulation of size {walkers} walkers does not exist for this system')
-    else:
-        pass
+    Raises:
+    - ValueError: If no simulation matches the molecule, walkers,
+      timesteps and simulation number.
 
-    if timesteps != 20000:
-        raise ValueError(
-            f'Simulation of length {timesteps} timesteps does not exist for this system')
-    else:
-        pass
+    Returns:
+    - An instance of pyvibdmc's SimInfo class.
+    """
+    with stage('data_loader.catalog'):
+        entry = find_simulation(data_path, molecule, sim_num, walkers,
+                                timesteps, catalog=catalog)
 
-    # path to the folder containing the simulation data
-    path_to_data = f'{data_path}/{molecule}_example_data/1.0w_{walkers}_walkers_{timesteps}t_1dt'
-    # name of the simulation summary file
-    sim_data = pv.SimInfo(f'{path_to_data}/{name}_{sim_num}_sim_info.hdf5')
+    # pyvibdmc is slow to import, so it is only imported to load data
+    with stage('data_loader.read_summary',
+               bytes=os.path.getsize(entry['sim_info'])):
+        import pyvibdmc as pv
+        sim_data = pv.SimInfo(entry['sim_info'])
 
     return sim_data
 
 
-def sim_info(sim_data, start, stop):
-    snapshots = np.arange(start, stop, 1000)
+def wfn_files(sim_data, snapshots):
+    # wavefunction files live next to the sim_info file, e.g.
+    # wfns/H2O_0_wfn_10000ts.hdf5 for H2O_0_sim_info.hdf5
+    path, sim_name = os.path.split(sim_data.fname)
+    prefix = sim_name.split('sim_info')[0]
+    return [os.path.join(path, 'wfns', f'{prefix}wfn_{ts}ts.hdf5')
+            for ts in snapshots]
+
+
+def packed_store(sim_data, snapshots):
+    # the packed store of the simulation (see `pyvisdmc convert`), if it
+    # holds every requested snapshot and none of their wavefunction files
+    # was rewritten since it was packed
+    path = packed_path(sim_data.fname)
+    if not (os.path.isfile(path) and set(int(ts) for ts in snapshots) <= set(
+            packed_snapshots(path))):
+        return None
+    stale = stale_snapshots(path, snapshots, wfn_files(sim_data, snapshots))
+    if stale:
+        print(f"Warning: the wavefunction files of snapshot(s) {stale} changed since "
+              f"{os.path.basename(path)} was packed; reading the wavefunction files "
+              f"instead. Run pyvisdmc convert again to update it.")
+        return None
+    return path
+
+
+def sim_info(sim_data, start, stop, cache_dir=None,
+             cache_size=DEFAULT_CACHE_SIZE, workers=1, snapshots=None,
+             dtype=np.float64):
+    import pyvibdmc as pv
+    # timesteps of the snapshots read, e.g. from catalog.window_snapshots
+    if snapshots is None:
+        snapshots = np.arange(start, stop, SNAPSHOT_INTERVAL)
+
+    # a packed store is already converted and memory-mapped, so the
+    # snapshots are sliced from it instead of being read or cached
+    packed = packed_store(sim_data, snapshots)
+    if packed is not None:
+        coords, weights = load_packed(packed, snapshots, dtype=dtype)
+        return pv.AnalyzeWfn(coords), weights
+
+    # warm runs memory-map the converted ensemble from the on-disk cache
+    key = None
+    if cache_dir is not None:
+        key = cache_key(sim_data.fname, wfn_files(sim_data, snapshots),
+                        snapshots, 'angstroms', dtype=dtype)
+        with stage('data_loader.cache_load'):
+            cached = load_cached(cache_dir, key)
+        if cached is not None:
+            coords, weights = cached
+            return pv.AnalyzeWfn(coords), weights
+
     # load in the molecule geometries (coords) and their associated weights
-    coords, weights = sim_data.get_wfns(snapshots)
-    # conversion of coordinates from atomic units to Angstroms
-    coords = pv.Constants.convert(coords, 'angstroms', to_AU=False)
+    # straight from the wfn files, converting from atomic units to Angstroms
+    # in place, in the requested precision
+    coords, weights = read_wfns(wfn_files(sim_data, snapshots), ret_ang=True,
+                                workers=workers, dtype=dtype)
+    if key is not None:
+        with stage('data_loader.cache_store', bytes=coords.nbytes):
+            coords, weights = store_cached(cache_dir, key, coords, weights,
+                                           cache_size)
     analyzer = pv.AnalyzeWfn(coords)
 
     return analyzer, weights
+
+
+def iter_sim_info(sim_data, start, stop, chunk_size=None, snapshots=None,
+                  dtype=np.float64):
+    # same snapshots as sim_info, streamed one chunk of walkers at a time
+    # and converted to Angstroms
+    if snapshots is None:
+        snapshots = np.arange(start, stop, SNAPSHOT_INTERVAL)
+    packed = packed_store(sim_data, snapshots)
+    if packed is not None:
+        return iter_packed(packed, snapshots, chunk_size=chunk_size,
+                           dtype=dtype)
+    return iter_wfns(wfn_files(sim_data, snapshots), ret_ang=True,
+                     chunk_size=chunk_size, dtype=dtype)
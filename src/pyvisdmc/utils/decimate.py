@@ -0,0 +1,68 @@
+"""
+decimate.py
+
+This module provides a display-only downsampling of long time series, such
+as the reference energy (Eref) of a DMC simulation with millions of
+timesteps. Drawing every point of such a series is slow and the line is
+saturated anyway, since many points fall on the same pixel column.
+
+The series is cut into buckets of consecutive points and only the minimum
+and the maximum of each bucket are kept, in their original order (the
+per-pixel min/max rule). The envelope and the spikes of the series are
+preserved exactly, so the decimated line looks the same as the full one.
+All buckets are reduced at once on a reshaped array, so decimating 10^7
+points takes a fraction of a second.
+
+Functions:
+- minmax_decimate: Downsamples a series to a target number of points.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+
+def minmax_decimate(x, y, max_points):
+    """
+    Downsample a series for display, keeping the minimum and maximum of
+    every bucket of consecutive points as well as the first and last
+    points.
+
+    Parameters:
+    - x: 1D array of abscissas (e.g., timesteps), in increasing order.
+    - y: 1D array of values, the same length as x.
+    - max_points: Largest number of points returned. A series that is
+      not longer is returned as is.
+
+    Raises:
+    - ValueError: If x and y differ in length, or max_points is lower
+      than 4.
+
+    Returns:
+    - (x, y) of the kept points, in their original order.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if len(x) != len(y):
+        raise ValueError('x and y must have the same length')
+    if max_points < 4:
+        raise ValueError('At least 4 points must be kept')
+    n = len(y)
+    if n <= max_points:
+        return x, y
+
+    # two points per bucket, plus the first and the last point
+    size = -(-n // ((max_points - 2) // 2))
+    n_buckets = -(-n // size)
+    # the last bucket is padded with the last value, whose index is
+    # clipped back to n - 1
+    padded = np.concatenate((y, np.full(n_buckets * size - n, y[-1])))
+    buckets = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lo = offsets + np.argmin(buckets, axis=1)
+    hi = offsets + np.argmax(buckets, axis=1)
+
+    idx = np.concatenate(([0], np.minimum(lo, n - 1), np.minimum(hi, n - 1),
+                          [n - 1]))
+    idx = np.unique(idx)
+    return x[idx], y[idx]
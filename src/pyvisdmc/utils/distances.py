@@ -0,0 +1,90 @@
+"""
+distances.py
+
+This module provides a vectorized bond length engine shared by all the
+distribution plots. Instead of one pass over the walker array per bond
+(as with AnalyzeWfn.bond_length), every requested pair of atoms, or the
+full upper triangle of the distance matrix, is computed in a single NumPy
+pass over the (walkers, atoms, 3) coordinates array, together with the
+weighted expectation value of each bond length. The bond lengths keep the
+precision of the coordinates (e.g., float32), while the expectation values
+are always accumulated in double precision.
+
+Functions:
+- bond_lengths: Computes the bond lengths and expectation values of a list
+  of atom pairs.
+- all_bond_lengths: Computes the bond lengths and expectation values of
+  every pair of atoms.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+from pyvisdmc.utils.timing import stage
+
+
+def bond_lengths(coords, weights, pairs):
+    """
+    Compute the bond lengths of several pairs of atoms and their weighted
+    expectation values in one pass over the coordinates.
+
+    Parameters:
+    - coords: Coordinates array of shape (walkers, atoms, 3).
+    - weights: Weights associated with the molecular geometries.
+    - pairs: List of pairs of atom indices (e.g., [[0, 1], [2, 3]]).
+
+    Raises:
+    - ValueError: If a pair does not contain two atom indices or an index
+      exceeds the number of atoms.
+
+    Returns:
+    - distances: Array of shape (pairs, walkers) with the bond length of
+      each pair for every walker, in the floating point type of coords.
+    - exp_vals: Array of shape (pairs,) with the weighted expectation value
+      of each bond length, in double precision.
+    """
+    pairs = np.asarray(pairs, dtype=int)
+    if pairs.ndim != 2 or pairs.shape[1] != 2:
+        raise ValueError('Each pair must contain two atom indices')
+    num_atoms = coords.shape[1]
+    if np.any(pairs >= num_atoms) or np.any(pairs < 0):
+        raise ValueError('Atom index exceeds number of atoms in this molecule')
+
+    with stage('distances.bond_lengths', bytes=coords.nbytes,
+               samples=len(coords) * len(pairs)):
+        # (walkers, pairs, 3) displacement vectors for all pairs at once
+        diff = coords[:, pairs[:, 0]] - coords[:, pairs[:, 1]]
+        # squared norms, laid out contiguously per pair
+        distances = np.einsum('wpk,wpk->pw', diff, diff)
+        np.sqrt(distances, out=distances)
+
+        if distances.dtype == np.float64:
+            exp_vals = distances @ weights / np.sum(weights)
+        else:
+            # one pair at a time, so that only one row is ever converted to
+            # double precision
+            exp_vals = np.array([np.dot(d.astype(np.float64), weights)
+                                 for d in distances]) / np.sum(weights)
+
+    return distances, exp_vals
+
+
+def all_bond_lengths(coords, weights):
+    """
+    Compute the bond lengths of every pair of atoms (the upper triangle of
+    the distance matrix) and their weighted expectation values.
+
+    Parameters:
+    - coords: Coordinates array of shape (walkers, atoms, 3).
+    - weights: Weights associated with the molecular geometries.
+
+    Returns:
+    - pairs: Array of shape (pairs, 2) with the atom indices i < j.
+    - distances: Array of shape (pairs, walkers), see bond_lengths.
+    - exp_vals: Array of shape (pairs,), see bond_lengths.
+    """
+    pairs = np.column_stack(np.triu_indices(coords.shape[1], k=1))
+    distances, exp_vals = bond_lengths(coords, weights, pairs)
+
+    return pairs, distances, exp_vals
@@ -0,0 +1,67 @@
+"""
+equilibration.py
+
+This module provides an automatic detection of the end of the
+equilibration phase of a time series, such as the reference energy (Eref)
+of a DMC simulation, so that the ZPE can be averaged over the equilibrated
+part only.
+
+It uses the MSER rule (Marginal Standard Error Rule, White 1997): the
+truncation point d minimizes the squared standard error of the mean of
+the remaining points, sum_{i>=d} (x_i - mean_d)^2 / (n - d)^2. Running
+the rule on batch means (MSER-m) makes it robust to noise. The sums over
+every suffix of the series come from two reversed cumulative sums, so the
+detection costs O(n) and takes milliseconds for millions of timesteps.
+
+Functions:
+- mser: Returns the index at which the equilibrated part of a series
+  starts.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+
+def mser(series, batch_size=5, max_fraction=0.5):
+    """
+    Detect the start of the equilibrated part of a time series with the
+    MSER-m rule.
+
+    Parameters:
+    - series: 1D array of consecutive measurements (e.g., Eref values).
+    - batch_size: Number of consecutive points averaged into one batch
+      before applying the rule (m in MSER-m).
+    - max_fraction: Largest fraction of the series that may be discarded.
+      The MSER statistic is unreliable near the end of the series, where
+      only a few points are left.
+
+    Raises:
+    - ValueError: If the series has fewer than two batches.
+
+    Returns:
+    - Index of the first equilibrated point of the series (a multiple of
+      batch_size).
+    """
+    x = np.asarray(series, dtype=np.float64)
+    n_batches = len(x) // batch_size
+    if n_batches < 2:
+        raise ValueError('The series is too short to detect equilibration')
+
+    batches = x[:n_batches * batch_size].reshape(n_batches, batch_size)
+    # centering keeps the sums of squares free of cancellation errors
+    batches = batches.mean(axis=1)
+    batches -= batches.mean()
+
+    # sums over every suffix batches[d:], from reversed cumulative sums
+    suffix_sum = np.cumsum(batches[::-1])[::-1]
+    suffix_sq = np.cumsum((batches * batches)[::-1])[::-1]
+    remaining = np.arange(n_batches, 0, -1)
+
+    sse = suffix_sq - suffix_sum * suffix_sum / remaining
+    stat = sse / remaining ** 2
+
+    last = max(1, int(n_batches * max_fraction))
+    d = int(np.argmin(stat[:last]))
+
+    return d * batch_size
@@ -0,0 +1,268 @@
+"""
+histogram.py
+
+This module provides weighted histograms of bond lengths that are built up
+one chunk of walkers at a time. The bin edges are fixed up front, every
+chunk is binned with a weighted np.bincount and then dropped, and running
+weighted moments are kept for the expectation values. The memory used is
+therefore bounded by the chunk size instead of the size of the ensemble.
+Single precision samples are binned in single precision, and only the
+running moments are accumulated in double precision.
+
+Classes:
+- HistogramAccumulator: Weighted 1D or 2D histogram with running moments.
+
+Functions:
+- bin_edges: Builds evenly spaced bin edges.
+- accumulate_bond_histograms: Fills histograms of several bond lengths (and
+  optionally a 2D histogram of two of them) from chunks of walkers.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+from pyvisdmc.utils.distances import bond_lengths
+from pyvisdmc.utils.kde import binned_kde
+
+
+def bin_edges(lo, hi, bins):
+    """
+    Build evenly spaced bin edges.
+
+    Parameters:
+    - lo, hi: Range covered by the histogram (e.g., in Angstroms).
+    - bins: Number of bins.
+
+    Raises:
+    - ValueError: If the range is empty or bins is not a positive integer.
+
+    Returns:
+    - Array of bins + 1 edges.
+    """
+    if not hi > lo:
+        raise ValueError('The histogram range must have hi > lo')
+    if not isinstance(bins, (int, np.integer)) or bins < 1:
+        raise ValueError('The number of bins must be a positive integer')
+    return np.linspace(lo, hi, bins + 1)
+
+
+class HistogramAccumulator:
+    """
+    Weighted histogram with fixed, evenly spaced bin edges, updated one
+    chunk of samples at a time.
+
+    Parameters:
+    - *edges: One array of bin edges per dimension (one for a 1D histogram,
+      two for a 2D histogram), e.g. from bin_edges.
+
+    Attributes:
+    - counts: Summed weights in each bin.
+    - total_weight: Summed weights of all samples, including the ones that
+      fall outside the edges.
+    - outside_weight: Summed weights of the samples outside the edges.
+    - minimum, maximum: Smallest and largest sample of each dimension,
+      including the ones outside the edges.
+    """
+
+    def __init__(self, *edges):
+        if len(edges) == 0:
+            raise ValueError('At least one array of bin edges is required')
+        self.edges = [np.asarray(e, dtype=np.float64) for e in edges]
+        for e in self.edges:
+            if e.ndim != 1 or len(e) < 2 or not np.all(np.diff(e) > 0):
+                raise ValueError('Bin edges must be increasing 1D arrays')
+            if not np.allclose(np.diff(e), e[1] - e[0]):
+                raise ValueError('Bin edges must be evenly spaced')
+        self.shape = tuple(len(e) - 1 for e in self.edges)
+        self.counts = np.zeros(self.shape)
+        self.total_weight = 0.0
+        self.outside_weight = 0.0
+        # running weighted moments of every dimension
+        self._sum_w2 = 0.0
+        self._sum_x = np.zeros(len(self.edges))
+        self._sum_x2 = np.zeros(len(self.edges))
+        self.minimum = np.full(len(self.edges), np.inf)
+        self.maximum = np.full(len(self.edges), -np.inf)
+
+    @property
+    def ndim(self):
+        return len(self.edges)
+
+    def update(self, *values, weights=None):
+        """
+        Add a chunk of samples to the histogram.
+
+        Parameters:
+        - *values: One array of samples per dimension, all the same length.
+          float32 samples are binned without a double precision copy.
+        - weights: Weights of the samples (all 1 if None).
+        """
+        if len(values) != self.ndim:
+            raise ValueError(f'Expected {self.ndim} arrays of samples')
+        values = [np.ravel(v) if np.asarray(v).dtype == np.float32
+                  else np.ravel(v).astype(np.float64, copy=False)
+                  for v in values]
+        if weights is None:
+            weights = np.ones(len(values[0]))
+        weights = np.ravel(weights).astype(np.float64, copy=False)
+
+        flat = np.zeros(len(weights), dtype=np.intp)
+        inside = np.ones(len(weights), dtype=bool)
+        for dim, (v, e) in enumerate(zip(values, self.edges)):
+            # evenly spaced edges: the bin index is a single multiply, in
+            # the precision of the samples
+            lo = v.dtype.type(e[0])
+            scale = v.dtype.type((len(e) - 1) / (e[-1] - e[0]))
+            idx = np.floor((v - lo) * scale)
+            idx = idx.astype(np.intp)
+            # the last edge belongs to the last bin, like np.histogram
+            idx[v == e[-1]] = len(e) - 2
+            inside &= (idx >= 0) & (idx < len(e) - 1)
+            flat = flat * (len(e) - 1) + idx
+
+            self._sum_x[dim] += np.dot(weights, v)
+            self._sum_x2[dim] += np.dot(weights, v * v)
+            if len(v):
+                self.minimum[dim] = min(self.minimum[dim], np.min(v))
+                self.maximum[dim] = max(self.maximum[dim], np.max(v))
+
+        self.counts += np.bincount(flat[inside], weights[inside],
+                                   minlength=self.counts.size
+                                   ).reshape(self.shape)
+        chunk_weight = np.sum(weights)
+        self.total_weight += chunk_weight
+        self.outside_weight += chunk_weight - np.sum(weights[inside])
+        self._sum_w2 += np.dot(weights, weights)
+
+    def merge(self, other):
+        """
+        Add the samples of another accumulator with the same edges.
+        """
+        if other.shape != self.shape or not all(
+                np.array_equal(a, b) for a, b in zip(self.edges, other.edges)):
+            raise ValueError('Cannot merge histograms with different edges')
+        self.counts += other.counts
+        self.total_weight += other.total_weight
+        self.outside_weight += other.outside_weight
+        self._sum_w2 += other._sum_w2
+        self._sum_x += other._sum_x
+        self._sum_x2 += other._sum_x2
+        self.minimum = np.minimum(self.minimum, other.minimum)
+        self.maximum = np.maximum(self.maximum, other.maximum)
+
+    @property
+    def mean(self):
+        """Weighted mean (expectation value) of each dimension."""
+        return self._sum_x / self.total_weight
+
+    @property
+    def std(self):
+        """Weighted standard deviation of each dimension."""
+        var = self._sum_x2 / self.total_weight - self.mean ** 2
+        return np.sqrt(np.maximum(var, 0))
+
+    @property
+    def n_eff(self):
+        """Effective number of samples, (sum w)^2 / sum w^2."""
+        return self.total_weight ** 2 / self._sum_w2
+
+    def density(self):
+        """
+        Return the histogram normalized as a probability density over the
+        samples inside the edges.
+        """
+        area = np.ones(self.shape)
+        for dim, e in enumerate(self.edges):
+            width = np.diff(e).reshape([-1 if d == dim else 1
+                                        for d in range(self.ndim)])
+            area = area * width
+        return self.counts / (np.sum(self.counts) * area)
+
+    def filled_limits(self):
+        """
+        Return the (lo, hi) edges of the range of filled bins of each
+        dimension, e.g. for the axis limits of a plot.
+
+        Raises:
+        - ValueError: If no sample falls inside the edges, naming the
+          range of the edges and of the samples.
+        """
+        filled = np.nonzero(self.counts)
+        if len(filled[0]) == 0:
+            if self.total_weight == 0:
+                raise ValueError('The histogram has no samples')
+            ranges = ', '.join(f'[{self.minimum[d]:.4f}, {self.maximum[d]:.4f}]'
+                               for d in range(self.ndim))
+            edges = ', '.join(f'[{e[0]:g}, {e[-1]:g}]' for e in self.edges)
+            raise ValueError(f'No sample falls inside hist_range {edges}: the '
+                             f'samples range over {ranges}. Widen hist_range.')
+        return [(e[f.min()], e[f.max() + 1]) for e, f in zip(self.edges, filled)]
+
+    def _filled_bins(self):
+        self.filled_limits()
+        filled = np.nonzero(self.counts)[0]
+        return filled[0], filled[-1] + 1
+
+    def stairs(self):
+        """
+        Return the density of a 1D histogram and its edges, trimmed to the
+        range of filled bins, e.g. for matplotlib's Axes.stairs.
+        """
+        if self.ndim != 1:
+            raise ValueError('Only 1D histograms can be drawn as stairs')
+        lo, hi = self._filled_bins()
+        return self.density()[lo:hi], self.edges[0][lo:hi + 1]
+
+    def kde(self, cut=3, gridsize=512):
+        """
+        Return a weighted KDE of a 1D histogram, estimated from the binned
+        weights (see pyvisdmc.utils.binned_kde) with Scott's bandwidth from
+        the running moments.
+
+        Parameters:
+        - cut: The grid extends this many bandwidths past the filled bins.
+        - gridsize: Number of grid points.
+
+        Returns:
+        - (grid, density) as returned by binned_kde.
+        """
+        if self.ndim != 1:
+            raise ValueError('A KDE can only be estimated for 1D histograms')
+        edges = self.edges[0]
+        lo, hi = self._filled_bins()
+        centers = (edges[lo:hi] + edges[lo + 1:hi + 1]) / 2
+        bandwidth = self.std[0] * self.n_eff ** (-1 / 5)
+        return binned_kde(centers, self.counts[lo:hi], bandwidth=bandwidth,
+                          gridsize=gridsize, cut=cut)
+
+
+def accumulate_bond_histograms(chunks, pairs, edges, joint=None):
+    """
+    Fill weighted histograms of bond lengths from chunks of walkers, so
+    that only one chunk of coordinates is in memory at a time.
+
+    Parameters:
+    - chunks: Iterable of (coords, weights) chunks, e.g. from
+      pyvisdmc.utils.iter_wfns.
+    - pairs: List of pairs of atom indices (e.g., [[0, 1], [2, 3]]).
+    - edges: Bin edges used for every bond length.
+    - joint: Optional two pairs of atom indices for which a 2D histogram
+      is also filled (e.g., [[2, 3], [5, 6]]).
+
+    Returns:
+    - hists: List of 1D HistogramAccumulators, one per pair.
+    - joint_hist: 2D HistogramAccumulator for `joint`, or None.
+    """
+    hists = [HistogramAccumulator(edges) for _ in pairs]
+    joint_hist = None if joint is None else HistogramAccumulator(edges, edges)
+    all_pairs = list(pairs) + ([] if joint is None else list(joint))
+
+    for coords, weights in chunks:
+        distances, _ = bond_lengths(coords, weights, all_pairs)
+        for hist, distance in zip(hists, distances):
+            hist.update(distance, weights=weights)
+        if joint_hist is not None:
+            joint_hist.update(distances[-2], distances[-1], weights=weights)
+
+    return hists, joint_hist
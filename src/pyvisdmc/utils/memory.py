@@ -0,0 +1,158 @@
+"""
+memory.py
+
+This module keeps the walker data of a run within a memory budget. The
+memory a run needs to hold its walkers is estimated before any data is
+read, from the number of walkers of the snapshots (read from the HDF5
+metadata), the number of atoms, the requested bonds and the precision:
+per walker, the coordinates (read in the requested precision and
+converted in place), the weights, and for every bond the displacement
+vectors, the bond length and the copies made to bin and draw it. When
+the estimate does not fit in the budget, the walkers are streamed
+through weighted histograms in chunks small enough to fit. The budget does not
+cover the memory of the libraries (NumPy, h5py, Matplotlib, ...), which
+does not depend on the data; the peak resident set size (RSS) of the
+process, which does, is reported per stage by the timing module.
+
+Functions:
+- parse_memory: Reads a memory size such as 512, '512MB' or '4GB'.
+- peak_rss: Peak resident set size of the process.
+- snapshot_walkers: Number of walkers of snapshots, from their metadata.
+- walker_bytes: Estimated bytes needed per walker.
+- plan_chunks: Decides whether the walkers fit in a budget, and the chunk
+  size to stream them otherwise.
+
+Dependencies:
+- numpy, h5py
+"""
+import re
+import sys
+
+import numpy as np
+
+# Multiples of the memory units; a bare number is in megabytes
+_UNITS = {'': 1024 ** 2, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2,
+          'GB': 1024 ** 3, 'TB': 1024 ** 4}
+# Part of the budget given to a chunk, leaving room for the allocations
+# the estimate does not model (allocator slack, plotting, ...)
+_CHUNK_SHARE = 0.5
+
+
+def parse_memory(value):
+    """
+    Read a memory size.
+
+    Parameters:
+    - value: A positive number of megabytes, or a string with a unit
+      (B, KB, MB, GB or TB, in powers of 1024), e.g. '512MB' or '4GB'.
+
+    Raises:
+    - ValueError: If the value is not a positive size.
+
+    Returns:
+    - The size in bytes.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f'{value!r} is not a memory size')
+    if isinstance(value, (int, float)):
+        number, unit = value, ''
+    else:
+        match = re.fullmatch(r'\s*([0-9]*\.?[0-9]+)\s*([KMGT]?B?)\s*',
+                             str(value).upper())
+        if match is None:
+            raise ValueError(f'{value!r} is not a memory size')
+        number, unit = float(match.group(1)), match.group(2)
+        if unit in ('K', 'M', 'G', 'T'):
+            unit += 'B'
+    size = int(number * _UNITS[unit])
+    if size <= 0:
+        raise ValueError(f'{value!r} is not a memory size')
+    return size
+
+
+def peak_rss():
+    """
+    Return the peak resident set size of the process in bytes, or None on
+    systems without the resource module (e.g., Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def snapshot_walkers(entry, snapshots):
+    """
+    Count the walkers of snapshots of a simulation from the HDF5 metadata
+    only (the shapes of the wavefunction files, or the offset index of a
+    packed store).
+
+    Parameters:
+    - entry: Catalog entry of the simulation (see Catalog).
+    - snapshots: Timesteps of the snapshots.
+
+    Returns:
+    - The total number of walkers.
+    """
+    from pyvisdmc.utils.packed import packed_rows
+    from pyvisdmc.utils.wfn_reader import wfn_shapes
+
+    packed = [ts for ts in snapshots
+              if entry['packed'] is not None
+              and entry['snapshots'][ts] == entry['packed']]
+    files = [entry['snapshots'][ts] for ts in snapshots if ts not in packed]
+    total = sum(wfn_shapes(files)[0]) if files else 0
+    if packed:
+        total += sum(hi - lo for lo, hi in packed_rows(entry['packed'], packed))
+    return total
+
+
+def walker_bytes(atoms, bonds, dtype=np.float64):
+    """
+    Estimate the bytes needed per walker to compute and draw bond lengths.
+
+    Parameters:
+    - atoms: Number of atoms.
+    - bonds: Number of distinct bonds computed.
+    - dtype: Floating point type of the coordinates and bond lengths.
+
+    Returns:
+    - The estimated bytes per walker.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    # coordinates, which HDF5 reads in the requested precision and which
+    # are converted to Angstroms in place
+    coords = atoms * 3 * itemsize
+    # weights, and the double precision copy of one row of bond lengths
+    weights = 2 * 8
+    # per bond: displacement vectors, bond length, and a double precision
+    # copy with a bin index to bin or draw it
+    per_bond = 3 * itemsize + itemsize + 8 + 8
+    return coords + weights + bonds * per_bond
+
+
+def plan_chunks(n_walkers, per_walker, limit, chunk_size=None, workers=1):
+    """
+    Decide how walkers are processed within a memory budget.
+
+    Parameters:
+    - n_walkers: Total number of walkers.
+    - per_walker: Estimated bytes per walker (see walker_bytes).
+    - limit: Memory budget of the walker data in bytes.
+    - chunk_size: Chunk size already requested, if any; it is kept when it
+      fits in the budget.
+    - workers: Number of processes holding a chunk at the same time.
+
+    Returns:
+    - (footprint, chunk_size): the estimated bytes to hold every walker,
+      and the number of walkers per chunk to stream them, or None if they
+      fit in memory at once.
+    """
+    footprint = n_walkers * per_walker
+    if chunk_size is None and footprint <= limit:
+        return footprint, None
+    fits = max(1, int(limit * _CHUNK_SHARE) // (per_walker * workers))
+    return footprint, fits if chunk_size is None else min(chunk_size, fits)
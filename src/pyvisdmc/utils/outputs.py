@@ -0,0 +1,128 @@
+"""
+outputs.py
+
+This module lets a run skip the figures that would come out the same as
+the ones already saved, in the manner of make. Every saved output is
+recorded in a small JSON index file, in the folder the figures are saved
+to, together with a fingerprint of its inputs: the modification times and
+sizes of the data files it was drawn from, the snapshot window, the atom
+indices, the plot options and the package version. A figure whose files
+exist and whose fingerprint is unchanged is up to date. The fingerprints
+only use file metadata, so checking them costs no data reads. Runs that
+save to the same folder at once take turns to update the index, through
+a lock file next to it.
+
+Classes:
+- OutputIndex: Fingerprints of the outputs saved in a folder.
+
+Functions:
+- file_stamps: Modification times and sizes of data files.
+- fingerprint: Fingerprint of the inputs of an output.
+
+Dependencies:
+- None
+"""
+import hashlib
+import json
+import os
+from importlib.metadata import version
+
+try:
+    import fcntl
+except ImportError:
+    # no file locks on Windows; the index is still replaced atomically
+    fcntl = None
+
+# Name of the index file written next to the saved figures
+OUTPUTS_NAME = '.pyvisdmc_outputs.json'
+_VERSION = 1
+
+
+def file_stamps(paths):
+    """
+    Return [path, modification time (ns), size] of every data file, in a
+    stable order and without duplicates (e.g., snapshots of one packed
+    store).
+    """
+    stamps = []
+    for path in sorted(set(os.path.abspath(p) for p in paths)):
+        stat = os.stat(path)
+        stamps.append([path, stat.st_mtime_ns, stat.st_size])
+    return stamps
+
+
+def fingerprint(inputs):
+    """
+    Fingerprint the inputs of an output.
+
+    Parameters:
+    - inputs: JSON-serializable dict of everything the output depends on
+      (e.g., file_stamps of its data, its snapshot window and options).
+      The version of the package is added, so that upgrading it rebuilds
+      every output.
+
+    Returns:
+    - Hex digest of the inputs.
+    """
+    inputs = dict(inputs, package_version=version('PyVisDMC'))
+    text = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class OutputIndex:
+    """
+    Fingerprints of the outputs saved in a folder.
+
+    Parameters:
+    - folder: Folder the outputs are saved to (the working directory by
+      default).
+
+    Attributes:
+    - records: Dictionary of fingerprints keyed by output file name.
+    """
+
+    def __init__(self, folder='.'):
+        self.folder = folder
+        self.index_file = os.path.join(folder, OUTPUTS_NAME)
+        self.records = self._read()
+
+    def _read(self):
+        try:
+            with open(self.index_file) as f:
+                index = json.load(f)
+            if index.get('version') == _VERSION:
+                return index['outputs']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def is_current(self, outputs, digest):
+        """
+        Return True if every file of an output exists and was saved from
+        inputs with the fingerprint `digest`.
+        """
+        return all(self.records.get(name) == digest
+                   and os.path.isfile(os.path.join(self.folder, name))
+                   for name in outputs)
+
+    def record(self, outputs, digest):
+        """
+        Record the fingerprint of saved outputs and save the index. The
+        index is read again and replaced while holding its lock file, so
+        that runs sharing the folder keep each other's records. A folder
+        that cannot be written to is left as is.
+        """
+        self.records.update(dict.fromkeys(outputs, digest))
+        tmp = f'{self.index_file}.{os.getpid()}.tmp'
+        try:
+            with open(f'{self.index_file}.lock', 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                records = self._read()
+                records.update(dict.fromkeys(outputs, digest))
+                with open(tmp, 'w') as f:
+                    json.dump({'version': _VERSION, 'outputs': records}, f)
+                os.replace(tmp, self.index_file)
+            self.records = records
+        except OSError:
+            pass
@@ -0,0 +1,294 @@
+"""
+packed.py
+
+This module packs the wavefunction snapshots of a simulation (one
+wfns/<NAME>_<sim>_wfn_<N>ts.hdf5 file per snapshot) into a single store,
+<NAME>_<sim>_packed.hdf5, written next to the simulation's sim_info file.
+The walkers of every snapshot are stored one after the other in a
+'coords' and a 'weights' dataset, already converted to Angstroms, and an
+offset index ('snapshots', 'offsets') gives the rows of each snapshot.
+The path (relative to the store), modification time and size of the
+wavefunction file every snapshot was packed from are recorded too, so a
+store whose files were rewritten since can be told apart from a current
+one.
+
+Uncompressed datasets are contiguous in the file, so they are
+memory-mapped: the walkers of consecutive snapshots are then a zero-copy
+slice of the store, and only the pages used are read from disk. The
+coordinates can be stored in float32 to halve the store, and the store
+can be compressed (gzip, in chunks of walkers) at the price of decoding
+on every read.
+
+Functions:
+- packed_path: Path of the packed store of a simulation.
+- pack_snapshots: Writes a packed store from wavefunction files.
+- packed_snapshots: Lists the snapshots held by a packed store.
+- packed_rows: Rows of several snapshots in a packed store.
+- stale_snapshots: Lists the snapshots whose wavefunction file changed
+  since it was packed.
+- load_packed: Reads the walkers of several snapshots from a packed store.
+- iter_packed: Yields the walkers of several snapshots one chunk at a time.
+
+Dependencies:
+- numpy, h5py
+"""
+import os
+
+import numpy as np
+
+# h5py is slow to import, so it is only imported to read or write a store
+
+# Suffix of a packed store, replacing 'sim_info.hdf5' in the file name
+PACKED_SUFFIX = 'packed.hdf5'
+_VERSION = 1
+# Walkers per compressed chunk
+_CHUNK_WALKERS = 4096
+
+
+def packed_path(sim_info_path):
+    """
+    Return the path of the packed store of a simulation, e.g.
+    H2O_0_packed.hdf5 for H2O_0_sim_info.hdf5.
+    """
+    path, sim_name = os.path.split(sim_info_path)
+    return os.path.join(path, sim_name.split('sim_info')[0] + PACKED_SUFFIX)
+
+
+def pack_snapshots(path, wfn_files, snapshots, float32=False, compress=False):
+    """
+    Write the walkers of several wavefunction snapshots into one packed
+    store, reading one snapshot at a time.
+
+    Parameters:
+    - path: Path of the packed store (see packed_path).
+    - wfn_files: Paths to the wavefunction .hdf5 files, in order.
+    - snapshots: Timesteps of the snapshots, in the order of wfn_files.
+    - float32: If True, store the coordinates in single precision.
+    - compress: If True, gzip the coordinates and weights in chunks of
+      walkers. Compressed stores cannot be memory-mapped.
+
+    Raises:
+    - ValueError: If no files are given, or wfn_files and snapshots differ
+      in length.
+
+    Returns:
+    - Size of the store in bytes.
+    """
+    import h5py
+
+    from pyvisdmc.utils.wfn_reader import iter_wfns, wfn_shapes
+
+    if len(wfn_files) == 0:
+        raise ValueError('No wavefunction files to pack')
+    if len(wfn_files) != len(snapshots):
+        raise ValueError('Expected one timestep per wavefunction file')
+
+    walker_counts, num_atoms = wfn_shapes(wfn_files)
+    offsets = np.concatenate(([0], np.cumsum(walker_counts))).astype(np.int64)
+    n_walkers = int(offsets[-1])
+    coords_options, weights_options = {}, {}
+    if compress and n_walkers > 0:
+        chunk = min(_CHUNK_WALKERS, n_walkers)
+        coords_options = {'chunks': (chunk, num_atoms, 3),
+                          'compression': 'gzip', 'shuffle': True}
+        weights_options = {'chunks': (chunk,), 'compression': 'gzip',
+                           'shuffle': True}
+
+    # written under a temporary name so that an interrupted conversion
+    # never leaves a half-written store behind
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with h5py.File(tmp, 'w') as f:
+        f.attrs['version'] = _VERSION
+        f.attrs['units'] = 'angstroms'
+        coords = f.create_dataset('coords', shape=(n_walkers, num_atoms, 3),
+                                  dtype=np.float32 if float32 else np.float64,
+                                  **coords_options)
+        weights = f.create_dataset('weights', shape=(n_walkers,),
+                                   dtype=np.float64, **weights_options)
+        f.create_dataset('snapshots', data=np.asarray(snapshots, dtype=np.int64))
+        f.create_dataset('offsets', data=offsets)
+        # where every snapshot was packed from, to detect rewritten files
+        stats = [os.stat(wfn_file) for wfn_file in wfn_files]
+        folder = os.path.dirname(os.path.abspath(path))
+        f.create_dataset('source_files', data=[
+            os.path.relpath(os.path.abspath(wfn_file), folder)
+            for wfn_file in wfn_files], dtype=h5py.string_dtype())
+        f.create_dataset('source_mtimes', data=np.array(
+            [s.st_mtime_ns for s in stats], dtype=np.int64))
+        f.create_dataset('source_sizes', data=np.array(
+            [s.st_size for s in stats], dtype=np.int64))
+        lo = 0
+        for chunk_coords, chunk_weights in iter_wfns(wfn_files, ret_ang=True):
+            hi = lo + len(chunk_weights)
+            coords[lo:hi] = chunk_coords
+            weights[lo:hi] = chunk_weights
+            lo = hi
+    os.replace(tmp, path)
+
+    return os.path.getsize(path)
+
+
+def packed_snapshots(path):
+    """
+    Return the timesteps of the snapshots held by a packed store, read from
+    its offset index only.
+    """
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        return [int(ts) for ts in f['snapshots'][()]]
+
+
+def stale_snapshots(path, snapshots, wfn_files):
+    """
+    Find the snapshots of a packed store whose wavefunction file was
+    rewritten after it was packed.
+
+    Parameters:
+    - path: Path of the packed store.
+    - snapshots: Timesteps of the snapshots to check.
+    - wfn_files: Current paths of their wavefunction files, in order.
+
+    Returns:
+    - List of the timesteps whose file exists and differs in modification
+      time or size from the one packed. Files that were removed are not
+      stale, as the store is then the only copy. For stores written
+      without this record, files newer than the store are stale.
+    """
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        if 'source_mtimes' in f:
+            index = {int(ts): i for i, ts in enumerate(f['snapshots'][()])}
+            recorded = list(zip(f['source_mtimes'][()].tolist(),
+                                f['source_sizes'][()].tolist()))
+        else:
+            index = recorded = None
+    store_mtime = os.stat(path).st_mtime_ns
+
+    stale = []
+    for ts, wfn_file in zip(snapshots, wfn_files):
+        try:
+            stat = os.stat(wfn_file)
+        except OSError:
+            continue
+        if recorded is None:
+            changed = stat.st_mtime_ns > store_mtime
+        else:
+            changed = (stat.st_mtime_ns, stat.st_size) != recorded[index[int(ts)]]
+        if changed:
+            stale.append(int(ts))
+    return stale
+
+
+def _dataset(path, dset):
+    # contiguous datasets are memory-mapped; chunked (compressed) ones and
+    # empty ones are read with h5py
+    offset = dset.id.get_offset()
+    if dset.chunks is None and offset is not None:
+        return np.memmap(path, dtype=dset.dtype, mode='r', offset=offset,
+                         shape=dset.shape)
+    return dset
+
+
+def packed_rows(path, snapshots):
+    """
+    Return the (first, last + 1) rows of the walkers of several snapshots
+    in a packed store, read from its offset index only.
+
+    Raises:
+    - ValueError: If a snapshot is not in the store.
+    """
+    import h5py
+
+    with h5py.File(path, 'r') as f:
+        index = {int(ts): i for i, ts in enumerate(f['snapshots'][()])}
+        offsets = f['offsets'][()]
+        missing = [int(ts) for ts in snapshots if int(ts) not in index]
+        if missing:
+            raise ValueError(f'{path} has no snapshot at timestep(s) {missing}')
+        rows = [(int(offsets[index[int(ts)]]), int(offsets[index[int(ts)] + 1]))
+                for ts in snapshots]
+    return rows
+
+
+def load_packed(path, snapshots, dtype=None):
+    """
+    Read the coordinates and weights of several snapshots from a packed
+    store.
+
+    Parameters:
+    - path: Path of the packed store.
+    - snapshots: Timesteps of the snapshots, in the order returned.
+    - dtype: Floating point type of the coordinates returned. The type of
+      the store is kept if None.
+
+    Raises:
+    - ValueError: If a snapshot is not in the store.
+
+    Returns:
+    - coords: Coordinates array of shape (walkers, atoms, 3), in Angstroms.
+      Consecutive snapshots of an uncompressed store are a read-only,
+      memory-mapped view of the store.
+    - weights: Weights array of shape (walkers,).
+    """
+    import h5py
+
+    from pyvisdmc.utils.timing import stage
+
+    rows = packed_rows(path, snapshots)
+    # a memory-mapped slice is only read from disk when it is used, so
+    # its bytes are not counted here
+    n_walkers = sum(hi - lo for lo, hi in rows)
+    with stage('packed.read', samples=n_walkers) as timed:
+        with h5py.File(path, 'r') as f:
+            coords = _dataset(path, f['coords'])
+            weights = _dataset(path, f['weights'])
+            contiguous = all(a[1] == b[0] for a, b in zip(rows, rows[1:]))
+            if contiguous and isinstance(coords, np.memmap):
+                coords = coords[rows[0][0]:rows[-1][1]]
+                weights = weights[rows[0][0]:rows[-1][1]]
+            else:
+                coords = np.concatenate([coords[lo:hi] for lo, hi in rows])
+                weights = np.concatenate([weights[lo:hi] for lo, hi in rows])
+                timed.add(bytes=coords.nbytes + weights.nbytes)
+        if dtype is not None and coords.dtype != dtype:
+            coords = coords.astype(dtype)
+    return coords, weights
+
+
+def iter_packed(path, snapshots, chunk_size=None, dtype=None):
+    """
+    Yield the coordinates and weights of several snapshots of a packed
+    store one chunk at a time (see pyvisdmc.utils.iter_wfns).
+
+    Parameters:
+    - path: Path of the packed store.
+    - snapshots: Timesteps of the snapshots, in order.
+    - chunk_size: Maximum number of walkers per chunk. If None, every
+      snapshot is one chunk.
+    - dtype: Floating point type of the coordinates (see load_packed).
+
+    Raises:
+    - ValueError: If chunk_size is not a positive integer or a snapshot is
+      not in the store.
+
+    Yields:
+    - (coords, weights) for consecutive walkers, in Angstroms.
+    """
+    import h5py
+
+    if chunk_size is not None and (not isinstance(chunk_size, int)
+                                   or chunk_size < 1):
+        raise ValueError('chunk_size must be a positive integer')
+
+    rows = packed_rows(path, snapshots)
+    with h5py.File(path, 'r') as f:
+        coords = _dataset(path, f['coords'])
+        weights = _dataset(path, f['weights'])
+        for start, stop in rows:
+            step = stop - start if chunk_size is None else chunk_size
+            for lo in range(start, stop, max(step, 1)):
+                hi = min(lo + step, stop)
+                yield (np.array(coords[lo:hi], dtype=dtype),
+                       np.array(weights[lo:hi]))
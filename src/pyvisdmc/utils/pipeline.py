@@ -0,0 +1,100 @@
+"""
+pipeline.py
+
+This module plans the data products of a run (e.g. the reference energy,
+the walker coordinates and weights, the bond lengths or their histograms)
+as a small dependency graph. Every product is declared with the function
+that computes it and the products it is computed from. Asking for a set
+of products computes them and, recursively, only the products they depend
+on, each at most once. A run that only plots Eref therefore never reads a
+wavefunction snapshot.
+
+Classes:
+- Pipeline: Lazy graph of named data products.
+
+Dependencies:
+- None
+"""
+from pyvisdmc.utils.timing import stage
+
+
+class Pipeline:
+    """
+    Lazy graph of named data products.
+
+    Attributes:
+    - computed: Names of the products computed so far, in the order they
+      were computed.
+    """
+
+    def __init__(self):
+        self.computed = []
+        self._steps = {}
+        self._values = {}
+
+    def add(self, name, func, requires=()):
+        """
+        Declare a data product.
+
+        Parameters:
+        - name: Name of the product.
+        - func: Function computing the product, called with the values of
+          the required products as positional arguments.
+        - requires: Names of the products func needs. They must already be
+          declared, which keeps the graph free of cycles.
+
+        Raises:
+        - ValueError: If the product is already declared or a required
+          product is not.
+        """
+        if name in self._steps:
+            raise ValueError(f'Data product {name} is already declared')
+        for dep in requires:
+            if dep not in self._steps:
+                raise ValueError(f'Data product {name} requires the '
+                                 f'undeclared product {dep}')
+        self._steps[name] = (func, tuple(requires))
+
+    def plan(self, targets):
+        """
+        List the products needed for a set of targets.
+
+        Parameters:
+        - targets: Names of the requested products.
+
+        Raises:
+        - ValueError: If a target is not declared.
+
+        Returns:
+        - Names of the targets and of every product they depend on, each
+          listed after its own dependencies.
+        """
+        order = []
+
+        def visit(name):
+            if name not in self._steps:
+                raise ValueError(f'Unknown data product {name}')
+            if name in order:
+                return
+            for dep in self._steps[name][1]:
+                visit(dep)
+            order.append(name)
+
+        for name in targets:
+            visit(name)
+        return order
+
+    def get(self, name):
+        """
+        Return the value of a product, computing it and the products it
+        depends on if they were not computed yet. Every product computed is
+        timed as a 'pipeline.<name>' stage (see pyvisdmc.utils.timing).
+        """
+        for step in self.plan([name]):
+            if step not in self._values:
+                func, requires = self._steps[step]
+                with stage(f'pipeline.{step}'):
+                    self._values[step] = func(*(self._values[dep]
+                                                for dep in requires))
+                self.computed.append(step)
+        return self._values[name]
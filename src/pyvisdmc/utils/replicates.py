@@ -0,0 +1,178 @@
+"""
+replicates.py
+
+This module pools independent replicates of the same DMC simulation (the
+same molecule, walkers and timesteps, with different simulation numbers).
+
+Every replicate is reduced on its own to a ZPE and to weighted histograms
+of the requested bond lengths, and the replicates are processed in
+parallel worker processes. The histograms of finished replicates are
+merged into the pooled ones as soon as they arrive, so the walkers of
+different replicates are never concatenated in memory. The spread of the
+replicate ZPEs gives the replicate-to-replicate error of the pooled ZPE.
+
+Functions:
+- parse_sim_nums: Reads a simulation number, a list of them, or a range.
+- replicate_label: Short name of a set of replicates for file names.
+- replicate_zpes: ZPE of each replicate.
+- pooled_zpe: Mean ZPE of the replicates and its standard error.
+- pool_bond_histograms: Weighted bond length histograms pooled over the
+  replicates.
+
+Dependencies:
+- numpy, pyvibdmc, concurrent.futures, multiprocessing
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+
+def parse_sim_nums(sim_num):
+    """
+    Read the simulation numbers of a set of replicates.
+
+    Parameters:
+    - sim_num: A non-negative integer, a list of them, or an inclusive
+      range written as a string (e.g., '0-9').
+
+    Raises:
+    - ValueError: If sim_num is none of the above, or a list or range is
+      empty or repeats a simulation number.
+
+    Returns:
+    - List of simulation numbers.
+    """
+    if isinstance(sim_num, str):
+        lo, sep, hi = sim_num.partition('-')
+        if not sep or not lo.strip().isdigit() or not hi.strip().isdigit():
+            raise ValueError('Simulation number must be a non-negative integer.')
+        sim_nums = list(range(int(lo), int(hi) + 1))
+    elif isinstance(sim_num, list):
+        sim_nums = sim_num
+    else:
+        sim_nums = [sim_num]
+
+    if (not sim_nums or len(set(sim_nums)) != len(sim_nums)
+            or not all(isinstance(s, int) and not isinstance(s, bool)
+                       and s >= 0 for s in sim_nums)):
+        raise ValueError('Simulation number must be a non-negative integer.')
+    return sim_nums
+
+
+def replicate_label(sim_nums):
+    """
+    Name a set of replicates in output file names: '3' for one
+    simulation, '0-9' for a contiguous range, and '0_2_5' otherwise.
+    """
+    if len(sim_nums) == 1:
+        return str(sim_nums[0])
+    if list(sim_nums) == list(range(sim_nums[0], sim_nums[-1] + 1)):
+        return f'{sim_nums[0]}-{sim_nums[-1]}'
+    return '_'.join(str(s) for s in sim_nums)
+
+
+def replicate_zpes(sim_datas, start, stop):
+    """
+    Compute the ZPE of each replicate.
+
+    Parameters:
+    - sim_datas: List of pyvibdmc SimInfo instances, one per replicate.
+    - start, stop: Range of timesteps averaged.
+
+    Returns:
+    - Array with the ZPE of each replicate, in cm^-1.
+    """
+    return np.array([np.mean(s.get_vref(ret_cm=True)[start:stop, 1])
+                     for s in sim_datas])
+
+
+def pooled_zpe(zpes):
+    """
+    Pool the ZPEs of independent replicates.
+
+    Parameters:
+    - zpes: ZPE of each replicate.
+
+    Raises:
+    - ValueError: If there are fewer than 2 replicates.
+
+    Returns:
+    - zpe: Mean ZPE of the replicates.
+    - error: Standard error of the mean over the replicates.
+    """
+    zpes = np.asarray(zpes, dtype=np.float64)
+    if len(zpes) < 2:
+        raise ValueError('At least 2 replicates are needed for a '
+                         'replicate-to-replicate error')
+    return float(np.mean(zpes)), float(np.std(zpes, ddof=1)
+                                       / np.sqrt(len(zpes)))
+
+
+def _replicate_histograms(fname, start, stop, pairs, edges, joint,
+                          chunk_size, snapshots, dtype):
+    # runs in a worker: only the small histograms are sent back
+    import pyvibdmc as pv
+
+    from pyvisdmc.utils.data_loader import iter_sim_info
+    from pyvisdmc.utils.histogram import accumulate_bond_histograms
+
+    return accumulate_bond_histograms(
+        iter_sim_info(pv.SimInfo(fname), start, stop, chunk_size,
+                      snapshots=snapshots, dtype=dtype), pairs,
+        edges, joint=joint)
+
+
+def pool_bond_histograms(sim_datas, start, stop, pairs, edges, joint=None,
+                         chunk_size=None, workers=1, snapshots=None,
+                         dtype=np.float64):
+    """
+    Fill weighted histograms of bond lengths for every replicate
+    independently and merge them into pooled histograms.
+
+    Parameters:
+    - sim_datas: List of pyvibdmc SimInfo instances, one per replicate.
+    - start, stop: Range of timesteps of the snapshots used.
+    - pairs: List of pairs of atom indices (e.g., [[0, 1], [2, 3]]).
+    - edges: Bin edges used for every bond length.
+    - joint: Optional two pairs of atom indices for a pooled 2D histogram.
+    - chunk_size: Maximum number of walkers in memory per replicate (one
+      snapshot at a time if None).
+    - workers: Number of replicates processed at the same time.
+    - snapshots: Timesteps of the snapshots used (see iter_sim_info).
+    - dtype: Floating point type of the coordinates (see iter_sim_info).
+
+    Returns:
+    - hists: List of pooled 1D HistogramAccumulators, one per pair.
+    - joint_hist: Pooled 2D HistogramAccumulator for `joint`, or None.
+    """
+    args = [(s.fname, start, stop, pairs, edges, joint, chunk_size, snapshots,
+             dtype) for s in sim_datas]
+    pooled = None
+
+    def merge(result):
+        nonlocal pooled
+        if pooled is None:
+            pooled = result
+            return
+        for total, hist in zip(pooled[0], result[0]):
+            total.merge(hist)
+        if pooled[1] is not None:
+            pooled[1].merge(result[1])
+
+    if workers == 1 or len(args) < 2:
+        for a in args:
+            merge(_replicate_histograms(*a))
+    else:
+        context = (multiprocessing.get_context('fork')
+                   if 'fork' in multiprocessing.get_all_start_methods()
+                   else None)
+        with ProcessPoolExecutor(max_workers=min(workers, len(args)),
+                                 mp_context=context) as pool:
+            futures = [pool.submit(_replicate_histograms, *a) for a in args]
+            # histograms are merged in completion order, so at most one
+            # finished replicate waits to be added to the pooled totals
+            for future in as_completed(futures):
+                merge(future.result())
+
+    return pooled
@@ -0,0 +1,109 @@
+"""
+resample.py
+
+This module draws a small representative subset of a weighted walker
+ensemble for quick-look plots. Systematic resampling places `size` evenly
+spaced pointers, with one random offset, on the cumulative distribution of
+the DMC weights, and keeps the walker under each pointer. Walkers are
+therefore kept in proportion to their weight, and every kept walker gets
+the same weight. All the pointers are found with one np.searchsorted, so
+drawing the subset costs O(walkers) time regardless of its size.
+
+A weighted average over the subset differs from the one over the whole
+ensemble by a sampling error of about std / sqrt(n_eff), where n_eff is
+the effective number of samples of the subset.
+
+Functions:
+- systematic_resample: Indices of the walkers kept by systematic
+  resampling.
+- preview_walkers: Draws a subset of walkers with equal weights.
+- sampling_errors: Sampling errors of weighted averages.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+# Number of walkers of a preview when only `preview: true` is given
+PREVIEW_SIZE = 10000
+
+
+def systematic_resample(weights, size, seed=0):
+    """
+    Select walkers by systematic resampling of their weights.
+
+    Parameters:
+    - weights: Non-negative weights of the walkers.
+    - size: Number of walkers drawn.
+    - seed: Seed of the random offset of the pointers, so that a preview
+      is the same from run to run.
+
+    Raises:
+    - ValueError: If size is not a positive integer or the weights do not
+      sum to a positive number.
+
+    Returns:
+    - Sorted array of `size` walker indices, with repeats for walkers
+      heavier than total / size.
+    """
+    if not isinstance(size, (int, np.integer)) or size < 1:
+        raise ValueError('The number of walkers drawn must be a positive '
+                         'integer')
+    cumulative = np.cumsum(weights, dtype=np.float64)
+    if not cumulative[-1] > 0:
+        raise ValueError('The weights must sum to a positive number')
+
+    offset = np.random.default_rng(seed).random()
+    pointers = (offset + np.arange(size)) * (cumulative[-1] / size)
+    idx = np.searchsorted(cumulative, pointers, side='right')
+    # a pointer that rounds past the total selects the last walker
+    return np.minimum(idx, len(cumulative) - 1)
+
+
+def preview_walkers(coords, weights, size, seed=0):
+    """
+    Draw a subset of a walker ensemble by systematic resampling.
+
+    Parameters:
+    - coords: Coordinates array of shape (walkers, atoms, 3).
+    - weights: Weights associated with the molecular geometries.
+    - size: Number of walkers drawn. An ensemble that is not larger is
+      returned as is.
+    - seed: Seed of the resampling (see systematic_resample).
+
+    Returns:
+    - coords: Coordinates of the drawn walkers, a copy of shape
+      (size, atoms, 3).
+    - weights: Equal weights of the drawn walkers, summing to the total
+      weight of the ensemble.
+    """
+    if len(weights) <= size:
+        return coords, weights
+    idx = systematic_resample(weights, size, seed=seed)
+    total = np.sum(weights, dtype=np.float64)
+    return coords[idx], np.full(size, total / size)
+
+
+def sampling_errors(values, weights):
+    """
+    Estimate the sampling errors of weighted averages,
+    std / sqrt(n_eff) with n_eff = (sum w)^2 / sum w^2.
+
+    Parameters:
+    - values: Array of shape (quantities, walkers), e.g. the distances
+      returned by pyvisdmc.utils.bond_lengths.
+    - weights: Weights of the walkers.
+
+    Returns:
+    - Array of shape (quantities,) with the error of each weighted average.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    total = np.sum(weights)
+    n_eff = total ** 2 / np.dot(weights, weights)
+    errors = []
+    for row in values:
+        row = np.asarray(row, dtype=np.float64)
+        mean = np.dot(weights, row) / total
+        errors.append(np.sqrt(np.dot(weights, (row - mean) ** 2) / total
+                              / n_eff))
+    return np.array(errors)
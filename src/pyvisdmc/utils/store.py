@@ -0,0 +1,79 @@
+"""
+store.py
+
+This module provides a per-run store of derived quantities, so that a
+quantity requested by several plots in the same run (e.g. the same bond in
+`dist`, `mult_dists` and `2d_dists`) is computed only once. Quantities are
+keyed by their type and atom indices, and the store counts how many
+lookups were served from it (hits) and how many had to be computed
+(misses).
+
+Classes:
+- QuantityStore: Computes and remembers bond lengths and their expectation
+  values for one walker ensemble.
+
+Dependencies:
+- numpy
+"""
+import numpy as np
+
+from pyvisdmc.utils.distances import bond_lengths
+
+
+class QuantityStore:
+    """
+    Store of the derived quantities of one walker ensemble.
+
+    Parameters:
+    - coords: Coordinates array of shape (walkers, atoms, 3).
+    - weights: Weights associated with the molecular geometries.
+    """
+
+    def __init__(self, coords, weights):
+        self.coords = coords
+        self.weights = weights
+        self.hits = 0
+        self.misses = 0
+        self._values = {}
+
+    @staticmethod
+    def _bond_key(pair):
+        # the bond length does not depend on the order of the two atoms
+        i, j = int(pair[0]), int(pair[1])
+        return ('bond_length', min(i, j), max(i, j))
+
+    def bond_lengths(self, pairs):
+        """
+        Return the bond lengths and expectation values of several pairs of
+        atoms, computing only the pairs not already in the store (all of
+        them in a single pass over the coordinates).
+
+        Parameters:
+        - pairs: List of pairs of atom indices (e.g., [[0, 1], [2, 3]]).
+
+        Returns:
+        - (distances, exp_vals) in the same layout as
+          pyvisdmc.utils.bond_lengths.
+        """
+        keys = [self._bond_key(pair) for pair in pairs]
+        missing = list(dict.fromkeys(k for k in keys if k not in self._values))
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            distances, exp_vals = bond_lengths(
+                self.coords, self.weights, [key[1:] for key in missing])
+            for key, distance, exp_val in zip(missing, distances, exp_vals):
+                self._values[key] = (distance, exp_val)
+
+        distances = np.stack([self._values[key][0] for key in keys])
+        exp_vals = np.array([self._values[key][1] for key in keys])
+
+        return distances, exp_vals
+
+    def report(self):
+        """
+        Return a one-line summary of the store's hit and miss counts.
+        """
+        return (f"Quantity store: {self.hits} hits, {self.misses} misses, "
+                f"{len(self._values)} quantities stored")
@@ -0,0 +1,188 @@
+"""
+timing.py
+
+This module times the stages of a run (reading the HDF5 snapshots,
+converting units, computing bond lengths, drawing densities, saving
+figures, ...). The modules of PyVisDMC wrap their stages in `stage`, and
+a `Trace` records them while it is active:
+
+    with Trace() as trace:
+        run('config.yml')
+    trace.write('trace.json')
+
+Every stage records its start, duration, optional counts (e.g. the
+bytes read and the samples processed) and the peak resident set size
+(RSS) of the process when it ends, so the memory of a run can be traced
+to the stage where it grows. The trace is written in the Chrome trace
+event format, which chrome://tracing and https://ui.perfetto.dev
+open directly, with a summary of the total time and counts per stage.
+Nested stages are shown inside their parent, and their time is included
+in the parent's total.
+
+When no trace is active, `stage` returns a shared object that does
+nothing, so the stages cost a function call each and the timing has no
+measurable overhead. Stages run in worker processes are not recorded;
+their time is part of the stage that started the workers.
+
+Classes:
+- Trace: Records the stages run while it is active.
+
+Functions:
+- stage: Times one stage of a run.
+
+Dependencies:
+- None
+"""
+import json
+import os
+import threading
+import time
+
+# Trace recording the stages, or None when timing is off
+_active = None
+
+
+class _NullStage:
+    # returned by stage() when no trace is active
+    def add(self, **counts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, trace, name, counts):
+        self.trace = trace
+        self.name = name
+        self.counts = counts
+        self.start = None
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + int(value)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace._record(self.name, self.start, time.perf_counter(),
+                           self.counts, self.trace._peak_rss())
+        return False
+
+
+def stage(name, **counts):
+    """
+    Time one stage of a run, as a context manager.
+
+    Parameters:
+    - name: Name of the stage, as '<module>.<step>' (e.g.,
+      'wfn_reader.read').
+    - **counts: Integer counts of the stage known in advance, e.g.
+      bytes=... or samples=...; more can be added with .add(**counts)
+      inside the stage.
+
+    Returns:
+    - A context manager. It records the stage in the active Trace, or
+      does nothing if there is none.
+    """
+    if _active is None:
+        return _NULL_STAGE
+    return _Stage(_active, name, {key: int(value)
+                                  for key, value in counts.items()})
+
+
+class Trace:
+    """
+    Records the stages run while it is active (see stage).
+
+    Attributes:
+    - events: List of the recorded stages, as dicts with 'name', 'start'
+      and 'seconds' (relative to the start of the trace), 'thread',
+      'counts' and 'peak_rss' (in bytes, None where it cannot be read).
+    """
+
+    def __init__(self):
+        from pyvisdmc.utils.memory import peak_rss
+
+        self._peak_rss = peak_rss
+        self.events = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        return False
+
+    def _record(self, name, start, stop, counts, rss=None):
+        # a forked worker inherits the trace, but its stages are lost
+        # with it
+        if os.getpid() != self._pid:
+            return
+        self.events.append({'name': name, 'start': start - self._origin,
+                            'seconds': stop - start,
+                            'thread': threading.get_native_id(),
+                            'counts': counts, 'peak_rss': rss})
+
+    def summary(self):
+        """
+        Return the number of calls, total seconds, total counts and peak
+        RSS (in bytes) of every stage, in the order the stages first
+        ended.
+        """
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event['name'],
+                                      {'calls': 0, 'seconds': 0.0})
+            total['calls'] += 1
+            total['seconds'] += event['seconds']
+            if event.get('peak_rss') is not None:
+                total['peak_rss'] = max(total.get('peak_rss', 0), event['peak_rss'])
+            for key, value in event['counts'].items():
+                total[key] = total.get(key, 0) + value
+        return totals
+
+    def report(self):
+        """Return the summary as a table, one line per stage."""
+        lines = ['Profile (inclusive times, peak RSS at the end of the stage):']
+        for name, total in self.summary().items():
+            counts = ''.join(f'  {key}={value}' for key, value in total.items()
+                             if key not in ('calls', 'seconds', 'peak_rss'))
+            rss = (f" {total['peak_rss'] / 1024 ** 2:8.1f} MB"
+                   if 'peak_rss' in total else '')
+            lines.append(f"  {name:28s} {total['calls']:5d} calls "
+                         f"{total['seconds'] * 1e3:10.1f} ms{rss}{counts}")
+        return '\n'.join(lines)
+
+    def write(self, path):
+        """
+        Write the trace in the Chrome trace event format, with the summary
+        under 'otherData'.
+        """
+        events = []
+        for e in self.events:
+            args = dict(e['counts'])
+            if e['peak_rss'] is not None:
+                args['peak_rss'] = e['peak_rss']
+            events.append({'name': e['name'], 'cat': e['name'].split('.')[0],
+                           'ph': 'X', 'ts': e['start'] * 1e6,
+                           'dur': e['seconds'] * 1e6, 'pid': self._pid,
+                           'tid': e['thread'], 'args': args})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms',
+                       'otherData': {'stages': self.summary()}}, f, indent=1)
@@ -0,0 +1,93 @@
+"""
+watch.py
+
+This module follows a simulation that is still running. The weighted bond
+length histograms (and their running moments) are kept between updates,
+and every update only reads the wavefunction snapshots that were written
+since the previous one and merges them in. The cost of an update is
+therefore proportional to the new snapshots, not to the whole history.
+
+Classes:
+- SnapshotHistograms: Bond length histograms of a growing set of
+  snapshots.
+
+Dependencies:
+- numpy, h5py, pyvibdmc
+"""
+import numpy as np
+
+from pyvisdmc.utils.histogram import (HistogramAccumulator,
+                                      accumulate_bond_histograms)
+
+
+class SnapshotHistograms:
+    """
+    Weighted bond length histograms of a growing set of snapshots.
+
+    Parameters:
+    - pairs: List of pairs of atom indices (e.g., [[0, 1], [2, 3]]).
+    - edges: Bin edges used for every bond length.
+    - joint: Optional two pairs of atom indices for a 2D histogram.
+    - chunk_size: Maximum number of walkers in memory (one snapshot at a
+      time if None).
+    - dtype: Floating point type of the coordinates (see iter_sim_info).
+
+    Attributes:
+    - hists: List of 1D HistogramAccumulators, one per pair.
+    - joint_hist: 2D HistogramAccumulator for `joint`, or None.
+    - processed: Set of the timesteps of the snapshots merged so far.
+    """
+
+    def __init__(self, pairs, edges, joint=None, chunk_size=None,
+                 dtype=np.float64):
+        self.pairs = [tuple(pair) for pair in pairs]
+        self.edges = edges
+        self.joint = joint
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+        self.hists = [HistogramAccumulator(edges) for _ in self.pairs]
+        self.joint_hist = (None if joint is None
+                           else HistogramAccumulator(edges, edges))
+        self.processed = set()
+
+    def update(self, sim_data, snapshots):
+        """
+        Merge the snapshots that were not merged yet.
+
+        A snapshot that cannot be read yet (e.g., a file that is still
+        being written) stops the update; it and the later snapshots are
+        tried again by the next update.
+
+        Parameters:
+        - sim_data: pyvibdmc SimInfo instance of the simulation.
+        - snapshots: Timesteps of the snapshots available, in order.
+
+        Returns:
+        - List of the timesteps of the snapshots merged by this update.
+        """
+        from pyvisdmc.utils.data_loader import iter_sim_info
+
+        merged = []
+        for ts in snapshots:
+            if ts in self.processed:
+                continue
+            # one snapshot at a time, so a partly written file never leaves
+            # half of its walkers in the totals
+            try:
+                hists, joint_hist = accumulate_bond_histograms(
+                    iter_sim_info(sim_data, ts, ts + 1, self.chunk_size,
+                                  snapshots=[ts], dtype=self.dtype),
+                    self.pairs, self.edges, joint=self.joint)
+            except (OSError, KeyError, ValueError):
+                break
+            for total, hist in zip(self.hists, hists):
+                total.merge(hist)
+            if self.joint_hist is not None:
+                self.joint_hist.merge(joint_hist)
+            self.processed.add(ts)
+            merged.append(ts)
+        return merged
+
+    def histogram(self, pair):
+        """Return the 1D histogram of a pair of atom indices."""
+        return self.hists[self.pairs.index(tuple(pair))]
@@ -0,0 +1,219 @@
+"""
+wfn_reader.py
+
+This module provides a fast reader for the wavefunction snapshot files
+written by PyVibDMC (wfns/<NAME>_<sim>_wfn_<N>ts.hdf5). Instead of going
+through SimInfo.get_wfns, which reads every snapshot into its own array and
+concatenates them at the end, the files are opened directly with h5py, their
+dataset shapes are read from the metadata first, and the coordinates and
+descendant weights are read straight into one preallocated output array.
+The snapshots can also be read in parallel by a pool of worker processes,
+each of which writes into its own slice of a shared output buffer.
+
+Functions:
+- wfn_shapes: Reads the number of walkers and atoms of each snapshot file.
+- read_wfns: Reads the coordinates and weights of several snapshots into
+  preallocated arrays, optionally in parallel, in single precision and
+  converting to Angstroms in place.
+- iter_wfns: Yields the coordinates and weights of several snapshots one
+  chunk of walkers at a time.
+
+Dependencies:
+- numpy, h5py, pyvibdmc
+"""
+import mmap
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import h5py
+import numpy as np
+
+from pyvisdmc.utils.timing import stage
+
+_COORDS = 'coords'
+_WEIGHTS = 'desc_wts'
+
+def _bohr_per_angstrom():
+    # pyvibdmc is slow to import, so it is only imported to convert units
+    import pyvibdmc as pv
+    return pv.Constants.atomic_units['angstroms']
+
+
+# Output buffers seen by the worker processes of a parallel read
+_shared = {}
+
+
+def wfn_shapes(wfn_files):
+    """
+    Read the shapes of the snapshot files from their metadata only.
+
+    Parameters:
+    - wfn_files: Paths to the wavefunction .hdf5 files.
+
+    Raises:
+    - ValueError: If a file is missing the coordinate or weight dataset, or
+      if the snapshots do not all have the same number of atoms.
+
+    Returns:
+    - (walker_counts, num_atoms), where walker_counts is a list with the
+      number of walkers in each file.
+    """
+    walker_counts = []
+    num_atoms = None
+    for wfn_file in wfn_files:
+        with h5py.File(wfn_file, 'r') as f:
+            if _COORDS not in f or _WEIGHTS not in f:
+                raise ValueError(
+                    f'{wfn_file} is not a valid wavefunction file')
+            n_walkers, n_atoms, _ = f[_COORDS].shape
+        if num_atoms is None:
+            num_atoms = n_atoms
+        elif n_atoms != num_atoms:
+            raise ValueError(
+                f'{wfn_file} has {n_atoms} atoms, expected {num_atoms}')
+        walker_counts.append(n_walkers)
+
+    return walker_counts, num_atoms
+
+
+def _read_snapshot(wfn_file, coords, weights):
+    with h5py.File(wfn_file, 'r') as f:
+        # read_direct decodes straight into the output slice, no copies
+        f[_COORDS].read_direct(coords)
+        f[_WEIGHTS].read_direct(weights)
+
+
+def _init_worker(coords_buf, weights_buf, shape, dtype):
+    _shared['coords'] = np.frombuffer(coords_buf, dtype=dtype).reshape(shape)
+    _shared['weights'] = np.frombuffer(weights_buf)
+
+
+def _read_shared(wfn_file, lo, hi):
+    _read_snapshot(wfn_file, _shared['coords'][lo:hi],
+                   _shared['weights'][lo:hi])
+
+
+def read_wfns(wfn_files, ret_ang=False, workers=1, dtype=np.float64):
+    """
+    Read the coordinates and descendant weights of several snapshots into
+    one preallocated array each. The result is identical to
+    SimInfo.get_wfns for the same files.
+
+    Parameters:
+    - wfn_files: Paths to the wavefunction .hdf5 files, in order.
+    - ret_ang: If True, convert the coordinates from Bohr to Angstroms
+      in place (same result as pyvibdmc's Constants.convert).
+    - workers: Number of snapshots read in parallel. With more than one
+      worker, the files are read by a process pool writing into a shared
+      buffer (or by a thread pool where processes cannot be forked).
+      The output order is always the order of wfn_files.
+    - dtype: Floating point type of the coordinates (np.float64 or
+      np.float32). HDF5 converts the stored values while reading, so no
+      double precision copy of the coordinates is made. The weights are
+      always read in double precision.
+
+    Raises:
+    - ValueError: If no files are given, workers is not a positive
+      integer, or a file is not a valid wavefunction file.
+
+    Returns:
+    - coords: Coordinates array of shape (walkers, atoms, 3).
+    - weights: Weights array of shape (walkers,).
+    """
+    if len(wfn_files) == 0:
+        raise ValueError('No wavefunction files to read')
+    if not isinstance(workers, int) or workers < 1:
+        raise ValueError('workers must be a positive integer')
+
+    walker_counts, num_atoms = wfn_shapes(wfn_files)
+    offsets = np.concatenate(([0], np.cumsum(walker_counts)))
+    shape = (int(offsets[-1]), num_atoms, 3)
+    workers = min(workers, len(wfn_files))
+
+    dtype = np.dtype(dtype)
+    n_bytes = dtype.itemsize * int(np.prod(shape)) + 8 * shape[0]
+    with stage('wfn_reader.read', bytes=n_bytes, samples=shape[0]):
+        if workers == 1 or offsets[-1] == 0:
+            coords = np.empty(shape, dtype=dtype)
+            weights = np.empty(shape[0], dtype=np.float64)
+            for i, wfn_file in enumerate(wfn_files):
+                lo, hi = offsets[i], offsets[i + 1]
+                _read_snapshot(wfn_file, coords[lo:hi], weights[lo:hi])
+        elif 'fork' in multiprocessing.get_all_start_methods():
+            # Anonymous shared mappings are inherited by forked workers, so
+            # every worker writes its snapshot directly into the parent's
+            # arrays
+            coords_buf = mmap.mmap(-1, dtype.itemsize * int(np.prod(shape)))
+            weights_buf = mmap.mmap(-1, 8 * shape[0])
+            coords = np.frombuffer(coords_buf, dtype=dtype).reshape(shape)
+            weights = np.frombuffer(weights_buf)
+            with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('fork'),
+                    initializer=_init_worker,
+                    initargs=(coords_buf, weights_buf, shape, dtype)) as pool:
+                jobs = [pool.submit(_read_shared, wfn_file,
+                                    offsets[i], offsets[i + 1])
+                        for i, wfn_file in enumerate(wfn_files)]
+                for job in jobs:
+                    job.result()
+        else:
+            coords = np.empty(shape, dtype=dtype)
+            weights = np.empty(shape[0], dtype=np.float64)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                jobs = [pool.submit(_read_snapshot, wfn_file,
+                                    coords[offsets[i]:offsets[i + 1]],
+                                    weights[offsets[i]:offsets[i + 1]])
+                        for i, wfn_file in enumerate(wfn_files)]
+                for job in jobs:
+                    job.result()
+
+    if ret_ang:
+        with stage('wfn_reader.convert', bytes=coords.nbytes,
+                   samples=shape[0]):
+            coords /= coords.dtype.type(_bohr_per_angstrom())
+
+    return coords, weights
+
+
+def iter_wfns(wfn_files, ret_ang=False, chunk_size=None, dtype=np.float64):
+    """
+    Yield the coordinates and descendant weights of several snapshots one
+    chunk at a time, so that at most one chunk is in memory.
+
+    Parameters:
+    - wfn_files: Paths to the wavefunction .hdf5 files, in order.
+    - ret_ang: If True, convert the coordinates from Bohr to Angstroms.
+    - chunk_size: Maximum number of walkers per chunk. If None, every
+      snapshot is one chunk.
+    - dtype: Floating point type of the coordinates (see read_wfns).
+
+    Raises:
+    - ValueError: If chunk_size is not a positive integer or a file is not
+      a valid wavefunction file.
+
+    Yields:
+    - (coords, weights) for consecutive walkers, in the order of wfn_files.
+    """
+    if chunk_size is not None and (not isinstance(chunk_size, int)
+                                   or chunk_size < 1):
+        raise ValueError('chunk_size must be a positive integer')
+
+    for wfn_file in wfn_files:
+        with h5py.File(wfn_file, 'r') as f:
+            if _COORDS not in f or _WEIGHTS not in f:
+                raise ValueError(
+                    f'{wfn_file} is not a valid wavefunction file')
+            n_walkers = f[_COORDS].shape[0]
+            step = n_walkers if chunk_size is None else chunk_size
+            for lo in range(0, n_walkers, max(step, 1)):
+                hi = min(lo + step, n_walkers)
+                with stage('wfn_reader.read', samples=hi - lo) as timed:
+                    coords = f[_COORDS].astype(dtype)[lo:hi]
+                    weights = f[_WEIGHTS][lo:hi]
+                    timed.add(bytes=coords.nbytes + weights.nbytes)
+                if ret_ang:
+                    with stage('wfn_reader.convert', bytes=coords.nbytes,
+                               samples=hi - lo):
+                        coords /= coords.dtype.type(_bohr_per_angstrom())
+                yield coords, weights
@@ -0,0 +1,91 @@
+"""
+Tests for the blocking module
+"""
+import numpy as np
+import pytest
+
+from pyvisdmc.utils import block_errors, block_error, bootstrap_error
+
+
+def ar1(n, phi, seed=0):
+    """Correlated AR(1) series with unit innovations."""
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(size=n)
+    x = np.empty(n)
+    x[0] = noise[0]
+    for i in range(1, n):
+        x[i] = phi * x[i - 1] + noise[i]
+    return x
+
+
+def test_smoke_block_errors():
+    """
+    Simple smoke test to make sure block_errors runs.
+    """
+    sizes, errors, error_errors = block_errors(np.random.rand(100))
+
+    assert sizes.tolist() == [1, 2, 4, 8, 16, 32]
+    assert errors.shape == error_errors.shape == sizes.shape
+
+
+def test_first_level_is_naive_error():
+    """
+    One shot test that blocks of size 1 give the naive standard error.
+    """
+    x = np.random.rand(1000)
+    _, errors, _ = block_errors(x)
+
+    assert errors[0] == pytest.approx(np.std(x, ddof=1) / np.sqrt(1000))
+
+
+def test_matches_explicit_blocks():
+    """
+    Pattern test that the prefix-sum block averages match reshaped blocks.
+    """
+    x = np.random.rand(1000)
+    sizes, errors, _ = block_errors(x)
+    for size, error in zip(sizes, errors):
+        m = 1000 // size
+        means = x[:m * size].reshape(m, size).mean(axis=1)
+        assert error == pytest.approx(np.std(means, ddof=1) / np.sqrt(m))
+
+
+def test_correlated_series():
+    """
+    One shot test that the plateau recovers the exact error of the mean
+    of an AR(1) series, which the naive error underestimates.
+    """
+    n, phi = 2 ** 17, 0.9
+    x = ar1(n, phi)
+    # asymptotic error of the mean of an AR(1) process
+    exact = 1 / (1 - phi) / np.sqrt(n)
+
+    block_size, error = block_error(x)
+
+    assert block_size > 1
+    assert error == pytest.approx(exact, rel=0.2)
+    assert block_errors(x)[1][0] < 0.5 * exact
+
+
+def test_bootstrap_agrees_with_blocking():
+    """
+    One shot test that the block bootstrap agrees with blocking and does
+    not depend on the batch size.
+    """
+    x = ar1(2 ** 15, 0.8, seed=1)
+    block_size, error = block_error(x)
+
+    _, boot = bootstrap_error(x, n_boot=2000, seed=3)
+    _, boot_batched = bootstrap_error(x, n_boot=2000, seed=3,
+                                      batch_size=1000)
+
+    assert boot == pytest.approx(error, rel=0.25)
+    assert boot_batched == pytest.approx(boot, rel=0.1)
+
+
+def test_too_short():
+    """
+    Edge test for a series too short to block
+    """
+    with pytest.raises(ValueError, match='At least 4 points'):
+        block_errors([1.0, 2.0, 3.0])
@@ -0,0 +1,118 @@
+"""
+Tests for the cache module
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import (cache_key, load_cached, store_cached, evict,
+                            sim_info)
+from pyvisdmc.utils.data_loader import wfn_files
+
+SIM_INFO = ('src/pyvisdmc/test_data/h2o_example_data/'
+            '1.0w_5000_walkers_20000t_1dt/H2O_0_sim_info.hdf5')
+
+
+def test_smoke_cache_roundtrip(tmp_path):
+    """
+    Simple smoke test to make sure an entry can be stored and read back.
+    """
+    coords = np.random.rand(10, 3, 3)
+    weights = np.random.rand(10)
+
+    store_cached(tmp_path, 'abc', coords, weights)
+    cached_coords, cached_weights = load_cached(tmp_path, 'abc')
+
+    np.testing.assert_array_equal(cached_coords, coords)
+    np.testing.assert_array_equal(cached_weights, weights)
+
+
+def test_concurrent_store(tmp_path):
+    """
+    Pattern test that writers storing the same key at once (e.g., batch
+    workers) all succeed, keep one complete entry and leave no temporary
+    directory behind.
+    """
+    coords = np.random.rand(1000, 3, 3)
+    weights = np.random.rand(1000)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(
+            lambda _: store_cached(tmp_path, 'abc', coords, weights), range(16)))
+
+    for cached_coords, cached_weights in results:
+        np.testing.assert_array_equal(cached_coords, coords)
+        np.testing.assert_array_equal(cached_weights, weights)
+    assert os.listdir(tmp_path) == ['abc']
+
+
+def test_cache_miss(tmp_path):
+    """
+    Edge test for a key that is not in the cache
+    """
+    assert load_cached(tmp_path, 'missing') is None
+
+
+def test_missing_wfn_file(tmp_path):
+    """
+    Edge test for a snapshot whose wavefunction file does not exist
+    """
+    with pytest.raises(ValueError, match='does not exist'):
+        cache_key(SIM_INFO, [tmp_path / 'nope.hdf5'], [0], 'angstroms')
+
+
+def test_key_changes_with_mtime(tmp_path):
+    """
+    One shot test that touching a wavefunction file invalidates the key.
+    """
+    wfn = tmp_path / 'wfn.hdf5'
+    wfn.write_bytes(b'data')
+    key = cache_key(SIM_INFO, [wfn], [0], 'angstroms')
+
+    os.utime(wfn, ns=(0, 0))
+
+    assert cache_key(SIM_INFO, [wfn], [0], 'angstroms') != key
+    assert cache_key(SIM_INFO, [wfn], [0], 'bohr') != \
+        cache_key(SIM_INFO, [wfn], [0], 'angstroms')
+    assert cache_key(SIM_INFO, [wfn], [0], 'angstroms', dtype='float32') != \
+        cache_key(SIM_INFO, [wfn], [0], 'angstroms')
+
+
+def test_lru_eviction(tmp_path):
+    """
+    Pattern test that the least recently used entries are evicted first.
+    """
+    coords = np.zeros((100, 3, 3))
+    weights = np.zeros(100)
+    for i, key in enumerate(['a', 'b', 'c']):
+        store_cached(tmp_path, key, coords, weights)
+        os.utime(tmp_path / key, (i, i))
+    # Reading 'a' makes it the most recently used entry
+    load_cached(tmp_path, 'a')
+
+    entry_size = sum(f.stat().st_size for f in (tmp_path / 'a').iterdir())
+    evicted = evict(tmp_path, 2 * entry_size)
+
+    assert evicted == ['b']
+    assert load_cached(tmp_path, 'a') is not None
+    assert load_cached(tmp_path, 'c') is not None
+
+
+def test_sim_info_warm_run(tmp_path):
+    """
+    One shot test that a warm run returns the same ensemble as a cold run
+    without reading the wavefunction files.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    cold, cold_weights = sim_info(sim_data, 5000, 8000, cache_dir=tmp_path)
+
+    sim_data.get_wfns = None  # a warm run must not touch SimInfo
+    warm, warm_weights = sim_info(sim_data, 5000, 8000, cache_dir=tmp_path)
+
+    assert isinstance(warm.xx, np.memmap)
+    np.testing.assert_array_equal(warm.xx, cold.xx)
+    np.testing.assert_array_equal(warm_weights, cold_weights)
+    assert len(wfn_files(sim_data, [5000])) == 1
@@ -0,0 +1,153 @@
+"""
+Tests for the catalog module
+"""
+import os
+import shutil
+
+import pytest
+
+from pyvisdmc.utils import Catalog, find_simulation, window_snapshots
+from pyvisdmc.utils.catalog import CATALOG_NAME
+from pyvisdmc.test_data import DATA_PATH
+
+SIM_DIR = os.path.join('h2o_example_data', '1.0w_5000_walkers_20000t_1dt')
+
+
+@pytest.fixture
+def data_root(tmp_path):
+    """
+    Temporarily creates a data folder with a copy of the example h2o
+    simulation summary and links to its snapshots.
+    """
+    src = os.path.join(os.path.abspath(DATA_PATH), SIM_DIR)
+    dst = tmp_path / SIM_DIR
+    (dst / 'wfns').mkdir(parents=True)
+    shutil.copy(os.path.join(src, 'H2O_0_sim_info.hdf5'), dst)
+    for name in os.listdir(os.path.join(src, 'wfns')):
+        os.symlink(os.path.join(src, 'wfns', name), dst / 'wfns' / name)
+    return tmp_path
+
+
+def test_smoke_catalog(data_root):
+    """
+    Simple smoke test to make sure a data folder can be indexed.
+    """
+    catalog = Catalog(data_root).refresh()
+
+    assert len(catalog) == 1
+    assert os.path.isfile(data_root / CATALOG_NAME)
+
+
+def test_metadata(data_root):
+    """
+    One shot test of the recorded metadata, including the off-grid
+    wfn_8500ts snapshot, which does not change the snapshot interval.
+    """
+    entry = find_simulation(data_root, 'h2o', 0, 5000, 20000)
+
+    assert entry['atoms'] == 3
+    assert entry['timesteps'] == 20000
+    assert entry['snapshot_interval'] == 1000
+    assert 8500 in entry['snapshots']
+    assert len(entry['snapshots']) == 21
+    assert os.path.isfile(entry['snapshots'][1000])
+    assert entry['sim_info'] == os.path.join(str(data_root), SIM_DIR,
+                                             'H2O_0_sim_info.hdf5')
+
+
+def test_incremental_refresh(data_root):
+    """
+    Pattern test that unchanged simulations are not opened again, and that
+    new snapshots and new simulations are picked up.
+    """
+    assert Catalog(data_root).refresh().rescanned == 1
+    assert Catalog(data_root).refresh().rescanned == 0
+
+    wfns = data_root / SIM_DIR / 'wfns'
+    os.symlink(os.path.realpath(wfns / 'H2O_0_wfn_1000ts.hdf5'),
+               wfns / 'H2O_0_wfn_20000ts.hdf5')
+    catalog = Catalog(data_root).refresh()
+    assert catalog.rescanned == 1
+    assert 20000 in catalog.find('h2o', 0, 5000, 20000)['snapshots']
+
+    shutil.copy(data_root / SIM_DIR / 'H2O_0_sim_info.hdf5',
+                data_root / SIM_DIR / 'H2O_1_sim_info.hdf5')
+    catalog = Catalog(data_root).refresh()
+    assert catalog.rescanned == 1
+    assert len(catalog) == 2
+
+
+def test_shared_catalog(data_root, monkeypatch):
+    """
+    One shot test that simulations are looked up in a catalog passed to
+    find_simulation and load_data without refreshing it again.
+    """
+    from pyvisdmc.utils import load_data
+
+    catalog = Catalog(data_root).refresh()
+    refreshes = []
+    monkeypatch.setattr(Catalog, 'refresh', lambda self: refreshes.append(self) or self)
+    entry = find_simulation(data_root, 'h2o', 0, 5000, 20000, catalog=catalog)
+    sim_data = load_data(data_root, 'h2o', 0, 5000, 20000, catalog=catalog)
+    assert refreshes == []
+    assert entry == catalog.find('h2o', 0, 5000, 20000)
+    assert len(sim_data.get_vref()) > 0
+
+
+@pytest.mark.parametrize('args, message', [
+    (('h3o', 0, 5000, 20000), 'Not a valid molecule name'),
+    (('h2o', 0, 100, 20000), 'Simulation of size 100 walkers does not exist'),
+    (('h2o', 0, 5000, 10), 'Simulation of length 10 timesteps does not exist'),
+    (('h2o', 5, 5000, 20000), 'Simulation 5 does not exist'),
+])
+def test_not_found(data_root, args, message):
+    """
+    Edge test for simulations that are not in the catalog.
+    """
+    with pytest.raises(ValueError, match=message):
+        find_simulation(data_root, *args)
+
+
+def test_window_snapshots(data_root):
+    """
+    One shot test that the snapshot window follows the grid and skips the
+    off-grid snapshot.
+    """
+    entry = find_simulation(data_root, 'h2o', 0, 5000, 20000)
+
+    assert window_snapshots(entry, 7000, 10000) == [7000, 8000, 9000]
+    assert window_snapshots(entry, 7500, 10000) == [8000, 9000]
+
+
+def test_missing_snapshot(data_root):
+    """
+    Edge test for a window with a missing snapshot.
+    """
+    os.remove(data_root / SIM_DIR / 'wfns' / 'H2O_0_wfn_9000ts.hdf5')
+    entry = find_simulation(data_root, 'h2o', 0, 5000, 20000)
+
+    with pytest.raises(ValueError, match=r'No wavefunction snapshot at timestep\(s\) \[9000\]'):
+        window_snapshots(entry, 7000, 10000)
+
+
+
+def test_partial_window(data_root):
+    """
+    One shot test that a partial window leaves out the snapshots that are
+    not written yet, as for a running simulation of unknown length.
+    """
+    os.remove(data_root / SIM_DIR / 'wfns' / 'H2O_0_wfn_9000ts.hdf5')
+    entry = find_simulation(data_root, 'h2o', 0, 5000, None)
+
+    assert entry['timesteps'] == 20000
+    assert window_snapshots(entry, 7000, 10000, partial=True) == [7000, 8000]
+    assert window_snapshots(entry, 30000, 40000, partial=True) == []
+
+def test_read_only_root(data_root, tmp_path):
+    """
+    Edge test that a catalog whose index file cannot be written is kept in
+    memory.
+    """
+    catalog = Catalog(data_root, index_file=str(tmp_path / 'no' / 'index.json'))
+
+    assert len(catalog.refresh()) == 1
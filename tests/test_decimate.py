@@ -0,0 +1,67 @@
+"""
+Tests for the decimate module
+"""
+import numpy as np
+import pytest
+
+from pyvisdmc.utils import minmax_decimate
+
+
+def test_smoke_decimate():
+    """
+    Simple smoke test to make sure a long series is reduced to at most the
+    requested number of points.
+    """
+    x = np.arange(100000)
+    y = np.random.default_rng(0).normal(size=100000)
+
+    xd, yd = minmax_decimate(x, y, 1000)
+
+    assert len(xd) <= 1000
+    assert len(xd) == len(yd)
+
+
+def test_shape_preserved():
+    """
+    One shot test that the extremes, the end points and the order of the
+    series are kept.
+    """
+    x = np.arange(100001)
+    y = np.sin(x / 5000) + np.random.default_rng(1).normal(0, 0.1, len(x))
+    y[12345] = 10
+
+    xd, yd = minmax_decimate(x, y, 500)
+
+    assert xd[0] == 0 and xd[-1] == 100000
+    assert np.all(np.diff(xd) > 0)
+    assert yd.max() == 10 and yd.min() == y.min()
+    np.testing.assert_array_equal(yd, y[xd])
+
+
+def test_short_series():
+    """
+    Edge test for a series that is already short enough, and for too few
+    points.
+    """
+    x = np.arange(50)
+    y = np.arange(50.0)
+
+    xd, yd = minmax_decimate(x, y, 50)
+    np.testing.assert_array_equal(xd, x)
+
+    with pytest.raises(ValueError, match='At least 4 points'):
+        minmax_decimate(x, y, 3)
+    with pytest.raises(ValueError, match='same length'):
+        minmax_decimate(x, y[:10], 10)
+
+
+def test_pattern_max_points():
+    """
+    Pattern test that every target number of points is respected.
+    """
+    x = np.arange(9999)
+    y = np.random.default_rng(2).normal(size=len(x))
+
+    for max_points in [4, 5, 10, 99, 1000, 9998]:
+        xd, _ = minmax_decimate(x, y, max_points)
+        assert len(xd) <= max_points
@@ -0,0 +1,115 @@
+"""
+Tests for the distances module
+"""
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import bond_lengths, all_bond_lengths
+from pyvisdmc.plots import plot_dists
+
+H2O_CDS = 'src/pyvisdmc/test_data/h2o_cds.npy'
+H2O_DWS = 'src/pyvisdmc/test_data/h2o_dws.npy'
+
+
+def test_smoke_bond_lengths():
+    """
+    Simple smoke test to make sure bond_lengths runs.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+
+    bond_lengths(coords, weights, [[0, 1], [1, 2]])
+
+
+def test_matches_analyzer():
+    """
+    Pattern test that every pair matches AnalyzeWfn's bond_length
+    and exp_val.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+    analyzer = pv.AnalyzeWfn(coords)
+    pairs = [[0, 1], [0, 2], [1, 2], [2, 0]]
+
+    distances, exp_vals = bond_lengths(coords, weights, pairs)
+
+    assert distances.shape == (len(pairs), len(weights))
+    for k, (i, j) in enumerate(pairs):
+        ref = analyzer.bond_length(i, j)
+        np.testing.assert_allclose(distances[k], ref, rtol=1e-12)
+        np.testing.assert_allclose(exp_vals[k],
+                                   analyzer.exp_val(ref, weights), rtol=1e-12)
+
+
+def test_all_bond_lengths():
+    """
+    One shot test of the upper triangle of the distance matrix.
+    """
+    coords = np.random.rand(50, 4, 3)
+    weights = np.random.rand(50)
+
+    pairs, distances, exp_vals = all_bond_lengths(coords, weights)
+
+    assert pairs.tolist() == [[0, 1], [0, 2], [0, 3], [1, 2], [1, 3], [2, 3]]
+    np.testing.assert_allclose(
+        distances[5], np.linalg.norm(coords[:, 2] - coords[:, 3], axis=1))
+    np.testing.assert_allclose(
+        exp_vals, np.average(distances, axis=1, weights=weights))
+
+
+def test_index_out_of_range():
+    """
+    Edge test for an atom index larger than the number of atoms
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+
+    with pytest.raises(ValueError, match='Atom index exceeds'):
+        bond_lengths(coords, weights, [[0, 3]])
+
+
+def test_not_a_pair():
+    """
+    Edge test for a pair that does not have two atom indices
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+
+    with pytest.raises(ValueError, match='two atom indices'):
+        bond_lengths(coords, weights, [[0, 1, 2]])
+
+
+def test_plot_reuses_bonds():
+    """
+    One shot test that a plot uses precomputed bond lengths instead of
+    scanning the coordinates again.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+    dists = [[0, 1], [0, 2]]
+    bonds = bond_lengths(coords, weights, dists)
+
+    analyzer = pv.AnalyzeWfn(coords)
+    analyzer.xx = None  # any access to the coordinates would fail
+    plot_dists('h2o', 0, analyzer, weights, dists, bonds=bonds)
+
+
+def test_single_precision():
+    """
+    One shot test that float32 coordinates give float32 bond lengths within
+    float32 round-off of the float64 ones, and double precision
+    expectation values.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+    pairs = [[0, 1], [0, 2], [1, 2]]
+
+    distances, exp_vals = bond_lengths(coords, weights, pairs)
+    distances32, exp_vals32 = bond_lengths(coords.astype(np.float32), weights,
+                                           pairs)
+
+    assert distances32.dtype == np.float32
+    assert exp_vals32.dtype == np.float64
+    np.testing.assert_allclose(distances32, distances, rtol=1e-6)
+    np.testing.assert_allclose(exp_vals32, exp_vals, rtol=1e-6)
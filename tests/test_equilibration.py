@@ -0,0 +1,88 @@
+"""
+Tests for the equilibration module
+"""
+import time
+
+import numpy as np
+import pytest
+
+from pyvisdmc.utils import mser
+
+
+def transient(n, n_eq, height=50.0, seed=0):
+    """Stationary noise with a decaying initial transient of length n_eq."""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(size=n)
+    x[:n_eq] += height * np.linspace(1, 0, n_eq) ** 2
+    return x
+
+
+def test_smoke_mser():
+    """
+    Simple smoke test to make sure mser runs.
+    """
+    d = mser(np.random.rand(100))
+
+    assert isinstance(d, int)
+    assert 0 <= d <= 50
+
+
+def test_too_short():
+    """
+    Edge test for a series with fewer than two batches.
+    """
+    with pytest.raises(ValueError, match='too short'):
+        mser(np.random.rand(7), batch_size=5)
+
+
+def test_stationary_series():
+    """
+    One shot test that little of a stationary series is discarded.
+    """
+    x = np.random.default_rng(1).normal(size=100_000)
+
+    assert mser(x) < 10_000
+
+
+def test_detects_transient():
+    """
+    One shot test that the detected start falls at the end of a decaying
+    transient.
+    """
+    d = mser(transient(20_000, 2_000))
+
+    assert 1_500 <= d <= 2_500
+
+
+def test_max_fraction():
+    """
+    Edge test that no more than max_fraction of the series is discarded.
+    """
+    x = np.linspace(100, 0, 1000)
+
+    assert mser(x, max_fraction=0.25) <= 250
+
+
+def test_pattern_transient_lengths():
+    """
+    Pattern test that the detected start follows the transient length.
+    """
+    starts = [mser(transient(50_000, n_eq, seed=n_eq))
+              for n_eq in (1_000, 5_000, 10_000)]
+
+    assert starts == sorted(starts)
+    for d, n_eq in zip(starts, (1_000, 5_000, 10_000)):
+        assert abs(d - n_eq) <= n_eq // 4
+
+
+def test_long_series_is_fast():
+    """
+    One shot test that a series of millions of timesteps takes well under
+    a second.
+    """
+    x = transient(5_000_000, 100_000)
+    t0 = time.perf_counter()
+    d = mser(x)
+
+    assert time.perf_counter() - t0 < 1.0
+    assert 75_000 <= d <= 125_000
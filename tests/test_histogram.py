@@ -0,0 +1,185 @@
+"""
+Tests for the histogram module
+"""
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import (HistogramAccumulator, bin_edges,
+                            accumulate_bond_histograms, iter_sim_info,
+                            sim_info, bond_lengths)
+from pyvisdmc.plots import plot_dist, plot_dists, plot_2d
+
+SIM_INFO = ('src/pyvisdmc/test_data/h2o_example_data/'
+            '1.0w_5000_walkers_20000t_1dt/H2O_0_sim_info.hdf5')
+
+
+def test_smoke_accumulator():
+    """
+    Simple smoke test to make sure a histogram can be filled.
+    """
+    hist = HistogramAccumulator(bin_edges(0, 1, 10))
+    hist.update(np.random.rand(100))
+
+    assert hist.counts.sum() == 100
+
+
+def test_matches_numpy():
+    """
+    Pattern test that chunked weighted updates match np.histogram and
+    np.average on the whole data set, for several chunk sizes.
+    """
+    rng = np.random.default_rng(1)
+    values = rng.normal(1.0, 0.2, 1000)
+    weights = rng.random(1000)
+    edges = bin_edges(0, 2, 40)
+    ref, _ = np.histogram(values, edges, weights=weights)
+
+    for chunk in [1000, 333, 7]:
+        hist = HistogramAccumulator(edges)
+        for lo in range(0, 1000, chunk):
+            hist.update(values[lo:lo + chunk], weights=weights[lo:lo + chunk])
+        np.testing.assert_allclose(hist.counts, ref)
+        assert hist.mean[0] == pytest.approx(np.average(values,
+                                                        weights=weights))
+        var = np.average((values - hist.mean[0]) ** 2, weights=weights)
+        assert hist.std[0] == pytest.approx(np.sqrt(var))
+
+
+def test_2d_matches_numpy():
+    """
+    One shot test of a weighted 2D histogram against np.histogram2d.
+    """
+    rng = np.random.default_rng(2)
+    x, y, w = rng.random(500), rng.random(500), rng.random(500)
+    edges = bin_edges(0, 1, 8)
+
+    hist = HistogramAccumulator(edges, edges)
+    hist.update(x[:200], y[:200], weights=w[:200])
+    hist.update(x[200:], y[200:], weights=w[200:])
+    ref, _, _ = np.histogram2d(x, y, [edges, edges], weights=w)
+
+    np.testing.assert_allclose(hist.counts, ref)
+    density = hist.density()
+    assert np.sum(density) * (edges[1] - edges[0]) ** 2 == pytest.approx(1)
+
+
+def test_merge():
+    """
+    One shot test that merging two accumulators matches one accumulator
+    filled with all samples.
+    """
+    values = np.random.rand(100)
+    edges = bin_edges(0, 1, 10)
+    whole, first, second = (HistogramAccumulator(edges) for _ in range(3))
+    whole.update(values)
+    first.update(values[:30])
+    second.update(values[30:])
+    first.merge(second)
+
+    np.testing.assert_allclose(first.counts, whole.counts)
+    np.testing.assert_allclose(first.mean, whole.mean)
+
+
+def test_outside_range():
+    """
+    Edge test for samples outside the bin edges
+    """
+    hist = HistogramAccumulator(bin_edges(0, 1, 4))
+    hist.update(np.array([-0.5, 0.5, 1.0, 1.5]), weights=np.ones(4))
+
+    assert hist.counts.sum() == 2
+    assert hist.outside_weight == 2
+    assert hist.mean[0] == pytest.approx(0.625)
+
+
+def test_all_outside_range():
+    """
+    Edge test that a histogram whose range misses every sample raises an
+    error naming the range and the samples, for the 1D and 2D plots.
+    """
+    hist = HistogramAccumulator(bin_edges(0, 1, 4))
+    hist.update(np.array([2.5, 3.5]), weights=np.ones(2))
+    hist2d = HistogramAccumulator(bin_edges(0, 1, 4), bin_edges(0, 1, 4))
+    hist2d.update(np.array([2.5, 3.5]), np.array([0.5, 0.6]))
+
+    message = r'No sample falls inside hist_range \[0, 1\].*\[2.5000, 3.5000\]'
+    with pytest.raises(ValueError, match=message):
+        hist.stairs()
+    with pytest.raises(ValueError, match=message):
+        hist.kde()
+    with pytest.raises(ValueError, match='No sample falls inside hist_range'):
+        plot_2d('h2o', 0, None, None, [[0, 1], [0, 2]], hist2d=hist2d)
+    with pytest.raises(ValueError, match='no samples'):
+        HistogramAccumulator(bin_edges(0, 1, 4)).stairs()
+
+
+def test_invalid_edges():
+    """
+    Edge test for bin edges that are not evenly spaced
+    """
+    with pytest.raises(ValueError, match='evenly spaced'):
+        HistogramAccumulator([0, 1, 3])
+    with pytest.raises(ValueError, match='hi > lo'):
+        bin_edges(1, 1, 10)
+
+
+def test_streamed_bonds_match_in_memory():
+    """
+    One shot test that the streamed histograms and expectation values of
+    the H2O bonds match the ones of the fully loaded ensemble.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    pairs = [[0, 1], [0, 2]]
+    edges = bin_edges(0, 5, 250)
+    analyzer, weights = sim_info(sim_data, 5000, 9000)
+    distances, exp_vals = bond_lengths(analyzer.xx, weights, pairs)
+
+    hists, hist2d = accumulate_bond_histograms(
+        iter_sim_info(sim_data, 5000, 9000, chunk_size=1234), pairs, edges,
+        joint=pairs)
+
+    for hist, distance, exp_val in zip(hists, distances, exp_vals):
+        ref, _ = np.histogram(distance, edges, weights=weights)
+        np.testing.assert_allclose(hist.counts, ref)
+        assert hist.mean[0] == pytest.approx(exp_val)
+    np.testing.assert_allclose(hist2d.mean, exp_vals)
+
+
+def test_plots_from_histograms():
+    """
+    Smoke test of the distribution plots drawn from streamed histograms,
+    without any walker data.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    pairs = [[0, 1], [0, 2]]
+    hists, hist2d = accumulate_bond_histograms(
+        iter_sim_info(sim_data, 5000, 7000, chunk_size=1000), pairs,
+        bin_edges(0, 5, 250), joint=pairs)
+
+    plot_dist('h2o', None, None, [0, 1], hists=hists[:1])
+    plot_dist('h2o', None, None, [0, 1], hist=False, hists=hists[:1])
+    plot_dists('h2o', 0, None, None, pairs, hists=hists)
+    plot_dists('h2o', 0, None, None, pairs, hist=False, hists=hists)
+    plot_2d('h2o', 0, None, None, pairs, hist2d=hist2d)
+
+
+def test_single_precision():
+    """
+    One shot test that float32 samples fall in the same bins as the
+    float64 ones (up to samples within round-off of an edge), with the same
+    running moments.
+    """
+    rng = np.random.default_rng(3)
+    samples = rng.normal(1.0, 0.1, 100000)
+    weights = rng.random(100000)
+    edges = bin_edges(0, 2, 200)
+
+    hist = HistogramAccumulator(edges)
+    hist.update(samples, weights=weights)
+    hist32 = HistogramAccumulator(edges)
+    hist32.update(samples.astype(np.float32), weights=weights)
+
+    assert np.abs(hist32.counts - hist.counts).sum() <= 1e-3 * hist.total_weight
+    np.testing.assert_allclose(hist32.mean, hist.mean, rtol=1e-6)
+    np.testing.assert_allclose(hist32.std, hist.std, rtol=1e-4)
@@ -0,0 +1,150 @@
+"""
+Tests for the kde module
+"""
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import binned_kde, kde_bandwidth
+from pyvisdmc.plots import plot_dist, plot_dists
+
+H2O_CDS = 'src/pyvisdmc/test_data/h2o_cds.npy'
+H2O_DWS = 'src/pyvisdmc/test_data/h2o_dws.npy'
+
+
+def direct_kde(grid, samples, weights, bandwidth):
+    """Weighted Gaussian KDE evaluated point by point."""
+    z = (grid[:, None] - samples[None, :]) / bandwidth
+    kernel = np.exp(-0.5 * z ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    return kernel @ weights / np.sum(weights)
+
+
+def test_smoke_binned_kde():
+    """
+    Simple smoke test to make sure binned_kde runs.
+    """
+    grid, density = binned_kde(np.random.rand(100))
+
+    assert grid.shape == density.shape == (512,)
+
+
+def test_matches_direct_kde():
+    """
+    One shot test that the binned KDE of the weighted H2O bond lengths
+    matches a direct weighted KDE.
+    """
+    analyzer = pv.AnalyzeWfn(np.load(H2O_CDS))
+    weights = np.load(H2O_DWS)
+    distance = analyzer.bond_length(0, 1)
+
+    grid, density = binned_kde(distance, weights)
+    ref = direct_kde(grid, distance, weights,
+                     kde_bandwidth(distance, weights))
+
+    np.testing.assert_allclose(density, ref, atol=1e-3 * ref.max())
+    np.testing.assert_allclose(np.sum(density) * (grid[1] - grid[0]), 1,
+                               atol=1e-3)
+
+
+def test_weights_matter():
+    """
+    Pattern test that the weights shift the density: doubling the weight
+    of one cluster of samples matches duplicating that cluster.
+    """
+    rng = np.random.default_rng(0)
+    samples = np.concatenate([rng.normal(0, 1, 500), rng.normal(5, 1, 500)])
+    weights = np.repeat([1.0, 2.0], 500)
+    duplicated = np.concatenate([samples, samples[500:]])
+
+    for bandwidth in [0.2, 0.5, 1.0]:
+        grid, density = binned_kde(samples, weights, bandwidth=bandwidth,
+                                   gridsize=1024)
+        ref = direct_kde(grid, duplicated, np.ones(1500), bandwidth)
+        np.testing.assert_allclose(density, ref, atol=1e-3 * ref.max())
+
+
+def test_bandwidth_unweighted():
+    """
+    One shot test that the bandwidth reduces to Scott's rule without
+    weights.
+    """
+    samples = np.random.rand(1000)
+    expected = np.std(samples) * 1000 ** (-1 / 5)
+
+    assert kde_bandwidth(samples, np.ones(1000)) == pytest.approx(expected)
+
+
+def test_no_spread():
+    """
+    Edge test for samples that are all identical
+    """
+    with pytest.raises(ValueError, match='no spread'):
+        binned_kde(np.ones(10))
+
+
+def test_weights_shape():
+    """
+    Edge test for weights that do not match the samples
+    """
+    with pytest.raises(ValueError, match='weights must match'):
+        binned_kde(np.random.rand(10), np.ones(5))
+
+
+def test_plots_binned_engine():
+    """
+    Smoke test of the distribution plots with the binned KDE engine.
+    """
+    analyzer = pv.AnalyzeWfn(np.load(H2O_CDS))
+    weights = np.load(H2O_DWS)
+
+    plot_dist('h2o', analyzer, weights, [0, 1], kde_engine='binned')
+    plot_dist('h2o', analyzer, weights, [0, 1], hist=False,
+              kde_engine='binned')
+    plot_dists('h2o', 0, analyzer, weights, [[0, 1], [0, 2]],
+               kde_engine='binned')
+    plot_dists('h2o', 0, analyzer, weights, [[0, 1], [0, 2]], hist=False,
+               kde_engine='binned')
+
+
+@pytest.mark.parametrize('module', ['one_dist', 'mult_dist'])
+def test_binned_overlay_weighted(module, tmp_path, monkeypatch):
+    """
+    One shot test that the histogram drawn under the binned KDE line is
+    weighted, and that the line is scaled to it: the bars add up to the
+    total weight, and the line to the total weight times the bin width.
+    """
+    import importlib
+    from pyvisdmc.plots.style import new_figure
+
+    figures = []
+    plots = importlib.import_module(f'pyvisdmc.plots.{module}')
+    monkeypatch.setattr(plots, 'new_figure',
+                        lambda: figures.append(new_figure()) or figures[-1])
+    analyzer = pv.AnalyzeWfn(np.load(H2O_CDS))
+    weights = np.load(H2O_DWS)
+    monkeypatch.chdir(tmp_path)
+
+    if module == 'one_dist':
+        plot_dist('h2o', analyzer, weights, [0, 1], kde_engine='binned')
+    else:
+        plot_dists('h2o', 0, analyzer, weights, [[0, 1]], kde_engine='binned')
+
+    ax = figures[0].axes[0]
+    heights = [bar.get_height() for bar in ax.patches]
+    width = ax.patches[0].get_width()
+    assert len(heights) == 50
+    assert sum(heights) == pytest.approx(np.sum(weights))
+    grid, density = ax.lines[0].get_data()
+    area = np.sum((density[1:] + density[:-1]) / 2 * np.diff(grid))
+    assert area == pytest.approx(np.sum(weights) * width, rel=0.05)
+
+
+def test_unknown_engine():
+    """
+    Edge test for a KDE engine that does not exist
+    """
+    analyzer = pv.AnalyzeWfn(np.load(H2O_CDS))
+    weights = np.load(H2O_DWS)
+
+    with pytest.raises(ValueError, match='kde_engine must be one of'):
+        plot_dist('h2o', analyzer, weights, [0, 1], kde_engine='scipy')
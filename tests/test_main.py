@@ -1,16 +1,29 @@
+import json
 import pytest
 import os
+import shutil
 import subprocess
 import sys
 import yaml
 from pathlib import Path
 
+from pyvisdmc.utils.outputs import OUTPUTS_NAME
+
 # test types:
 # a smoke test is a very basic test to ensure the code runs without error on known-good input
 # edge tests are tests that push the boundaries of what the code expects, such as missing keys, invalid ranges, etx.
 # one-shot tests are tests with known inputs and expected outputs for a single, well-defined scenario
 # pattern tests run the function multiple times with a series of inputs to ensure consistent behavior
 
+@pytest.fixture(autouse=True)
+def fresh_outputs():
+    """
+    Forgets the fingerprints of the figures saved by earlier tests, so that
+    every test draws its plots.
+    """
+    if os.path.exists(OUTPUTS_NAME):
+        os.remove(OUTPUTS_NAME)
+
 @pytest.fixture
 def valid_config(tmp_path):
     """
@@ -546,3 +559,650 @@ def test_pattern_multiple_runs(tmp_path):
         assert result.returncode == 0, f"Expected success with stop={stop_val}"
         assert "Analyzing 5000 walkers over 20000 timesteps..." in result.stdout
         assert "No plots specified. Exiting successfully..." in result.stdout
+
+
+def test_invalid_workers(tmp_path):
+    """
+    Edge test for a non-positive number of workers.
+    """
+    config = {
+        'data_path': 'src/pyvisdmc/test_data',
+        'molecule': 'h5o3',
+        'sim_num': 0,
+        'walkers': 5000,
+        'timesteps': 20000,
+        'start': 10000,
+        'stop': 20000,
+        'plots': ['eref'],
+        'workers': 0  # not positive
+    }
+    config_file = tmp_path / "invalid_workers_config.yaml"
+    with config_file.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(config_file)
+    assert result.returncode != 0
+    assert "Check config.yml. workers must be a positive integer." in result.stderr
+
+
+def test_verbose_store_report(valid_config):
+    """
+    One shot test that verbose mode reports the quantity store counts.
+    The default config requests bond [2,3] in both mult_dists and 2d_dists.
+    """
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--verbose"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "Quantity store: 1 hits, 5 misses, 5 quantities stored" in result.stdout
+
+
+def test_parallel_jobs(valid_config):
+    """
+    Smoke test to ensure main.py renders all plots with several jobs.
+    """
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--jobs", "4"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "Eref plot saved as h5o3_sim_0_zpe.png" in result.stdout
+    assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+
+
+def test_invalid_jobs(valid_config):
+    """
+    Edge test for a non-positive number of jobs.
+    """
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--jobs", "0"],
+        capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "The number of jobs must be a positive integer." in result.stderr
+
+
+def test_chunked_histograms(valid_config):
+    """
+    Smoke test to ensure main.py runs with the walkers streamed in chunks.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['chunk_size'] = 2000
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+    assert "outside hist_range" not in result.stdout
+
+
+def test_single_precision(valid_config):
+    """
+    Pattern test to ensure main.py runs in float32, with the walkers loaded
+    at once and streamed in chunks, and rejects an unknown precision.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    for chunk_size in [None, 2000]:
+        config['precision'] = 'float32'
+        config['chunk_size'] = chunk_size
+        with valid_config.open('w') as f:
+            yaml.dump(config, f)
+
+        result = run_main(valid_config)
+        assert result.returncode == 0, result.stderr
+        assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+
+    config['precision'] = 'float16'
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "Check config.yml. precision must be one of ('float64', 'float32')." in result.stderr
+
+
+def test_preview(valid_config):
+    """
+    One shot test to ensure main.py draws the plots from a preview subset
+    and reports the expectation values with their sampling error.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['preview'] = 2000
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode == 0, result.stderr
+    assert "Preview of 2000 of 49989 walkers" in result.stdout
+    assert "<01> = 0.97" in result.stdout
+    assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+
+
+def test_invalid_preview(valid_config):
+    """
+    Pattern test for preview values and combinations that are rejected.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    cases = [({'preview': 1}, "preview must be true, false or a number of walkers of at least 2."),
+             ({'preview': 'fast'}, "preview must be true, false or a number of walkers of at least 2."),
+             ({'preview': True, 'chunk_size': 2000}, "preview cannot be combined with chunk_size")]
+    for options, message in cases:
+        with valid_config.open('w') as f:
+            yaml.dump(dict(config, **options), f)
+        result = run_main(valid_config)
+        assert result.returncode != 0
+        assert f"Check config.yml. {message}" in result.stderr
+
+
+def test_invalid_hist_range(valid_config):
+    """
+    Edge test for an empty histogram range.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['chunk_size'] = 2000
+    config['hist_range'] = [3.0, 1.0]
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "Check config.yml. hist_range must be a list [lo, hi] with lo < hi." in result.stderr
+
+
+def test_auto_start(valid_config):
+    """
+    One shot test for start: auto, which detects the equilibration from
+    the Eref series and rounds it up to the next wavefunction snapshot.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['molecule'] = 'h2o'
+    config['start'] = 'auto'
+    config['plots'] = ['eref']
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "Equilibration detected at timestep 140, using start 1000." in result.stdout
+
+
+def batch_configs(tmp_path, valid_config):
+    """
+    Helper function that writes two valid configs and one invalid config
+    next to each other.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['plots'] = ['eref', 'one_dist']
+    paths = []
+    for name, changes in [('a', {}), ('b', {'molecule': 'h2o'}),
+                          ('c', {'stop': 99999})]:
+        path = tmp_path / f"{name}.yaml"
+        with path.open('w') as f:
+            yaml.dump(dict(config, **changes), f)
+        paths.append(path)
+    return paths
+
+
+def test_batch(tmp_path, valid_config):
+    """
+    Smoke test to ensure the batch subcommand runs a glob of configs over
+    a worker pool and prints one summary.
+    """
+    batch_configs(tmp_path, valid_config)
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", "batch",
+         str(tmp_path / "[ab].yaml"), "--jobs", "2"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "Batch summary: 2 configs, 2 succeeded, 0 failed" in result.stdout
+    assert "one_dist plot saved" not in result.stdout
+    # every config saves its plots and their index to its own folder
+    assert os.path.isfile(tmp_path / "a" / "h5o3_01_dist.png")
+    assert os.path.isfile(tmp_path / "b" / "h2o_01_dist.png")
+    assert os.path.isfile(tmp_path / "a" / OUTPUTS_NAME)
+
+
+def test_batch_failure(tmp_path, valid_config):
+    """
+    Edge test that one invalid config fails the batch without stopping the
+    other configs.
+    """
+    paths = batch_configs(tmp_path, valid_config)
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", "batch", "--verbose"]
+        + [str(p) for p in paths],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 1
+    assert "Batch summary: 3 configs, 2 succeeded, 1 failed" in result.stdout
+    assert "FAILED" in result.stdout and "exceed total timesteps" in result.stdout
+    assert "one_dist plot saved" in result.stdout
+
+
+def test_batch_no_match(tmp_path):
+    """
+    Edge test for a glob pattern that matches no config file.
+    """
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", "batch",
+         str(tmp_path / "*.yaml")],
+        capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "No configuration files match" in result.stderr
+
+
+def test_replicates(tmp_path, valid_config):
+    """
+    One shot test for a range of sim_num replicates, which are pooled into
+    one set of plots.
+    """
+    src = os.path.abspath('src/pyvisdmc/test_data/h2o_example_data/1.0w_5000_walkers_20000t_1dt')
+    dst = tmp_path / 'data' / 'h2o_example_data' / '1.0w_5000_walkers_20000t_1dt'
+    (dst / 'wfns').mkdir(parents=True)
+    for k in range(2):
+        os.symlink(os.path.join(src, 'H2O_0_sim_info.hdf5'), dst / f'H2O_{k}_sim_info.hdf5')
+        for name in os.listdir(os.path.join(src, 'wfns')):
+            os.symlink(os.path.join(src, 'wfns', name),
+                       dst / 'wfns' / name.replace('H2O_0_', f'H2O_{k}_'))
+
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config.update({'data_path': str(tmp_path / 'data'), 'molecule': 'h2o',
+                   'sim_num': '0-1', 'dist': [0, 1], 'mult_dists': [[0, 1], [0, 2]],
+                   '2d_dists': [[0, 1], [0, 2]], 'workers': 2})
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode == 0, result.stderr
+    assert "Pooling 2 replicates: [0, 1]" in result.stdout
+    assert "Eref plot saved as h2o_sim_0-1_zpe.png" in result.stdout
+    assert "two_d_dist plot saved as h2o_sim_0-1_2d.png" in result.stdout
+
+
+def test_missing_replicate(valid_config):
+    """
+    Edge test for a replicate that does not exist.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['sim_num'] = [0, 7]
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "Simulation 7 does not exist for this system" in result.stderr
+
+
+def test_lazy_imports():
+    """
+    One shot test that importing the package and the command line tool
+    does not import the heavy plotting and data dependencies.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, pyvisdmc, pyvisdmc.main, pyvisdmc.plots, pyvisdmc.utils; "
+         "print(sorted({m.split('.')[0] for m in sys.modules} & "
+         "{'matplotlib', 'seaborn', 'pyvibdmc', 'h5py', 'pandas'}))"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
+
+
+def test_lazy_package_attributes():
+    """
+    One shot test that the functions are still available from the package.
+    """
+    import pyvisdmc
+    from pyvisdmc.plots import plot_eref
+    from pyvisdmc.utils import load_data
+
+    assert pyvisdmc.plot_eref is plot_eref
+    assert pyvisdmc.load_data is load_data
+    assert "bin_edges" in dir(pyvisdmc)
+    with pytest.raises(AttributeError):
+        pyvisdmc.not_a_function
+
+
+def test_lazy_main_attributes():
+    """
+    One shot test that the functions of the command line module are still
+    available from the package, and that pyvisdmc.main is the command line
+    function rather than its module.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, pyvisdmc; cli = pyvisdmc.main; module = sys.modules['pyvisdmc.main']; "
+         "print(cli is module.main, pyvisdmc.read_config is module.read_config, "
+         "pyvisdmc.parse_args is module.parse_args, pyvisdmc.main is module.main, "
+         "'run' in dir(pyvisdmc))"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["True"] * 5
+
+
+def test_missing_snapshots(valid_config):
+    """
+    Edge test for a start/stop window without wavefunction snapshots, which
+    is caught from the catalog before any walker is read.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['start'] = 5000
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "Check config.yml. No wavefunction snapshot at timestep(s) [5000, 6000, 7000, 8000, 9000] for simulation 0." in result.stderr
+
+
+def test_catalog_command():
+    """
+    Smoke test to ensure the catalog subcommand lists the simulations.
+    """
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", "catalog", "src/pyvisdmc/test_data"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "3 simulations in" in result.stdout
+    assert "h5o3     sim 0        5000 walkers    20000 timesteps    8 atoms    10 snapshots" in result.stdout
+
+
+def test_atom_index_from_metadata(valid_config):
+    """
+    Edge test that an atom index beyond the atoms of the molecule is caught
+    from the file metadata, before any data is loaded.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['mult_dists'] = [[2, 3], [0, 8]]
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "Check config.yml. Atom indices [0, 8] must be between 0 and 7, since h5o3 has 8 atoms." in result.stderr
+    assert "Analyzing" not in result.stdout
+
+
+def test_unknown_molecule(valid_config):
+    """
+    Edge test for a molecule without simulations in data_path.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['molecule'] = 'h3o'
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "Check config.yml. Not a valid molecule name" in result.stderr
+    assert "Analyzing" not in result.stdout
+
+
+def test_eref_without_snapshots(tmp_path):
+    """
+    One shot test that an Eref-only run reads the simulation summary alone,
+    so it succeeds on a data folder without any wavefunction snapshot.
+    """
+    sim_dir = tmp_path / "1.0w_5000_walkers_20000t_1dt"
+    sim_dir.mkdir()
+    shutil.copy("src/pyvisdmc/test_data/h5o3_example_data/1.0w_5000_walkers_20000t_1dt/H5O3_0_sim_info.hdf5", sim_dir)
+    config = {
+        'data_path': str(tmp_path),
+        'molecule': 'h5o3',
+        'sim_num': 0,
+        'walkers': 5000,
+        'timesteps': 20000,
+        'start': 10000,
+        'stop': 20000,
+        'plots': ['eref']
+    }
+    config_file = tmp_path / "config.yaml"
+    with config_file.open('w') as f:
+        yaml.dump(config, f)
+
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(config_file), "--verbose"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Data products: vref" in result.stdout
+    assert "Eref plot saved as h5o3_sim_0_zpe.png" in result.stdout
+
+
+def test_convert_command(tmp_path):
+    """
+    One shot test that the convert subcommand packs the snapshots of a
+    simulation, and that a run reads the packed store once the wfns/ files
+    are gone.
+    """
+    src = os.path.abspath("src/pyvisdmc/test_data/h2o_example_data/1.0w_5000_walkers_20000t_1dt")
+    sim_dir = tmp_path / "1.0w_5000_walkers_20000t_1dt"
+    (sim_dir / "wfns").mkdir(parents=True)
+    shutil.copy(os.path.join(src, "H2O_0_sim_info.hdf5"), sim_dir)
+    for name in os.listdir(os.path.join(src, "wfns")):
+        os.symlink(os.path.join(src, "wfns", name), sim_dir / "wfns" / name)
+
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", "convert", str(tmp_path), "--float32"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "h2o      sim 0       21 snapshots" in result.stdout
+    assert os.path.isfile(sim_dir / "H2O_0_packed.hdf5")
+
+    shutil.rmtree(sim_dir / "wfns")
+    config = {
+        'data_path': str(tmp_path),
+        'molecule': 'h2o',
+        'sim_num': 0,
+        'walkers': 5000,
+        'timesteps': 20000,
+        'start': 10000,
+        'stop': 20000,
+        'plots': ['one_dist'],
+        'dist': [0, 1]
+    }
+    config_file = tmp_path / "config.yaml"
+    with config_file.open('w') as f:
+        yaml.dump(config, f)
+    result = run_main(config_file)
+    assert result.returncode == 0, result.stderr
+    assert "one_dist plot saved as h2o_01_dist.png" in result.stdout
+
+
+def test_watch(valid_config):
+    """
+    One shot test that --watch on a finished simulation processes every
+    snapshot of the window in one pass and exits.
+    """
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--watch", "--interval", "0.1"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Update 1: 10 new snapshots, 10 processed, timestep 20000 of 20000." in result.stdout
+    assert "Saved h5o3_sim_0_2d.png" in result.stdout
+    assert "Simulation complete." in result.stdout
+
+
+def test_watch_outdates_outputs(valid_config):
+    """
+    Edge test that the figures redrawn by --watch are not up to date for a
+    later run, which draws them again from the whole window.
+    """
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--watch", "--interval", "0.1"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Saved h5o3_sim_0_zpe.png" in result.stdout
+
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "up to date" not in result.stdout
+    assert "Eref plot saved as h5o3_sim_0_zpe.png" in result.stdout
+    assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+
+
+def test_watch_rejects_auto_start(valid_config):
+    """
+    Edge test that --watch refuses an automatic equilibration start.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['start'] = 'auto'
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--watch"],
+        capture_output=True, text=True
+    )
+    assert result.returncode != 0
+    assert "Watch mode cannot be combined" in result.stderr
+
+
+def test_up_to_date_outputs(valid_config):
+    """
+    One shot test that a second run skips the unchanged plots, redraws the
+    plot whose options changed, and redraws everything with --force.
+    """
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "saved as" not in result.stdout
+    assert "two_d_dist plot is up to date: h5o3_sim_0_2d.png" in result.stdout
+
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['dist'] = [0, 2]
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "one_dist plot saved as h5o3_02_dist.png" in result.stdout
+    assert "Eref plot saved" not in result.stdout
+
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--force"],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0
+    assert "Eref plot saved as h5o3_sim_0_zpe.png" in result.stdout
+    assert "up to date" not in result.stdout
+
+
+def test_up_to_date_auto_start(valid_config):
+    """
+    Edge test that the plots of start: 0 are not up to date once start is
+    automatic, since the detected start differs.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['molecule'] = 'h2o'
+    config['plots'] = ['eref']
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "Eref plot saved as h2o_sim_0_zpe.png" in result.stdout
+
+    config['start'] = 'auto'
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "Equilibration detected at timestep 140, using start 1000." in result.stdout
+    assert "Eref plot saved as h2o_sim_0_zpe.png" in result.stdout
+
+    result = run_main(valid_config)
+    assert result.returncode == 0
+    assert "eref plot is up to date: h2o_sim_0_zpe.png" in result.stdout
+
+
+def test_profile(valid_config, tmp_path):
+    """
+    One shot test that --profile times the stages of a run and writes
+    them to a Chrome trace.
+    """
+    trace = tmp_path / "trace.json"
+    result = subprocess.run(
+        [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--profile", str(trace)],
+        capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Profile (inclusive times, peak RSS at the end of the stage):" in result.stdout
+
+    with open(trace) as f:
+        stages = json.load(f)['otherData']['stages']
+    for name in ['main.read_config', 'pipeline.walkers', 'wfn_reader.read',
+                 'wfn_reader.convert', 'distances.bond_lengths', 'eref.savefig',
+                 'mult_dist.density']:
+        assert name in stages
+    assert stages['wfn_reader.read']['bytes'] > 0
+
+
+def test_memory_limit(valid_config):
+    """
+    Pattern test for memory_limit: the walkers are loaded at once when they
+    fit in it, streamed in chunks when they do not, and invalid sizes are
+    rejected.
+    """
+    with valid_config.open() as f:
+        config = yaml.safe_load(f)
+    config['plots'] = ['one_dist', 'two_d_dist']
+    # 49989 walkers of 8 atoms with 3 bonds take 352 bytes each
+    cases = [('64GB', "(memory_limit 65536.0 MB).", "Data products: vref, walkers, coordinates"),
+             (10, "(memory_limit 10.0 MB), streaming in chunks of 14894 walkers.",
+              "Data products: vref, histograms")]
+    for memory_limit, note, products in cases:
+        config['memory_limit'] = memory_limit
+        with valid_config.open('w') as f:
+            yaml.dump(config, f)
+        result = subprocess.run(
+            [sys.executable, "src/pyvisdmc/main.py", str(valid_config), "--verbose", "--force"],
+            capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+        assert f"Estimated memory of 49989 walkers: 16.8 MB {note}" in result.stdout
+        assert products in result.stdout
+        assert "two_d_dist plot saved as h5o3_sim_0_2d.png" in result.stdout
+
+    config['preview'] = 2000
+    with valid_config.open('w') as f:
+        yaml.dump(config, f)
+    result = run_main(valid_config)
+    assert result.returncode != 0
+    assert "but preview needs every walker in memory." in result.stderr
+    del config['preview']
+
+    for memory_limit in [0, 'lots', True]:
+        config['memory_limit'] = memory_limit
+        with valid_config.open('w') as f:
+            yaml.dump(config, f)
+        result = run_main(valid_config)
+        assert result.returncode != 0
+        assert "Check config.yml. memory_limit must be a positive number of megabytes or a size such as '4GB'." in result.stderr
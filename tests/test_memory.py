@@ -0,0 +1,123 @@
+"""
+Tests for the memory module
+"""
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import (accumulate_bond_histograms, bin_edges, bond_lengths,
+                            find_simulation, iter_sim_info, pack_snapshots,
+                            packed_path, sim_info, window_snapshots)
+from pyvisdmc.utils.memory import (parse_memory, peak_rss, plan_chunks,
+                                   snapshot_walkers, walker_bytes)
+
+DATA_PATH = 'src/pyvisdmc/test_data/h2o_example_data'
+PAIRS = [[0, 1], [0, 2], [1, 2]]
+
+
+def test_parse_memory():
+    """
+    Pattern test for the memory sizes that are read and rejected.
+    """
+    assert parse_memory(512) == 512 * 1024 ** 2
+    assert parse_memory(0.5) == 512 * 1024
+    assert parse_memory('4GB') == 4 * 1024 ** 3
+    assert parse_memory('512 mb') == 512 * 1024 ** 2
+    assert parse_memory('1.5G') == int(1.5 * 1024 ** 3)
+    assert parse_memory('2048B') == 2048
+    for value in [0, -1, True, '4 parsecs', '', 'GB']:
+        with pytest.raises(ValueError):
+            parse_memory(value)
+
+
+def test_smoke_peak_rss():
+    """
+    Simple smoke test that the peak memory of the process is read, and
+    grows with a large allocation.
+    """
+    before = peak_rss()
+    block = np.ones(before // 8 + 1)
+    assert peak_rss() > before
+    del block
+
+
+def test_walker_bytes():
+    """
+    One shot test of the estimated bytes per walker, which grow with the
+    atoms and bonds and shrink in single precision.
+    """
+    # coordinates read in double precision: 3 atoms * 3 * 8, weights 2 * 8,
+    # bonds 3 * (3 * 8 + 8 + 8 + 8)
+    assert walker_bytes(3, 3) == 72 + 16 + 144
+    assert walker_bytes(3, 3, 'float32') < walker_bytes(3, 3)
+    assert walker_bytes(4, 3) > walker_bytes(3, 3)
+    assert walker_bytes(3, 4) > walker_bytes(3, 3)
+
+
+def test_plan_chunks():
+    """
+    Pattern test that the walkers are kept in memory when they fit in the
+    budget, and streamed in chunks that fit otherwise.
+    """
+    per_walker = walker_bytes(3, 3)
+    budget = 1000 * per_walker
+
+    footprint, chunk_size = plan_chunks(100, per_walker, budget)
+    assert footprint == 100 * per_walker and chunk_size is None
+
+    footprint, chunk_size = plan_chunks(10 ** 6, per_walker, budget)
+    assert footprint == 10 ** 6 * per_walker
+    assert chunk_size == 500
+    assert plan_chunks(10 ** 6, per_walker, budget, workers=4)[1] < chunk_size
+    # a chunk_size that fits is kept, and one that does not is lowered
+    assert plan_chunks(100, per_walker, budget, chunk_size=10)[1] == 10
+    assert plan_chunks(100, per_walker, budget, chunk_size=10 ** 6)[1] == chunk_size
+    # at least one walker per chunk, however small the budget
+    assert plan_chunks(100, per_walker, 1)[1] == 1
+
+
+def test_snapshot_walkers(tmp_path):
+    """
+    One shot test that the walkers are counted from the metadata of the
+    wavefunction files and of a packed store alike.
+    """
+    entry = find_simulation(DATA_PATH, 'h2o', 0, 5000, 20000)
+    snapshots = window_snapshots(entry, 10000, 20000)
+    sim_data = pv.SimInfo(entry['sim_info'])
+    _, weights = sim_info(sim_data, 10000, 20000, snapshots=snapshots)
+    assert snapshot_walkers(entry, snapshots) == len(weights)
+
+    packed = packed_path(str(tmp_path / 'H2O_0_sim_info.hdf5'))
+    pack_snapshots(packed, [entry['snapshots'][ts] for ts in snapshots], snapshots)
+    entry = dict(entry, packed=packed,
+                 snapshots={ts: packed for ts in snapshots})
+    assert snapshot_walkers(entry, snapshots) == len(weights)
+
+
+def test_chunked_matches_in_memory():
+    """
+    One shot test that walkers streamed in the chunks planned for a budget
+    too small to hold them give the expectation values and histograms of
+    the walkers held in memory at once.
+    """
+    entry = find_simulation(DATA_PATH, 'h2o', 0, 5000, 20000)
+    snapshots = window_snapshots(entry, 10000, 20000)
+    sim_data = pv.SimInfo(entry['sim_info'])
+    n_walkers = snapshot_walkers(entry, snapshots)
+    per_walker = walker_bytes(3, len(PAIRS))
+    budget = n_walkers * per_walker // 4
+    footprint, chunk_size = plan_chunks(n_walkers, per_walker, budget)
+    assert footprint > budget
+    assert chunk_size is not None and chunk_size < n_walkers
+
+    edges = bin_edges(0.0, 5.0, 250)
+    hists, _ = accumulate_bond_histograms(
+        iter_sim_info(sim_data, 10000, 20000, chunk_size, snapshots=snapshots),
+        [tuple(p) for p in PAIRS], edges)
+    analyzer, weights = sim_info(sim_data, 10000, 20000, snapshots=snapshots)
+    distances, exp_vals = bond_lengths(analyzer.xx, weights, PAIRS)
+
+    for hist, row, exp_val in zip(hists, distances, exp_vals):
+        counts, _ = np.histogram(row, bins=edges, weights=weights)
+        np.testing.assert_allclose(hist.counts, counts, rtol=1e-10, atol=1e-12)
+        assert hist.mean == pytest.approx(exp_val, rel=1e-12)
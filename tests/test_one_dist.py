@@ -81,3 +81,17 @@ def test_atom_indices():
         analyzer = pv.AnalyzeWfn(h2o_cds)
 
         plot_dist(molecule, analyzer, weights, dist)
+
+
+def test_any_molecule_name():
+    """
+    One shot test that the number of atoms is taken from the walkers, so
+    molecules without a built-in table can be plotted.
+    """
+    molecule = 'water'
+    dist = [0, 2]
+    h2o_cds = np.load('src/pyvisdmc/test_data/h2o_cds.npy')
+    weights = np.load('src/pyvisdmc/test_data/h2o_dws.npy')
+    analyzer = pv.AnalyzeWfn(h2o_cds)
+
+    plot_dist(molecule, analyzer, weights, dist)
@@ -0,0 +1,65 @@
+"""
+Tests for the outputs module
+"""
+import os
+
+from pyvisdmc.utils import OutputIndex, file_stamps, fingerprint
+from pyvisdmc.utils.outputs import OUTPUTS_NAME
+
+
+def test_smoke_record(tmp_path):
+    """
+    Simple smoke test to make sure a recorded output is up to date.
+    """
+    (tmp_path / 'a.png').write_bytes(b'png')
+    index = OutputIndex(tmp_path)
+    digest = fingerprint({'plot': 'eref'})
+
+    assert not index.is_current(['a.png'], digest)
+    index.record(['a.png'], digest)
+    assert os.path.isfile(tmp_path / OUTPUTS_NAME)
+    assert OutputIndex(tmp_path).is_current(['a.png'], digest)
+
+
+def test_stale_outputs(tmp_path):
+    """
+    Edge test for outputs whose inputs changed or whose files are gone.
+    """
+    (tmp_path / 'a.png').write_bytes(b'png')
+    index = OutputIndex(tmp_path)
+    index.record(['a.png', 'a.json'], fingerprint({'stop': 20000}))
+
+    assert not index.is_current(['a.png'], fingerprint({'stop': 19000}))
+    # a.json was never saved
+    assert not index.is_current(['a.png', 'a.json'], fingerprint({'stop': 20000}))
+
+
+def test_pattern_file_stamps(tmp_path):
+    """
+    Pattern test that a changed data file changes the fingerprint, and
+    that the order and repeats of the files do not.
+    """
+    data = [tmp_path / 'wfn_1.hdf5', tmp_path / 'wfn_2.hdf5']
+    for path in data:
+        path.write_bytes(b'walkers')
+    digest = fingerprint({'data': file_stamps(data)})
+
+    assert fingerprint({'data': file_stamps(data[::-1] + data)}) == digest
+    data[1].write_bytes(b'more walkers')
+    assert fingerprint({'data': file_stamps(data)}) != digest
+
+
+def test_concurrent_record(tmp_path):
+    """
+    Edge test that runs recording outputs in the same folder at once keep
+    each other's records.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    names = [f'{k}.png' for k in range(16)]
+    for name in names:
+        (tmp_path / name).write_bytes(b'png')
+    digest = fingerprint({'plot': 'eref'})
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda name: OutputIndex(tmp_path).record([name], digest), names))
+    assert all(OutputIndex(tmp_path).is_current([name], digest) for name in names)
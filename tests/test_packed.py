@@ -0,0 +1,164 @@
+"""
+Tests for the packed module
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import (Catalog, iter_sim_info, load_packed,
+                            pack_snapshots, packed_path, read_wfns, sim_info,
+                            stale_snapshots)
+from pyvisdmc.utils.data_loader import wfn_files
+
+SIM_INFO = ('src/pyvisdmc/test_data/h2o_example_data/'
+            '1.0w_5000_walkers_20000t_1dt/H2O_0_sim_info.hdf5')
+SNAPSHOTS = list(range(9000, 20000, 1000))
+
+
+@pytest.fixture
+def sim_dir(tmp_path):
+    """
+    Temporarily creates a copy of the example h2o simulation summary with
+    links to its snapshots, so that a packed store can be written next to
+    it.
+    """
+    src = os.path.dirname(os.path.abspath(SIM_INFO))
+    dst = tmp_path / os.path.basename(src)
+    (dst / 'wfns').mkdir(parents=True)
+    shutil.copy(SIM_INFO, dst)
+    for name in os.listdir(os.path.join(src, 'wfns')):
+        os.symlink(os.path.join(src, 'wfns', name), dst / 'wfns' / name)
+    return dst
+
+
+def pack(sim_dir, **options):
+    sim_data = pv.SimInfo(str(sim_dir / 'H2O_0_sim_info.hdf5'))
+    path = packed_path(sim_data.fname)
+    pack_snapshots(path, wfn_files(sim_data, SNAPSHOTS), SNAPSHOTS, **options)
+    return sim_data, path
+
+
+def test_smoke_pack(sim_dir):
+    """
+    Simple smoke test to make sure a store is written next to the
+    simulation summary.
+    """
+    _, path = pack(sim_dir)
+
+    assert os.path.isfile(sim_dir / 'H2O_0_packed.hdf5')
+    assert path == str(sim_dir / 'H2O_0_packed.hdf5')
+
+
+def test_matches_wfns(sim_dir):
+    """
+    One shot test that the store returns exactly the walkers of the
+    wavefunction files, as a zero-copy view for consecutive snapshots.
+    """
+    sim_data, path = pack(sim_dir)
+    ref_coords, ref_weights = read_wfns(wfn_files(sim_data, SNAPSHOTS),
+                                        ret_ang=True)
+
+    coords, weights = load_packed(path, SNAPSHOTS)
+    np.testing.assert_array_equal(coords, ref_coords)
+    np.testing.assert_array_equal(weights, ref_weights)
+    assert isinstance(coords, np.memmap)
+
+    coords, weights = load_packed(path, SNAPSHOTS[::2])
+    ref_coords, ref_weights = read_wfns(wfn_files(sim_data, SNAPSHOTS[::2]),
+                                        ret_ang=True)
+    np.testing.assert_array_equal(coords, ref_coords)
+    np.testing.assert_array_equal(weights, ref_weights)
+
+
+def test_loader_reads_store(sim_dir):
+    """
+    One shot test that sim_info and iter_sim_info read the store once the
+    wavefunction files are gone.
+    """
+    sim_data, _ = pack(sim_dir)
+    ref_coords, ref_weights = read_wfns(wfn_files(sim_data, SNAPSHOTS),
+                                        ret_ang=True)
+    shutil.rmtree(sim_dir / 'wfns')
+
+    analyzer, weights = sim_info(sim_data, 9000, 20000, snapshots=SNAPSHOTS)
+    np.testing.assert_array_equal(analyzer.xx, ref_coords)
+    np.testing.assert_array_equal(weights, ref_weights)
+
+    chunks = list(iter_sim_info(sim_data, 9000, 20000, chunk_size=4000,
+                                snapshots=SNAPSHOTS))
+    np.testing.assert_array_equal(np.concatenate([c for c, _ in chunks]),
+                                  ref_coords)
+    assert max(len(w) for _, w in chunks) <= 4000
+
+
+def test_rewritten_wfn(sim_dir, capsys):
+    """
+    One shot test that a snapshot rewritten after packing makes the store
+    stale, so the wavefunction files are read instead, with a warning.
+    """
+    import h5py
+
+    sim_data, path = pack(sim_dir)
+    assert stale_snapshots(path, SNAPSHOTS, wfn_files(sim_data, SNAPSHOTS)) == []
+
+    # replace the link to one snapshot by a rewritten copy
+    rewritten = sim_dir / 'wfns' / 'H2O_0_wfn_12000ts.hdf5'
+    src = os.path.realpath(rewritten)
+    rewritten.unlink()
+    shutil.copy(src, rewritten)
+    with h5py.File(rewritten, 'r+') as f:
+        f['coords'][...] = f['coords'][()] * 1.1
+    assert stale_snapshots(path, SNAPSHOTS, wfn_files(sim_data, SNAPSHOTS)) == [12000]
+
+    ref_coords, ref_weights = read_wfns(wfn_files(sim_data, SNAPSHOTS),
+                                        ret_ang=True)
+    analyzer, weights = sim_info(sim_data, 9000, 20000, snapshots=SNAPSHOTS)
+    np.testing.assert_array_equal(analyzer.xx, ref_coords)
+    np.testing.assert_array_equal(weights, ref_weights)
+    assert "changed since H2O_0_packed.hdf5 was packed" in capsys.readouterr().out
+
+    # packing again brings the store up to date
+    pack(sim_dir)
+    assert stale_snapshots(path, SNAPSHOTS, wfn_files(sim_data, SNAPSHOTS)) == []
+
+
+def test_pattern_options(sim_dir):
+    """
+    Pattern test that float32 and compressed stores hold the same walkers.
+    """
+    sim_data = pv.SimInfo(str(sim_dir / 'H2O_0_sim_info.hdf5'))
+    ref_coords, ref_weights = read_wfns(wfn_files(sim_data, SNAPSHOTS),
+                                        ret_ang=True)
+
+    for float32 in [False, True]:
+        for compress in [False, True]:
+            _, path = pack(sim_dir, float32=float32, compress=compress)
+            coords, weights = load_packed(path, SNAPSHOTS)
+            assert coords.dtype == (np.float32 if float32 else np.float64)
+            np.testing.assert_allclose(coords, ref_coords, rtol=1e-6)
+            np.testing.assert_array_equal(weights, ref_weights)
+
+
+def test_catalog_snapshots(sim_dir):
+    """
+    One shot test that the catalog lists the snapshots of the store.
+    """
+    pack(sim_dir)
+    shutil.rmtree(sim_dir / 'wfns')
+
+    entry = Catalog(sim_dir.parent).refresh().find('h2o', 0, 5000, 20000)
+    assert sorted(entry['snapshots']) == SNAPSHOTS
+    assert entry['packed'] == str(sim_dir / 'H2O_0_packed.hdf5')
+
+
+def test_missing_snapshot(sim_dir):
+    """
+    Edge test for a snapshot that is not in the store.
+    """
+    _, path = pack(sim_dir)
+
+    with pytest.raises(ValueError, match=r'no snapshot at timestep\(s\) \[5000\]'):
+        load_packed(path, [5000, 9000])
@@ -0,0 +1,57 @@
+"""
+Tests for the pipeline module
+"""
+import pytest
+
+from pyvisdmc.utils import Pipeline
+
+
+def build():
+    pipeline = Pipeline()
+    pipeline.add('vref', lambda: 'vref')
+    pipeline.add('walkers', lambda vref: vref + '+walkers', requires=['vref'])
+    pipeline.add('distances', lambda walkers: walkers + '+distances',
+                 requires=['walkers'])
+    pipeline.add('histograms', lambda vref: vref + '+histograms',
+                 requires=['vref'])
+    return pipeline
+
+
+def test_smoke_pipeline():
+    """
+    Simple smoke test to make sure a product is computed from its
+    dependencies.
+    """
+    pipeline = build()
+
+    assert pipeline.get('distances') == 'vref+walkers+distances'
+
+
+def test_only_needed_products():
+    """
+    One shot test that only the requested products and their dependencies
+    are computed, each once.
+    """
+    pipeline = build()
+
+    assert pipeline.plan(['vref']) == ['vref']
+    assert pipeline.plan(['distances', 'histograms']) == [
+        'vref', 'walkers', 'distances', 'histograms']
+    pipeline.get('vref')
+    pipeline.get('histograms')
+    pipeline.get('histograms')
+    assert pipeline.computed == ['vref', 'histograms']
+
+
+def test_undeclared_products():
+    """
+    Edge test for unknown, duplicate and undeclared required products.
+    """
+    pipeline = build()
+
+    with pytest.raises(ValueError, match='Unknown data product'):
+        pipeline.plan(['energies'])
+    with pytest.raises(ValueError, match='already declared'):
+        pipeline.add('vref', lambda: None)
+    with pytest.raises(ValueError, match='undeclared product'):
+        pipeline.add('kde', lambda h: h, requires=['bins'])
@@ -2,6 +2,9 @@
 Tests for the plot_eref function
 """
 
+import json
+
+import numpy as np
 import pytest
 
 import pyvibdmc as pv
@@ -38,3 +41,77 @@ def test_stop_value():
         sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
 
         plot_eref(molecule, sim_num, sim_data, start, stop)
+
+
+def test_zpe_summary(tmp_path, monkeypatch):
+    """
+    One shot test that the ZPE and its error are saved in the summary file.
+    """
+    sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
+    monkeypatch.chdir(tmp_path)
+
+    for error in ['block', 'bootstrap']:
+        plot_eref('h2o', 0, sim_data, 5000, 20000, error=error, summary=True)
+        with open('h2o_sim_0_zpe.json') as f:
+            summary = json.load(f)
+
+        vref = sim_data.get_vref(ret_cm=True)
+        assert summary['zpe_cm-1'] == pytest.approx(
+            np.mean(vref[5000:20000, 1]))
+        assert summary['zpe_error_cm-1'] > 0
+        assert summary['error_method'] == error
+
+
+def test_error_method():
+    """
+    Edge test for an unknown ZPE error method
+    """
+    sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
+
+    with pytest.raises(ValueError, match='error must be one of'):
+        plot_eref('h2o', 0, sim_data, 5000, 20000, error='jackknife')
+
+
+def test_decimated_line(tmp_path, monkeypatch):
+    """
+    One shot test that decimating the Eref line does not change the ZPE.
+    """
+    sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
+    monkeypatch.chdir(tmp_path)
+
+    zpes = []
+    for max_points in [100, 100000]:
+        plot_eref('h2o', 0, sim_data, 5000, 20000, max_points=max_points,
+                  summary=True)
+        with open('h2o_sim_0_zpe.json') as f:
+            zpes.append(json.load(f)['zpe_cm-1'])
+
+    assert zpes[0] == zpes[1]
+
+
+def test_no_summary_by_default(tmp_path, monkeypatch):
+    """
+    Edge test that the summary file is only saved when it is asked for.
+    """
+    sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
+    monkeypatch.chdir(tmp_path)
+
+    plot_eref('h2o', 0, sim_data, 5000, 20000)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['h2o_sim_0_zpe.png']
+
+
+def test_short_window(tmp_path, monkeypatch):
+    """
+    Edge test for a ZPE window too short to estimate its error, which is
+    plotted without one.
+    """
+    sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
+    monkeypatch.chdir(tmp_path)
+
+    for error in ['block', 'bootstrap']:
+        plot_eref('h2o', 0, sim_data, 10, 12, error=error, summary=True)
+        with open('h2o_sim_0_zpe.json') as f:
+            summary = json.load(f)
+        vref = sim_data.get_vref(ret_cm=True)
+        assert summary['zpe_cm-1'] == pytest.approx(np.mean(vref[10:12, 1]))
+        assert summary['zpe_error_cm-1'] is None
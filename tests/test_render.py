@@ -0,0 +1,63 @@
+"""
+Tests for the render function
+"""
+import os
+from functools import partial
+
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.plots import render, plot_dist, plot_dists, plot_eref
+
+H2O_CDS = 'src/pyvisdmc/test_data/h2o_cds.npy'
+H2O_DWS = 'src/pyvisdmc/test_data/h2o_dws.npy'
+
+
+def _tasks():
+    analyzer = pv.AnalyzeWfn(np.load(H2O_CDS))
+    weights = np.load(H2O_DWS)
+    sim_data = pv.SimInfo('src/pyvisdmc/test_data/H2O_0_sim_info.hdf5')
+    return [partial(plot_eref, 'h2o', 0, sim_data, 5000, 20000),
+            partial(plot_dist, 'h2o', analyzer, weights, [0, 1]),
+            partial(plot_dists, 'h2o', 0, analyzer, weights, [[0, 1], [0, 2]])]
+
+
+def test_smoke_render(tmp_path, monkeypatch):
+    """
+    Simple smoke test to make sure independent figures are saved when
+    rendered in parallel.
+    """
+    tasks = _tasks()
+    monkeypatch.chdir(tmp_path)
+    render(tasks, jobs=3)
+
+    assert sorted(os.listdir(tmp_path)) == [
+        'h2o_01_dist.png', 'h2o_sim_0_mult_dists.png', 'h2o_sim_0_zpe.png']
+
+
+def test_return_order():
+    """
+    Pattern test that the results come back in task order for any
+    number of jobs.
+    """
+    tasks = [partial(pow, 2, i) for i in range(10)]
+    for jobs in [1, 2, 4]:
+        assert render(tasks, jobs=jobs) == [2 ** i for i in range(10)]
+
+
+def test_task_error():
+    """
+    Edge test that an error raised in a worker reaches the caller
+    """
+    tasks = [partial(int, '1'), partial(int, 'not a number')]
+    with pytest.raises(ValueError, match='invalid literal'):
+        render(tasks, jobs=2)
+
+
+def test_invalid_jobs():
+    """
+    Edge test for a non-positive number of jobs
+    """
+    with pytest.raises(ValueError, match='jobs must be a positive integer'):
+        render([], jobs=0)
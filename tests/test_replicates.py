@@ -0,0 +1,117 @@
+"""
+Tests for the replicates module
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+
+from pyvisdmc.utils import (parse_sim_nums, replicate_label, replicate_zpes,
+                            pooled_zpe, pool_bond_histograms, load_data,
+                            accumulate_bond_histograms, iter_sim_info,
+                            bin_edges)
+from pyvisdmc.plots import plot_eref_replicates
+from pyvisdmc.test_data import DATA_PATH
+
+SIM_DIR = os.path.join('h2o_example_data', '1.0w_5000_walkers_20000t_1dt')
+
+
+@pytest.fixture
+def replicate_path(tmp_path):
+    """
+    Temporarily creates a data folder with three replicates (simulations
+    0, 1 and 2) that link to the files of the example h2o simulation.
+    """
+    src = os.path.join(os.path.abspath(DATA_PATH), SIM_DIR)
+    dst = tmp_path / SIM_DIR
+    (dst / 'wfns').mkdir(parents=True)
+    for k in range(3):
+        os.symlink(os.path.join(src, 'H2O_0_sim_info.hdf5'),
+                   dst / f'H2O_{k}_sim_info.hdf5')
+        for name in os.listdir(os.path.join(src, 'wfns')):
+            os.symlink(os.path.join(src, 'wfns', name),
+                       dst / 'wfns' / name.replace('H2O_0_', f'H2O_{k}_'))
+    return str(tmp_path)
+
+
+def test_smoke_parse_sim_nums():
+    """
+    Simple smoke test to make sure parse_sim_nums reads every form.
+    """
+    assert parse_sim_nums(3) == [3]
+    assert parse_sim_nums([0, 2, 5]) == [0, 2, 5]
+    assert parse_sim_nums('0-3') == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize('sim_num', [-1, 'zero', '3-1', [], [1, 1], [0, 'a'],
+                                     True, 1.0])
+def test_invalid_sim_nums(sim_num):
+    """
+    Edge test for values that are not simulation numbers.
+    """
+    with pytest.raises(ValueError,
+                       match='Simulation number must be a non-negative integer'):
+        parse_sim_nums(sim_num)
+
+
+def test_replicate_label():
+    """
+    One shot test of the file name labels.
+    """
+    assert replicate_label([4]) == '4'
+    assert replicate_label([0, 1, 2]) == '0-2'
+    assert replicate_label([0, 2, 5]) == '0_2_5'
+
+
+def test_pooled_zpe():
+    """
+    One shot test of the pooled ZPE and its replicate-to-replicate error.
+    """
+    zpe, err = pooled_zpe([100.0, 102.0, 104.0, 106.0])
+
+    assert zpe == pytest.approx(103.0)
+    assert err == pytest.approx(np.std([100, 102, 104, 106], ddof=1) / 2)
+    with pytest.raises(ValueError, match='At least 2 replicates'):
+        pooled_zpe([100.0])
+
+
+def test_pool_matches_single(replicate_path):
+    """
+    Pattern test that the histograms pooled over three identical
+    replicates, serially and in parallel, hold three times the weight of
+    one replicate.
+    """
+    sim_datas = [load_data(replicate_path, 'h2o', k, 5000, 20000)
+                 for k in range(3)]
+    edges = bin_edges(0, 3, 60)
+    single, single_2d = accumulate_bond_histograms(
+        iter_sim_info(sim_datas[0], 15000, 20000), [(0, 1)], edges,
+        joint=[(0, 1), (0, 2)])
+
+    for workers in [1, 3]:
+        hists, hist2d = pool_bond_histograms(
+            sim_datas, 15000, 20000, [(0, 1)], edges,
+            joint=[(0, 1), (0, 2)], chunk_size=2000, workers=workers)
+        assert hists[0].counts == pytest.approx(3 * single[0].counts)
+        assert hists[0].mean == pytest.approx(single[0].mean)
+        assert hist2d.counts == pytest.approx(3 * single_2d.counts)
+
+
+def test_plot_eref_replicates(replicate_path, tmp_path, monkeypatch):
+    """
+    One shot test that the pooled Eref plot and summary are saved.
+    """
+    monkeypatch.chdir(tmp_path)
+    sim_datas = [load_data(replicate_path, 'h2o', k, 5000, 20000)
+                 for k in range(3)]
+    plot_eref_replicates('h2o', [0, 1, 2], sim_datas, 5000, 20000,
+                         summary=True)
+
+    assert os.path.isfile('h2o_sim_0-2_zpe.png')
+    with open('h2o_sim_0-2_zpe.json') as f:
+        summary = json.load(f)
+    zpe = replicate_zpes(sim_datas[:1], 5000, 20000)[0]
+    assert summary['zpe_cm-1'] == pytest.approx(zpe)
+    assert summary['zpe_error_cm-1'] == pytest.approx(0, abs=1e-9)
+    assert summary['sim_num'] == [0, 1, 2]
@@ -0,0 +1,86 @@
+"""
+Tests for the resample module
+"""
+import numpy as np
+import pytest
+
+from pyvisdmc.utils import (bond_lengths, preview_walkers, sampling_errors,
+                            systematic_resample)
+
+H2O_CDS = 'src/pyvisdmc/test_data/h2o_cds.npy'
+H2O_DWS = 'src/pyvisdmc/test_data/h2o_dws.npy'
+
+
+def test_smoke_preview():
+    """
+    Simple smoke test to make sure a subset of the requested size is drawn
+    with equal weights summing to the total weight.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+
+    sub_coords, sub_weights = preview_walkers(coords, weights, 1000)
+
+    assert sub_coords.shape == (1000,) + coords.shape[1:]
+    assert np.allclose(sub_weights, sub_weights[0])
+    assert np.sum(sub_weights) == pytest.approx(np.sum(weights))
+
+
+def test_proportional_to_weights():
+    """
+    One shot test that walkers are kept in proportion to their weight.
+    """
+    idx = systematic_resample([0.0, 1.0, 0.0, 3.0], 4)
+
+    np.testing.assert_array_equal(idx, [1, 3, 3, 3])
+
+
+def test_expectation_within_error():
+    """
+    One shot test that the expectation values of the subset agree with the
+    ones of the whole ensemble within a few sampling errors.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+    pairs = [[0, 1], [0, 2], [1, 2]]
+    _, exp_vals = bond_lengths(coords, weights, pairs)
+
+    sub_coords, sub_weights = preview_walkers(coords, weights, 2000)
+    distances, sub_exp_vals = bond_lengths(sub_coords, sub_weights, pairs)
+    errors = sampling_errors(distances, sub_weights)
+
+    assert np.all(errors > 0)
+    assert np.all(np.abs(sub_exp_vals - exp_vals) < 4 * errors)
+
+
+def test_small_ensemble():
+    """
+    Edge test for an ensemble smaller than the preview, and for invalid
+    sizes and weights.
+    """
+    coords = np.load(H2O_CDS)[:10]
+    weights = np.load(H2O_DWS)[:10]
+
+    sub_coords, sub_weights = preview_walkers(coords, weights, 100)
+    assert sub_coords is coords and sub_weights is weights
+
+    with pytest.raises(ValueError, match='positive integer'):
+        systematic_resample(weights, 0)
+    with pytest.raises(ValueError, match='sum to a positive number'):
+        systematic_resample(np.zeros(10), 5)
+
+
+def test_pattern_seeds():
+    """
+    Pattern test that every seed draws a sorted subset of valid walkers,
+    and that the same seed draws the same subset.
+    """
+    weights = np.random.default_rng(0).random(1000)
+
+    for seed in range(5):
+        idx = systematic_resample(weights, 100, seed=seed)
+        assert len(idx) == 100
+        assert np.all(np.diff(idx) >= 0)
+        assert idx.min() >= 0 and idx.max() < 1000
+        np.testing.assert_array_equal(idx, systematic_resample(weights, 100,
+                                                               seed=seed))
@@ -0,0 +1,58 @@
+"""
+Tests for the store module
+"""
+import numpy as np
+
+from pyvisdmc.utils import QuantityStore, bond_lengths
+from pyvisdmc.plots import plot_dist, plot_dists
+
+H2O_CDS = 'src/pyvisdmc/test_data/h2o_cds.npy'
+H2O_DWS = 'src/pyvisdmc/test_data/h2o_dws.npy'
+
+
+def test_smoke_store():
+    """
+    Simple smoke test to make sure the store returns the engine's values.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+    store = QuantityStore(coords, weights)
+
+    distances, exp_vals = store.bond_lengths([[0, 1], [0, 2]])
+    ref_distances, ref_exp_vals = bond_lengths(coords, weights,
+                                               [[0, 1], [0, 2]])
+
+    np.testing.assert_array_equal(distances, ref_distances)
+    np.testing.assert_array_equal(exp_vals, ref_exp_vals)
+
+
+def test_hits_and_misses():
+    """
+    Pattern test that each bond is computed at most once, in either
+    atom order.
+    """
+    store = QuantityStore(np.random.rand(20, 3, 3), np.random.rand(20))
+
+    store.bond_lengths([[0, 1]])
+    assert (store.hits, store.misses) == (0, 1)
+    store.bond_lengths([[1, 0], [1, 2]])
+    assert (store.hits, store.misses) == (1, 2)
+    store.bond_lengths([[2, 1], [0, 1], [0, 2], [0, 2]])
+    assert (store.hits, store.misses) == (4, 3)
+    assert store.report() == \
+        'Quantity store: 4 hits, 3 misses, 3 quantities stored'
+
+
+def test_plots_share_store():
+    """
+    One shot test that plots filling the same store reuse each other's
+    bond lengths.
+    """
+    coords = np.load(H2O_CDS)
+    weights = np.load(H2O_DWS)
+    store = QuantityStore(coords, weights)
+
+    plot_dist('h2o', None, weights, [0, 1], store=store)
+    plot_dists('h2o', 0, None, weights, [[0, 1], [1, 2]], store=store)
+
+    assert (store.hits, store.misses) == (1, 2)
@@ -0,0 +1,54 @@
+"""
+Tests for the synthetic data generator
+"""
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.test_data.synthetic import write_simulation
+from pyvisdmc.utils import bond_lengths, find_simulation, sim_info
+
+
+def test_smoke_write(tmp_path):
+    """
+    Simple smoke test to make sure a synthetic simulation is found by the
+    catalog like a PyVibDMC one.
+    """
+    sim = write_simulation(tmp_path, walkers=300, atoms=4, timesteps=1000,
+                           snapshots=5)
+    entry = find_simulation(tmp_path, 'syn', 0, 300, 1000)
+
+    assert entry['sim_info'] == sim['sim_info']
+    assert sorted(entry['snapshots']) == [0, 200, 400, 600, 800]
+    assert entry['atoms'] == 4
+
+
+def test_walkers(tmp_path):
+    """
+    One shot test that the walkers can be loaded and have positive weights
+    and the bond lengths of their reference geometry.
+    """
+    write_simulation(tmp_path, walkers=2000, atoms=3, timesteps=1000,
+                     snapshots=4)
+    entry = find_simulation(tmp_path, 'syn', 0, 2000, 1000)
+    sim_data = pv.SimInfo(entry['sim_info'])
+    analyzer, weights = sim_info(sim_data, 500, 1000, snapshots=[500, 750])
+
+    assert analyzer.xx.shape == (4000, 3, 3)
+    assert np.all(weights > 0)
+    _, exp_vals = bond_lengths(analyzer.xx, weights, [[0, 1], [1, 2]])
+    # 1.6 to 2.4 Bohr, in Angstroms
+    assert np.all((exp_vals > 0.8) & (exp_vals < 1.35))
+
+
+@pytest.mark.parametrize('options, message', [
+    ({'walkers': 0}, 'walkers must be a positive integer'),
+    ({'atoms': 1}, 'At least 2 atoms'),
+    ({'timesteps': 5, 'snapshots': 10}, 'more snapshots than timesteps'),
+])
+def test_invalid_sizes(tmp_path, options, message):
+    """
+    Edge test for sizes that cannot make a simulation.
+    """
+    with pytest.raises(ValueError, match=message):
+        write_simulation(tmp_path, **options)
@@ -0,0 +1,97 @@
+"""
+Tests for the timing module
+"""
+import json
+
+import numpy as np
+
+from pyvisdmc.utils import Trace, bond_lengths, stage
+from pyvisdmc.utils.timing import _NULL_STAGE
+
+
+def test_smoke_trace():
+    """
+    Simple smoke test to make sure a stage is recorded by an active trace.
+    """
+    with Trace() as trace:
+        with stage('test.step', samples=10) as timed:
+            timed.add(bytes=80)
+
+    assert len(trace.events) == 1
+    assert trace.events[0]['name'] == 'test.step'
+    assert trace.events[0]['counts'] == {'samples': 10, 'bytes': 80}
+    assert trace.events[0]['seconds'] >= 0
+
+
+def test_off_by_default():
+    """
+    Edge test that stages do nothing without a trace, and that a finished
+    trace stops recording.
+    """
+    assert stage('test.step') is _NULL_STAGE
+    with stage('test.step', samples=1) as timed:
+        timed.add(bytes=8)
+
+    with Trace() as trace:
+        pass
+    with stage('test.step'):
+        pass
+    assert trace.events == []
+
+
+def test_instrumented_stage():
+    """
+    One shot test that the stages of the package are recorded with their
+    counts, and summed per stage.
+    """
+    coords = np.random.default_rng(0).normal(size=(100, 3, 3))
+    weights = np.ones(100)
+
+    with Trace() as trace:
+        bond_lengths(coords, weights, [[0, 1], [1, 2]])
+        bond_lengths(coords, weights, [[0, 2]])
+
+    summary = trace.summary()['distances.bond_lengths']
+    assert summary['calls'] == 2
+    assert summary['samples'] == 300
+    assert summary['bytes'] == 2 * coords.nbytes
+
+
+def test_chrome_trace(tmp_path):
+    """
+    One shot test that the trace is written as complete events of the
+    Chrome trace format, nested stages inside their parent.
+    """
+    with Trace() as trace:
+        with stage('test.outer'):
+            with stage('test.inner', samples=5):
+                pass
+    trace.write(tmp_path / 'trace.json')
+
+    with open(tmp_path / 'trace.json') as f:
+        data = json.load(f)
+    inner, outer = data['traceEvents']
+    assert (inner['name'], outer['name']) == ('test.inner', 'test.outer')
+    assert inner['ph'] == 'X' and inner['args']['samples'] == 5
+    assert outer['ts'] <= inner['ts']
+    assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+    assert data['otherData']['stages']['test.inner']['samples'] == 5
+
+
+def test_peak_rss():
+    """
+    Pattern test that every stage records the peak RSS of the process,
+    which never decreases from one stage to the next and shows in the
+    summary and the report.
+    """
+    with Trace() as trace:
+        with stage('test.small'):
+            pass
+        with stage('test.large'):
+            block = np.ones(50 * 1024 ** 2 // 8)
+        del block
+
+    small, large = (e['peak_rss'] for e in trace.events)
+    assert 0 < small <= large
+    assert trace.summary()['test.large']['peak_rss'] == large
+    assert 'MB' in trace.report()
@@ -0,0 +1,91 @@
+"""
+Tests for the watch module
+"""
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import (SnapshotHistograms, accumulate_bond_histograms,
+                            bin_edges, iter_sim_info)
+
+SIM_INFO = ('src/pyvisdmc/test_data/h2o_example_data/'
+            '1.0w_5000_walkers_20000t_1dt/H2O_0_sim_info.hdf5')
+PAIRS = [(0, 1), (0, 2)]
+EDGES = bin_edges(0.0, 5.0, 250)
+
+
+@pytest.fixture
+def sim_dir(tmp_path):
+    """
+    Temporarily creates a copy of the example h2o simulation summary with
+    an empty wfns/ folder, into which snapshots are linked as if a running
+    simulation wrote them.
+    """
+    dst = tmp_path / os.path.basename(os.path.dirname(os.path.abspath(SIM_INFO)))
+    (dst / 'wfns').mkdir(parents=True)
+    shutil.copy(SIM_INFO, dst)
+    return dst
+
+
+def write_snapshots(sim_dir, snapshots):
+    src = os.path.join(os.path.dirname(os.path.abspath(SIM_INFO)), 'wfns')
+    for ts in snapshots:
+        name = f'H2O_0_wfn_{ts}ts.hdf5'
+        os.symlink(os.path.join(src, name), sim_dir / 'wfns' / name)
+
+
+def test_smoke_update(sim_dir):
+    """
+    Simple smoke test to make sure available snapshots are merged.
+    """
+    write_snapshots(sim_dir, [10000, 11000])
+    sim_data = pv.SimInfo(str(sim_dir / 'H2O_0_sim_info.hdf5'))
+    watched = SnapshotHistograms(PAIRS, EDGES)
+
+    assert watched.update(sim_data, [10000, 11000]) == [10000, 11000]
+    assert watched.processed == {10000, 11000}
+    assert watched.histogram([0, 1]).total_weight > 0
+
+
+def test_only_new_snapshots(sim_dir):
+    """
+    One shot test that every update only reads the new snapshots, and that
+    the merged histograms equal one pass over all of them.
+    """
+    snapshots = list(range(10000, 20000, 1000))
+    sim_data = pv.SimInfo(str(sim_dir / 'H2O_0_sim_info.hdf5'))
+    watched = SnapshotHistograms(PAIRS, EDGES, joint=[[0, 1], [0, 2]])
+
+    write_snapshots(sim_dir, snapshots[:4])
+    assert watched.update(sim_data, snapshots[:4]) == snapshots[:4]
+    write_snapshots(sim_dir, snapshots[4:])
+    assert watched.update(sim_data, snapshots) == snapshots[4:]
+    assert watched.update(sim_data, snapshots) == []
+
+    hists, joint_hist = accumulate_bond_histograms(
+        iter_sim_info(sim_data, 10000, 20000, snapshots=snapshots),
+        PAIRS, EDGES, joint=[[0, 1], [0, 2]])
+    for pair, hist in zip(PAIRS, hists):
+        np.testing.assert_allclose(watched.histogram(pair).counts, hist.counts)
+        np.testing.assert_allclose(watched.histogram(pair).mean, hist.mean)
+    np.testing.assert_allclose(watched.joint_hist.counts, joint_hist.counts)
+
+
+def test_unreadable_snapshot(sim_dir):
+    """
+    Edge test for a snapshot that is not written yet: the update stops
+    there and the next update picks it up.
+    """
+    write_snapshots(sim_dir, [10000])
+    sim_data = pv.SimInfo(str(sim_dir / 'H2O_0_sim_info.hdf5'))
+    watched = SnapshotHistograms(PAIRS, EDGES)
+    # an empty file stands for a snapshot that is still being written
+    (sim_dir / 'wfns' / 'H2O_0_wfn_11000ts.hdf5').touch()
+
+    assert watched.update(sim_data, [10000, 11000]) == [10000]
+    os.remove(sim_dir / 'wfns' / 'H2O_0_wfn_11000ts.hdf5')
+    write_snapshots(sim_dir, [11000])
+    assert watched.update(sim_data, [10000, 11000]) == [11000]
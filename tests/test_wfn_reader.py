@@ -0,0 +1,153 @@
+"""
+Tests for the wfn_reader module
+"""
+import h5py
+import numpy as np
+import pytest
+
+import pyvibdmc as pv
+from pyvisdmc.utils import read_wfns, wfn_shapes, sim_info, iter_wfns
+from pyvisdmc.utils.data_loader import wfn_files
+
+SIM_INFO = ('src/pyvisdmc/test_data/h2o_example_data/'
+            '1.0w_5000_walkers_20000t_1dt/H2O_0_sim_info.hdf5')
+
+
+def test_smoke_read_wfns():
+    """
+    Simple smoke test to make sure read_wfns runs.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    read_wfns(wfn_files(sim_data, [5000, 6000]))
+
+
+def test_matches_siminfo():
+    """
+    One shot test that the fast reader returns exactly what
+    SimInfo.get_wfns returns, before and after unit conversion.
+    """
+    snapshots = np.arange(5000, 9000, 1000)
+    sim_data = pv.SimInfo(SIM_INFO)
+    ref_coords, ref_weights = sim_data.get_wfns(snapshots)
+
+    coords, weights = read_wfns(wfn_files(sim_data, snapshots))
+    np.testing.assert_array_equal(coords, ref_coords)
+    np.testing.assert_array_equal(weights, ref_weights)
+
+    coords, _ = read_wfns(wfn_files(sim_data, snapshots), ret_ang=True)
+    np.testing.assert_array_equal(
+        coords, pv.Constants.convert(ref_coords, 'angstroms', to_AU=False))
+
+
+def test_sim_info_matches_siminfo():
+    """
+    One shot test that sim_info no longer depends on get_wfns.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    ref_coords, ref_weights = sim_data.get_wfns(np.arange(5000, 8000, 1000))
+
+    sim_data.get_wfns = None
+    analyzer, weights = sim_info(sim_data, 5000, 8000)
+
+    np.testing.assert_array_equal(
+        analyzer.xx, pv.Constants.convert(ref_coords, 'angstroms',
+                                          to_AU=False))
+    np.testing.assert_array_equal(weights, ref_weights)
+
+
+def test_wfn_shapes():
+    """
+    Pattern test that the shapes are read for every snapshot.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    files = wfn_files(sim_data, [5000, 6000, 7000])
+    walker_counts, num_atoms = wfn_shapes(files)
+
+    assert num_atoms == 3
+    assert len(walker_counts) == 3
+    assert sum(walker_counts) == len(read_wfns(files)[1])
+
+
+def test_no_files():
+    """
+    Edge test for an empty list of snapshots
+    """
+    with pytest.raises(ValueError, match='No wavefunction files'):
+        read_wfns([])
+
+
+def test_invalid_file(tmp_path):
+    """
+    Edge test for an hdf5 file without wavefunction datasets
+    """
+    bad = tmp_path / 'bad.hdf5'
+    with h5py.File(bad, 'w') as f:
+        f['other'] = np.zeros(3)
+
+    with pytest.raises(ValueError, match='not a valid wavefunction file'):
+        read_wfns([bad])
+
+
+def test_parallel_matches_serial():
+    """
+    Pattern test that a parallel read gives the serial result in the
+    same order for several pool sizes.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    files = wfn_files(sim_data, np.arange(0, 20000, 1000))
+    coords, weights = read_wfns(files, ret_ang=True)
+
+    for workers in [2, 3, 8]:
+        par_coords, par_weights = read_wfns(files, ret_ang=True,
+                                            workers=workers)
+        np.testing.assert_array_equal(par_coords, coords)
+        np.testing.assert_array_equal(par_weights, weights)
+
+
+def test_parallel_threads(monkeypatch):
+    """
+    One shot test of the thread pool used where processes cannot be forked.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    files = wfn_files(sim_data, [5000, 6000, 7000])
+    coords, weights = read_wfns(files)
+
+    monkeypatch.setattr('multiprocessing.get_all_start_methods',
+                        lambda: ['spawn'])
+    par_coords, par_weights = read_wfns(files, workers=2)
+
+    np.testing.assert_array_equal(par_coords, coords)
+    np.testing.assert_array_equal(par_weights, weights)
+
+
+def test_invalid_workers():
+    """
+    Edge test for a non-positive number of workers
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    with pytest.raises(ValueError, match='workers must be a positive integer'):
+        read_wfns(wfn_files(sim_data, [5000]), workers=0)
+
+
+def test_single_precision():
+    """
+    Pattern test that float32 reads, serial, parallel and streamed, stay
+    within float32 round-off of the float64 read.
+    """
+    sim_data = pv.SimInfo(SIM_INFO)
+    files = wfn_files(sim_data, np.arange(5000, 10000, 1000))
+    coords, weights = read_wfns(files, ret_ang=True)
+
+    for workers in [1, 3]:
+        coords32, weights32 = read_wfns(files, ret_ang=True, workers=workers,
+                                        dtype=np.float32)
+        assert coords32.dtype == np.float32
+        assert weights32.dtype == np.float64
+        np.testing.assert_allclose(coords32, coords, atol=1e-6)
+        np.testing.assert_array_equal(weights32, weights)
+
+    chunks = list(iter_wfns(files, ret_ang=True, chunk_size=3000,
+                            dtype=np.float32))
+    assert all(c.dtype == np.float32 for c, _ in chunks)
+    np.testing.assert_allclose(np.concatenate([c for c, _ in chunks]),
+                               coords, atol=1e-6)